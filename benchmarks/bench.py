@@ -0,0 +1,291 @@
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import click
+
+from retrosync_core.inventory import source_inventory
+from retrosync_core.jobs import FavoritesSync, PlaylistSyncJob, PlaylistUpdateJob
+from retrosync_core.transports import (
+    TransportError,
+    TransportFileSystemUnix,
+    TransportFileSystemWindows,
+    TransportSSHWindows,
+    TransportWebDAV,
+)
+from tests.sftp_server import SFTPServer
+from tests.webdav_server import WebDAVServer
+
+from .library import Library, LibrarySpec, generate_library
+
+BENCHMARKS = {}
+# Round trip of a device on Wi-Fi, added to every request of the WebDAV and SFTP benchmarks.
+NETWORK_LATENCY = 0.005
+
+
+@dataclass
+class BenchLibraries:
+    main: Library
+    # Transport benchmarks copy real bytes, so they get a smaller library of carts.
+    transfer: Library
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+def _playlist_jobs(library, job_class):
+    transport = TransportFileSystemWindows(library.default, True)
+    jobs = []
+    for playlist in library.playlists:
+        job = job_class(library.default, transport)
+        job.setup(playlist)
+        jobs.append(job)
+    return jobs
+
+
+@benchmark("scan.source_inventory")
+def bench_source_inventory(libraries):
+    library = libraries.main
+    transport = TransportFileSystemWindows(library.default, True)
+    rom_root = Path(library.default["src_roms"])
+    for playlist in library.playlists:
+        source_inventory(rom_root / playlist["src_folder"], exclude=transport.is_excluded_path)
+
+
+@benchmark("scan.guess_size")
+def bench_guess_size(libraries):
+    library = libraries.main
+    transport = TransportFileSystemWindows(library.default, True)
+    rom_root = Path(library.default["src_roms"])
+    for playlist in library.playlists:
+        transport.guess_file_count(rom_root / playlist["src_folder"], [], True)
+        transport.guess_total_size(rom_root / playlist["src_folder"], [], True)
+
+
+@benchmark("jobs.playlist_update")
+def bench_playlist_update(libraries):
+    # A dry-run transport keeps the generated playlists unchanged between repetitions.
+    for job in _playlist_jobs(libraries.main, PlaylistUpdateJob):
+        job.do()
+
+
+@benchmark("jobs.migrate_playlist")
+def bench_migrate_playlist(libraries):
+    for job in _playlist_jobs(libraries.main, PlaylistSyncJob):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            job.migrate_playlist(temp_file)
+
+
+@benchmark("jobs.favorites_migrate")
+def bench_favorites_migrate(libraries):
+    library = libraries.main
+    transport = TransportFileSystemWindows(library.default, True)
+    job = FavoritesSync(library.default, library.playlists, transport)
+    with tempfile.NamedTemporaryFile() as temp_file:
+        job.migrate(job.src, temp_file)
+
+
+def _copy_roms(transfer_library, transport_class):
+    try:
+        transport = transport_class(transfer_library.default, False)
+    except TransportError:
+        return False
+    src = Path(transfer_library.default["src_roms"])
+    dst = Path(transfer_library.default["dest_roms"])
+    shutil.rmtree(dst, ignore_errors=True)
+    transport.copy_files(src, dst, whitelist=[], recursive=True)
+    return True
+
+
+@benchmark("transport.filesystem_windows.copy_files")
+def bench_copy_windows(libraries):
+    return _copy_roms(libraries.transfer, TransportFileSystemWindows)
+
+
+@benchmark("transport.filesystem_unix.copy_files")
+def bench_copy_unix(libraries):
+    return _copy_roms(libraries.transfer, TransportFileSystemUnix)
+
+
+@benchmark("transport.webdav.copy_files")
+def bench_copy_webdav(libraries):
+    library = libraries.transfer
+    with tempfile.TemporaryDirectory(prefix="retrosync-dav-") as tmp:
+        with WebDAVServer(tmp, latency=NETWORK_LATENCY) as server:
+            default = dict(library.default, host=server.url, username="", password="")
+            transport = TransportWebDAV(default, False)
+            transport.copy_files(
+                Path(library.default["src_roms"]), Path("/roms"), whitelist=[], recursive=True
+            )
+
+
+@benchmark("transport.ssh_windows.copy_files")
+def bench_copy_sftp(libraries):
+    library = libraries.transfer
+    with tempfile.TemporaryDirectory(prefix="retrosync-sftp-") as tmp:
+        with SFTPServer(tmp, latency=NETWORK_LATENCY) as server:
+            transport = TransportSSHWindows(server.client_config(), False)
+            transport.copy_files(
+                Path(library.default["src_roms"]), Path("/roms"), whitelist=[], recursive=True
+            )
+            transport.ssh.close()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(libraries, names, repeat):
+    results = {}
+    for name in names:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            outcome = BENCHMARKS[name](libraries)
+            timings.append(time.perf_counter() - started)
+            if outcome is False:
+                break
+        if outcome is False:
+            click.echo(f"{name:<44} skipped (transport unavailable)")
+            continue
+        results[name] = {
+            "repeat": len(timings),
+            "min": round(min(timings), 6),
+            "median": round(statistics.median(timings), 6),
+            "mean": round(statistics.mean(timings), 6),
+        }
+        click.echo(f"{name:<44} median {results[name]['median']:.4f}s")
+    return results
+
+
+def compare(baseline, current, threshold):
+    regressions = []
+    for name, entry in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            click.echo(f"{name:<44} new")
+            continue
+        change = (entry["median"] - before["median"]) / before["median"] if before["median"] else 0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        click.echo(
+            f"{name:<44} {before['median']:.4f}s -> {entry['median']:.4f}s ({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+@click.command()
+@click.option("--systems", default=6, show_default=True, help="Number of synthetic systems")
+@click.option("--files", default=200, show_default=True, help="ROM files per system")
+@click.option("--thumbnails", default=1, show_default=True, help="Thumbnail folders per system")
+@click.option(
+    "--transfer-files", default=50, show_default=True, help="Files per system for transports"
+)
+@click.option(
+    "--repeat",
+    default=3,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Repetitions per benchmark",
+)
+@click.option("--only", multiple=True, help="Run only benchmarks starting with this prefix")
+@click.option(
+    "--output", default=None, type=click.Path(dir_okay=False), help="Write results as JSON"
+)
+@click.option(
+    "--compare",
+    "baseline_file",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare against an earlier results file",
+)
+@click.option(
+    "--threshold",
+    default=0.10,
+    show_default=True,
+    help="Slowdown of the median that counts as a regression",
+)
+@click.option("--seed", default=1, show_default=True, help="Seed for the library generator")
+def main(
+    systems,
+    files,
+    thumbnails,
+    transfer_files,
+    repeat,
+    only,
+    output,
+    baseline_file,
+    threshold,
+    seed,
+):
+    names = [name for name in BENCHMARKS if not only or name.startswith(tuple(only))]
+    with tempfile.TemporaryDirectory(prefix="retrosync-bench-") as tmp:
+        library = generate_library(
+            Path(tmp) / "library",
+            LibrarySpec(
+                systems=systems, files_per_system=files, thumbnails_per_file=thumbnails, seed=seed
+            ),
+        )
+        transfer_library = generate_library(
+            Path(tmp) / "transfer",
+            LibrarySpec(
+                systems=systems,
+                files_per_system=transfer_files,
+                thumbnails_per_file=0,
+                dat_games_per_file=0,
+                profiles=["cart"],
+                seed=seed,
+            ),
+        )
+        results = run_benchmarks(
+            BenchLibraries(main=library, transfer=transfer_library), names, repeat
+        )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "library": {
+                "systems": systems,
+                "files": library.file_count,
+                "bytes": library.total_bytes,
+                "transfer_files": transfer_library.file_count,
+                "transfer_bytes": transfer_library.total_bytes,
+                "seed": seed,
+            },
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        click.echo(f"Results written to {output}.")
+    if baseline_file:
+        baseline = json.loads(Path(baseline_file).read_text(encoding="utf-8"))
+        if compare(baseline, report, threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import json
+import math
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# name -> (extension, smallest file, largest file). Sizes are drawn log-uniformly.
+SIZE_PROFILES = {
+    "cart": (".zip", 8 * 1024, 4 * 1024**2),
+    "floppy": (".adf", 880 * 1024, 880 * 1024),
+    "cd": (".chd", 200 * 1024**2, 700 * 1024**2),
+    "dvd": (".iso", 1 * 1024**3, 8 * 1024**3),
+}
+SYSTEM_PROFILES = ["cart", "cart", "floppy", "cd", "cart", "dvd"]
+REGIONS = ["(USA)", "(Europe)", "(Japan)", "(World)", "(USA, Europe)"]
+WORDS = [
+    "Super",
+    "Mega",
+    "Dragon",
+    "Quest",
+    "Star",
+    "Force",
+    "Racing",
+    "Legend",
+    "Night",
+    "Castle",
+    "Ninja",
+    "Soccer",
+    "Galaxy",
+    "Puzzle",
+    "Shadow",
+    "Turbo",
+]
+THUMBNAIL_FOLDERS = ["Named_Boxarts", "Named_Snaps", "Named_Titles"]
+PLAYLIST_HEADER = {
+    "version": "1.5",
+    "default_core_path": "",
+    "default_core_name": "",
+    "label_display_mode": 0,
+    "right_thumbnail_mode": 0,
+    "left_thumbnail_mode": 0,
+    "sort_mode": 0,
+    "scan_content_dir": "",
+    "scan_file_exts": "",
+    "scan_dat_file_path": "",
+    "scan_search_recursively": True,
+    "scan_search_archives": True,
+    "scan_filter_dat_content": False,
+    "scan_overwrite_playlist": False,
+}
+
+
+@dataclass
+class LibrarySpec:
+    systems: int = 6
+    files_per_system: int = 200
+    thumbnails_per_file: int = 1
+    dat_games_per_file: int = 20
+    # Files are sparse unless they are smaller than this, so multi-GB images cost no disk.
+    dense_limit: int = 1024**2
+    max_file_size: int | None = None
+    profiles: list = field(default_factory=lambda: list(SYSTEM_PROFILES))
+    seed: int = 1
+
+
+@dataclass
+class Library:
+    root: Path
+    default: dict
+    playlists: list
+    file_count: int = 0
+    total_bytes: int = 0
+
+
+def game_names(rng, count):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        number = f" {rng.randint(2, 5)}" if rng.random() < 0.2 else ""
+        names.add(f"{' '.join(words)}{number} {rng.choice(REGIONS)}")
+    return sorted(names)
+
+
+def file_size(rng, profile, max_file_size=None):
+    _, smallest, largest = SIZE_PROFILES[profile]
+    size = int(math.exp(rng.uniform(math.log(smallest), math.log(largest))))
+    if max_file_size is not None:
+        size = min(size, max_file_size)
+    return size
+
+
+def write_file(path: Path, size, rng, dense_limit):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as fd:
+        if size <= dense_limit:
+            fd.write(rng.randbytes(size))
+        else:
+            fd.truncate(size)
+
+
+def write_dat(path: Path, games, extra_games):
+    lines = ['<?xml version="1.0"?>', "<datafile>"]
+    for idx, name in enumerate(games + extra_games):
+        lines.append(f'  <game name="{name}">')
+        lines.append(f"    <description>{name} [{idx:05d}]</description>")
+        lines.append(f'    <rom name="{name}.bin" size="{idx}" crc="{idx:08x}"/>')
+        lines.append("  </game>")
+    lines.append("</datafile>")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def generate_library(root: Path, spec: LibrarySpec | None = None):
+    spec = spec or LibrarySpec()
+    rng = random.Random(spec.seed)
+    root = Path(root)
+    default = {
+        "src_roms": str(root / "roms"),
+        "src_playlists": str(root / "playlists"),
+        "src_thumbnails": str(root / "thumbnails"),
+        "src_bios": str(root / "bios"),
+        "src_config": str(root / "config"),
+        "src_cores": str(root / "cores"),
+        "src_cores_suffix": ".dylib",
+        "target_roms": "/target/roms",
+        "target_cores": "/target/cores",
+        "target_cores_suffix": ".so",
+        "dest_roms": str(root / "dest" / "roms"),
+        "dest_playlists": str(root / "dest" / "playlists"),
+        "dest_thumbnails": str(root / "dest" / "thumbnails"),
+        "dest_bios": str(root / "dest" / "bios"),
+        "dest_config": str(root / "dest" / "config"),
+    }
+    library = Library(root=root, default=default, playlists=[])
+    favorites = []
+    for idx in range(spec.systems):
+        profile = spec.profiles[idx % len(spec.profiles)]
+        extension = SIZE_PROFILES[profile][0]
+        folder = f"system{idx:02d}-{profile}"
+        playlist_name = f"Bench - System {idx:02d}.lpl"
+        core_name = f"Bench {idx:02d} ({profile})"
+        playlist = {
+            "name": playlist_name,
+            "src_folder": folder,
+            "dest_folder": folder,
+            "src_core_path": f"bench{idx:02d}_libretro",
+            "src_core_name": core_name,
+            "src_dat_file": f"{folder}.dat",
+        }
+        library.playlists.append(playlist)
+
+        rom_dir = root / "roms" / folder
+        names = game_names(rng, spec.files_per_system)
+        items = []
+        for name in names:
+            path = rom_dir / f"{name}{extension}"
+            size = file_size(rng, profile, spec.max_file_size)
+            write_file(path, size, rng, spec.dense_limit)
+            library.file_count += 1
+            library.total_bytes += size
+            items.append({"path": str(path), "label": name, "core_name": core_name})
+        write_dat(
+            rom_dir / playlist["src_dat_file"],
+            names,
+            game_names(rng, spec.dat_games_per_file * len(names)),
+        )
+
+        for folder_name in THUMBNAIL_FOLDERS[: spec.thumbnails_per_file]:
+            thumb_dir = root / "thumbnails" / Path(playlist_name).stem / folder_name
+            for name in names:
+                write_file(thumb_dir / f"{name}.png", 2048, rng, spec.dense_limit)
+
+        data = dict(PLAYLIST_HEADER)
+        data["items"] = [
+            {
+                "path": item["path"],
+                "label": item["label"],
+                "core_path": "DETECT",
+                "core_name": "DETECT",
+                "crc32": "00000000|crc",
+                "db_name": playlist_name,
+            }
+            for item in items
+        ]
+        playlist_path = root / "playlists" / playlist_name
+        playlist_path.parent.mkdir(parents=True, exist_ok=True)
+        playlist_path.write_text(json.dumps(data), encoding="utf-8")
+
+        for item in rng.sample(items, min(5, len(items))):
+            favorites.append(
+                {
+                    "path": item["path"],
+                    "label": item["label"],
+                    "core_path": str(root / "cores" / f"bench{idx:02d}_libretro.dylib"),
+                    "core_name": core_name,
+                    "crc32": "00000000|crc",
+                    "db_name": playlist_name,
+                }
+            )
+
+    config_dir = root / "config"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    (config_dir / "content_favorites.lpl").write_text(
+        json.dumps({"version": "1.5", "items": favorites}), encoding="utf-8"
+    )
+    bios_dir = root / "bios"
+    for idx in range(20):
+        write_file(bios_dir / f"bios{idx:02d}.bin", 64 * 1024, rng, spec.dense_limit)
+    return library
@@ -19,6 +19,7 @@ from rich.console import Console
 from rich.live import Live
 from rich.table import Table
 
+from retrosync_core.analyze import format_diff, format_report, load_runs
 from retrosync_core.config import (
     PlaylistConfigModel,
     RuntimeConfigModel,
@@ -26,8 +27,11 @@ from retrosync_core.config import (
     normalize_playlists,
     normalize_transport_config,
     rank_system_matches,
+    resolve_targets,
     validate_runtime_config,
 )
+from retrosync_core.events import EventBus, JsonlEventSink
+from retrosync_core.fanout import FanOutRunner, SyncTarget
 from retrosync_core.jobs import (
     BiosSync,
     FavoritesSync,
@@ -40,12 +44,16 @@ from retrosync_core.jobs import (
     SystemJob,
     ThumbnailsSync,
 )
+from retrosync_core.journal import RunJournal
 from retrosync_core.paths import (
     expand_user_path,
     expand_user_path_list,
     normalize_webdav_remote_path,
     retroarch_derived_paths,
 )
+from retrosync_core.plan import SyncPlan
+from retrosync_core.profiling import PROFILE_TOP, RunProfiler, start_profiler, stop_profiler
+from retrosync_core.progress import format_throughput
 from retrosync_core.runner import JobRegistry, SyncAbortError, SyncRunConfig, SyncRunner
 from retrosync_core.transports import (
     GLOBAL_EXCLUDE_PATTERNS,
@@ -75,6 +83,7 @@ from retrosync_core.ui import (
     set_transport_status,
     step_progress,
     system_steps_progress,
+    update_transport_throughput,
 )
 
 logger = logging.getLogger()
@@ -197,7 +206,7 @@ class CliRichReporter:
         self.overall_task_id = None
 
     def start(self, *, overall_total, supports_per_file_progress):
-        self.overall_task_id = overall_progress.add_task("", total=overall_total)
+        self.overall_task_id = overall_progress.add_task("", total=overall_total, throughput="")
         self.live = Live(progress_group)
         self.live.__enter__()
         init_live_tasks()
@@ -228,7 +237,7 @@ class CliRichReporter:
         current_system_progress.update(task_id, description=description)
 
     def add_system_steps(self, *, name, total):
-        return system_steps_progress.add_task("", total=total, name=name)
+        return system_steps_progress.add_task("", total=total, name=name, throughput="")
 
     def advance_system_steps(self, task_id, *, advance=1):
         system_steps_progress.update(task_id, advance=advance)
@@ -262,6 +271,14 @@ class CliRichReporter:
     def hide_transport_tasks(self):
         hide_transport_tasks()
 
+    def update_throughput(self, *, task_id, job, system, overall):
+        if job is not None:
+            update_transport_throughput(format_throughput(job))
+        if task_id is not None and system is not None:
+            system_steps_progress.update(task_id, throughput=format_throughput(system))
+        if self.overall_task_id is not None and overall is not None:
+            overall_progress.update(self.overall_task_id, throughput=format_throughput(overall))
+
     def emit_summary(self, message):
         print(message)
 
@@ -357,6 +374,58 @@ class CliRichReporter:
     default=False,
     help="Utilize Python's implementation of the SSH transport (slower)",
 )
+@click.option(
+    "--plan-out",
+    "plan_out",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Compute the sync plan, write it to this file and exit without syncing",
+)
+@click.option(
+    "--plan-in",
+    "plan_in",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Execute a sync plan previously written with --plan-out instead of rescanning",
+)
+@click.option(
+    "--resume",
+    "do_resume",
+    is_flag=True,
+    help="Continue the last interrupted run, skipping the jobs and files it already completed",
+)
+@click.option(
+    "--events-file",
+    "events_file",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Append every sync event with timestamps to this JSONL file (see 'analyze')",
+)
+@click.option(
+    "--timings",
+    "do_timings",
+    is_flag=True,
+    help="Print how long each phase took (scanning, DAT parsing, requests, uploads) after the run",
+)
+@click.option(
+    "--profile",
+    "profile_file",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Profile the run, write a .prof file and a .collapsed flamegraph file next to it",
+)
+@click.option(
+    "--profile-phase",
+    "profile_phases",
+    multiple=True,
+    help="Only profile matching phases, e.g. 'plan', 'psx/Update Playlist' or '*/Sync ROMs'",
+)
+@click.option(
+    "--profile-top",
+    default=PROFILE_TOP,
+    show_default=True,
+    help="Number of hot functions printed after a profiled run",
+)
 @click.option("--yes", is_flag=True, help="Skip prompt inputs by saying yes to everything")
 def main(
     do_all,
@@ -373,6 +442,14 @@ def main(
     dry_run,
     do_debug,
     force_transport,
+    plan_out,
+    plan_in,
+    do_resume,
+    events_file,
+    do_timings,
+    profile_file,
+    profile_phases,
+    profile_top,
     yes,
 ):
     global logger
@@ -393,6 +470,21 @@ def main(
         logger = logging.getLogger()
         logger.disabled = True
 
+    sync_plan = None
+    if plan_in:
+        try:
+            sync_plan = SyncPlan.load(plan_in)
+        except ValueError as exc:
+            print(str(exc))
+            sys.exit(-1)
+        do_sync_playlists = sync_plan.options.get("do_sync_playlists", False)
+        do_sync_bios = sync_plan.options.get("do_sync_bios", False)
+        do_sync_favorites = sync_plan.options.get("do_sync_favorites", False)
+        do_sync_thumbails = sync_plan.options.get("do_sync_thumbnails", False)
+        do_sync_roms = sync_plan.options.get("do_sync_roms", False)
+        do_update_playlists = sync_plan.options.get("do_update_playlists", False)
+        system_name = None
+
     if do_all:
         do_sync_playlists = do_sync_roms = do_sync_bios = do_sync_favorites = do_sync_thumbails = (
             do_update_playlists
@@ -407,6 +499,7 @@ def main(
             do_sync_thumbails,
             do_update_playlists,
             do_playlist_list,
+            do_resume,
         ]
     ):
         click.echo(click.get_current_context().get_help())
@@ -421,16 +514,45 @@ def main(
             normalize_transport_config(config, transport_override=normalized_transport_override)
         )
         playlists = normalize_playlists(config.get("playlists", []))
-        validate_runtime_config(
-            default,
-            playlists,
-            do_sync_playlists=do_sync_playlists,
-            do_sync_bios=do_sync_bios,
-            do_sync_favorites=do_sync_favorites,
-            do_sync_thumbnails=do_sync_thumbails,
-            do_sync_roms=do_sync_roms,
-            do_update_playlists=do_update_playlists,
-        )
+        targets = resolve_targets(config, default)
+        if targets and (plan_in or plan_out):
+            raise ValueError("--plan-in and --plan-out cannot be combined with [[targets]].")
+        resume_state = None
+        if do_resume:
+            for target_default in [target_default for _, target_default in targets] or [default]:
+                journal = RunJournal.from_config(target_default)
+                resume_state = journal.resume_state() if journal is not None else None
+                if resume_state is not None:
+                    break
+            if resume_state is None:
+                print("No interrupted run to resume.")
+                sys.exit(-1)
+            if not targets:
+                sync_plan = resume_state.plan
+            options = resume_state.plan.options
+            do_sync_playlists = options.get("do_sync_playlists", False)
+            do_sync_bios = options.get("do_sync_bios", False)
+            do_sync_favorites = options.get("do_sync_favorites", False)
+            do_sync_thumbails = options.get("do_sync_thumbnails", False)
+            do_sync_roms = options.get("do_sync_roms", False)
+            do_update_playlists = options.get("do_update_playlists", False)
+            system_name = None
+        for target_name, target_default in targets or [(None, default)]:
+            try:
+                validate_runtime_config(
+                    target_default,
+                    playlists,
+                    do_sync_playlists=do_sync_playlists,
+                    do_sync_bios=do_sync_bios,
+                    do_sync_favorites=do_sync_favorites,
+                    do_sync_thumbnails=do_sync_thumbails,
+                    do_sync_roms=do_sync_roms,
+                    do_update_playlists=do_update_playlists,
+                )
+            except ValueError as exc:
+                if target_name is None:
+                    raise
+                raise ValueError(f"Target '{target_name}': {exc}") from exc
     except ValueError as exc:
         print(str(exc))
         sys.exit(-1)
@@ -463,21 +585,18 @@ def main(
                 sys.exit(-1)
             system_name = matches[selected - 1]
 
+    event_sink = EventBus(JsonlEventSink(events_file)) if events_file else None
+    profiler = None
+    if profile_file:
+        profiler = start_profiler(RunProfiler(profile_file, phases=profile_phases, top=profile_top))
     try:
-        transport = TransportFactory(default, dry_run, force_transport)
-        runner = SyncRunner(
-            default=default,
-            playlists=playlists,
-            transport=transport,
-            reporter=CliRichReporter(),
-            job_registry=JobRegistry(
-                bios_sync=BiosSync,
-                favorites_sync=FavoritesSync,
-                thumbnails_sync=ThumbnailsSync,
-                playlist_sync_job=PlaylistSyncJob,
-                playlist_update_job=PlaylistUpdateJob,
-                rom_sync_job=RomSyncJob,
-            ),
+        job_registry = JobRegistry(
+            bios_sync=BiosSync,
+            favorites_sync=FavoritesSync,
+            thumbnails_sync=ThumbnailsSync,
+            playlist_sync_job=PlaylistSyncJob,
+            playlist_update_job=PlaylistUpdateJob,
+            rom_sync_job=RomSyncJob,
         )
         run_cfg = SyncRunConfig(
             do_sync_playlists=do_sync_playlists,
@@ -488,12 +607,83 @@ def main(
             do_update_playlists=do_update_playlists,
             dry_run=dry_run,
             do_debug=do_debug,
+            do_timings=do_timings,
+        )
+        if targets:
+            FanOutRunner(
+                targets=[
+                    SyncTarget(
+                        name=target_name,
+                        default=target_default,
+                        transport=TransportFactory(target_default, dry_run, force_transport),
+                    )
+                    for target_name, target_default in targets
+                ],
+                playlists=playlists,
+                reporter=CliRichReporter(),
+                job_registry=job_registry,
+                event_sink=event_sink,
+            ).run(run_cfg, system_name=system_name, resume=do_resume)
+            return
+        runner = SyncRunner(
+            default=default,
+            playlists=playlists,
+            transport=TransportFactory(default, dry_run, force_transport),
+            reporter=CliRichReporter(),
+            job_registry=job_registry,
+            event_sink=event_sink,
         )
-        runner.run(run_cfg, system_name=system_name)
+        if plan_out:
+            sync_plan = runner.plan(run_cfg, system_name=system_name)
+            sync_plan.save(plan_out)
+            print(sync_plan.format_diff())
+            print(
+                f"Sync plan written to {plan_out} "
+                f"(planning took {sync_plan.planning_seconds:.2f}s)."
+            )
+            return
+        runner.run(run_cfg, system_name=system_name, plan=sync_plan, resume=resume_state)
     except (SyncAbortError, TransportError) as exc:
         print(str(exc))
         sys.exit(-1)
+    finally:
+        if event_sink is not None:
+            event_sink.close()
+        if profiler is not None:
+            stop_profiler()
+            collapsed = profiler.write()
+            top = profiler.format_top()
+            if top:
+                print(top)
+            print(f"Profile written to {profiler.output} and {collapsed}.")
+
+
+@click.command()
+@click.argument(
+    "event_files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option("--top", default=10, show_default=True, help="Number of slowest files to list")
+@click.option("--diff", "do_diff", is_flag=True, help="Compare the last two runs in the logs")
+def analyze(event_files, top, do_diff):
+    runs = load_runs(event_files)
+    if not runs:
+        print("No runs found in the event logs.")
+        sys.exit(-1)
+    if do_diff:
+        if len(runs) < 2:
+            print("Two runs are needed for --diff.")
+            sys.exit(-1)
+        print(format_diff(runs[-2], runs[-1]))
+        return
+    print("\n\n".join(format_report(run, top=top) for run in runs))
+
+
+def cli():
+    if len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        analyze(args=sys.argv[2:], prog_name=f"{sys.argv[0]} analyze")
+    else:
+        main()
 
 
 if __name__ == "__main__":
-    main()
+    cli()
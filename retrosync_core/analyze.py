@@ -0,0 +1,190 @@
+from dataclasses import dataclass, field
+
+from .events import EventType, read_events
+from .runner import format_transfer_size
+
+RUN_OUTCOMES = {
+    EventType.RUN_FINISHED.value: "finished",
+    EventType.RUN_FAILED.value: "failed",
+    EventType.RUN_CANCELLED.value: "cancelled",
+}
+
+
+@dataclass
+class SpanStats:
+    name: str
+    started: float | None = None
+    finished: float | None = None
+    bytes: int = 0
+    files: int = 0
+    retries: int = 0
+
+    @property
+    def seconds(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def rate(self):
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class RunStats:
+    run_id: str
+    target: str | None = None
+    outcome: str = "incomplete"
+    span: SpanStats = field(default_factory=lambda: SpanStats("run"))
+    systems: dict = field(default_factory=dict)
+    jobs: dict = field(default_factory=dict)
+    files: list = field(default_factory=list)
+
+    @property
+    def seconds(self):
+        return self.span.seconds
+
+    @property
+    def retries(self):
+        return sum(job.retries for job in self.jobs.values())
+
+    @property
+    def label(self):
+        return f"{self.target}:{self.run_id[:8]}" if self.target else self.run_id[:8]
+
+
+def _job_key(event):
+    if event.get("system"):
+        return f"{event['system']}/{event['job']}"
+    return event.get("job") or ""
+
+
+def analyze_events(events):
+    runs = {}
+    streamed = {}
+    for event in events:
+        run = runs.get(event["run_id"])
+        if run is None:
+            run = runs[event["run_id"]] = RunStats(run_id=event["run_id"])
+        data = event.get("data") or {}
+        run.target = run.target or data.get("target")
+        kind = event["event_type"]
+        ts = event["ts"]
+        if kind == EventType.RUN_STARTED.value:
+            run.span.started = ts
+        elif kind in RUN_OUTCOMES:
+            run.span.finished = ts
+            run.outcome = RUN_OUTCOMES[kind]
+        elif kind == EventType.SYSTEM_STARTED.value:
+            run.systems.setdefault(event["system"], SpanStats(event["system"])).started = ts
+        elif kind == EventType.SYSTEM_FINISHED.value:
+            run.systems.setdefault(event["system"], SpanStats(event["system"])).finished = ts
+        elif kind in (EventType.JOB_STARTED.value, EventType.STEP_STARTED.value):
+            key = _job_key(event)
+            run.jobs.setdefault(key, SpanStats(key)).started = ts
+        elif kind in (EventType.JOB_FINISHED.value, EventType.STEP_FINISHED.value):
+            key = _job_key(event)
+            run.jobs.setdefault(key, SpanStats(key)).finished = ts
+        elif kind == EventType.TRANSFER_BYTES.value:
+            streamed[(run.run_id, _job_key(event))] = data.get("bytes", 0)
+        elif kind == EventType.TRANSFER_RETRIED.value:
+            key = _job_key(event)
+            run.jobs.setdefault(key, SpanStats(key)).retries += 1
+        elif kind == EventType.FILE_TRANSFERRED.value:
+            key = _job_key(event)
+            job = run.jobs.setdefault(key, SpanStats(key))
+            job.files += 1
+            job.bytes += data.get("bytes", 0)
+            run.files.append((data.get("path"), data.get("bytes", 0), data.get("seconds", 0.0)))
+
+    for (run_id, key), sent in streamed.items():
+        job = runs[run_id].jobs.setdefault(key, SpanStats(key))
+        # rsync only streams byte counts, without a per-file event.
+        job.bytes = max(job.bytes, sent)
+    for run in runs.values():
+        for key, job in run.jobs.items():
+            system = key.partition("/")[0] if "/" in key else None
+            if system in run.systems:
+                run.systems[system].bytes += job.bytes
+                run.systems[system].files += job.files
+                run.systems[system].retries += job.retries
+        run.span.bytes = sum(job.bytes for job in run.jobs.values())
+        run.span.files = sum(job.files for job in run.jobs.values())
+    return list(runs.values())
+
+
+def load_runs(paths):
+    events = []
+    for path in paths:
+        events.extend(read_events(path))
+    events.sort(key=lambda event: event["ts"])
+    return analyze_events(events)
+
+
+def format_rate(rate):
+    return f"{rate / 1024**2:.2f} MB/s"
+
+
+def _span_line(span):
+    return (
+        f"  {span.name:<32} {span.seconds:>9.2f}s {format_transfer_size(span.bytes):>10} "
+        f"{format_rate(span.rate):>12} {span.files:>7} {span.retries:>7}"
+    )
+
+
+def format_report(run: RunStats, top=10):
+    lines = [
+        f"Run {run.label} ({run.outcome}): {run.seconds:.2f}s, "
+        f"{format_transfer_size(run.span.bytes)} in {run.span.files} files, "
+        f"{format_rate(run.span.rate)}, {run.retries} retries"
+    ]
+    header = f"  {'':<32} {'time':>10} {'bytes':>10} {'rate':>12} {'files':>7} {'retries':>7}"
+    for title, spans in (("Systems", run.systems), ("Jobs", run.jobs)):
+        if not spans:
+            continue
+        lines.append(f"{title}:")
+        lines.append(header)
+        for span in sorted(spans.values(), key=lambda item: item.seconds, reverse=True):
+            lines.append(_span_line(span))
+    slowest = sorted(run.files, key=lambda item: item[2], reverse=True)[:top]
+    if slowest:
+        lines.append(f"Slowest files (top {len(slowest)}):")
+        for path, size, seconds in slowest:
+            rate = size / seconds if seconds > 0 else 0.0
+            lines.append(
+                f"  {seconds:>9.2f}s {format_transfer_size(size):>10} {format_rate(rate):>12}"
+                f"  {path}"
+            )
+    return "\n".join(lines)
+
+
+def _change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def format_diff(before: RunStats, after: RunStats):
+    lines = [
+        f"Run {before.label} -> {after.label}: "
+        f"time {before.seconds:.2f}s -> {after.seconds:.2f}s ({_change(before.seconds, after.seconds)}), "
+        f"rate {format_rate(before.span.rate)} -> {format_rate(after.span.rate)} "
+        f"({_change(before.span.rate, after.span.rate)}), "
+        f"retries {before.retries} -> {after.retries}"
+    ]
+    for title, attr in (("Systems", "systems"), ("Jobs", "jobs")):
+        old = getattr(before, attr)
+        new = getattr(after, attr)
+        names = list(dict.fromkeys([*old, *new]))
+        if not names:
+            continue
+        lines.append(f"{title}:")
+        for name in names:
+            a = old.get(name, SpanStats(name))
+            b = new.get(name, SpanStats(name))
+            lines.append(
+                f"  {name:<32} {a.seconds:>9.2f}s -> {b.seconds:>9.2f}s "
+                f"{_change(a.seconds, b.seconds):>8}  "
+                f"{format_rate(a.rate):>12} -> {format_rate(b.rate):>12}"
+            )
+    return "\n".join(lines)
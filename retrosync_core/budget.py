@@ -0,0 +1,147 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .references import referenced_files
+
+logger = logging.getLogger()
+
+FAVORITES_PLAYLIST = "content_favorites.lpl"
+
+
+@dataclass(frozen=True)
+class BudgetCandidate:
+    playlist: str
+    # Relative to the playlist's source folder, like the paths of a JobPlan.
+    path: str
+    # The entry itself and the files it references, like the tracks of a cue sheet.
+    files: tuple[str, ...]
+    size: int
+    priority: int = 0
+    favorite: bool = False
+
+
+@dataclass
+class BudgetSelection:
+    budget: int
+    used: int = 0
+    selected: dict[str, list[str]] = field(default_factory=dict)
+    skipped_entries: int = 0
+    skipped_bytes: int = 0
+
+    def paths(self, playlist_name):
+        return self.selected.get(playlist_name, [])
+
+    @property
+    def file_count(self):
+        return sum(len(paths) for paths in self.selected.values())
+
+
+def budget_bytes(default):
+    value = default.get("budget_mb")
+    if value is None or value == "":
+        return None
+    return int(float(value) * 1024**2)
+
+
+def rom_relative_path(path, rom_dirs):
+    path = Path(str(path).split("#")[0])
+    for rom_dir in rom_dirs:
+        try:
+            return path.relative_to(rom_dir).as_posix()
+        except ValueError:
+            continue
+    return None
+
+
+def load_playlist_items(path):
+    try:
+        with open(path) as fd:
+            return json.load(fd).get("items", [])
+    except (OSError, ValueError) as exc:
+        logger.debug("budget: cannot read playlist %s: %s", path, exc)
+        return []
+
+
+def favorite_paths(default):
+    src_config = default.get("src_config")
+    if not src_config:
+        return set()
+    items = load_playlist_items(Path(src_config) / FAVORITES_PLAYLIST)
+    return {str(Path(item.get("path", "").split("#")[0])) for item in items}
+
+
+def playlist_candidates(default, playlist, rom_root, favorites=frozenset()):
+    # Only the entries of the playlist are looked at; the ROM folder itself is never listed.
+    name = playlist.get("name")
+    rom_dir = Path(rom_root) / playlist.get("src_folder")
+    priority = int(playlist.get("priority", 0) or 0)
+    candidates = {}
+    for item in load_playlist_items(Path(default.get("src_playlists")) / name):
+        src_path = str(Path(item.get("path", "").split("#")[0]))
+        rel = rom_relative_path(src_path, [rom_dir])
+        if rel is None or rel in candidates:
+            continue
+        files = referenced_files(rom_dir, rel)
+        if rel not in files:
+            logger.debug("budget: %s from %s is missing", src_path, name)
+            continue
+        candidates[rel] = BudgetCandidate(
+            playlist=name,
+            path=rel,
+            files=tuple(files),
+            size=sum(files.values()),
+            priority=priority,
+            favorite=src_path in favorites,
+        )
+    return list(candidates.values())
+
+
+def referenced_paths(default, playlist, rom_root):
+    paths = set()
+    for candidate in playlist_candidates(default, playlist, rom_root):
+        paths.update(candidate.files)
+    return sorted(paths)
+
+
+def select_within_budget(candidates, budget, favorites_first=True):
+    # Every game is worth the same inside a tier, so taking the smallest files first fits the
+    # most of them. A file that does not fit is skipped and the smaller ones of the next tiers
+    # still get their chance.
+    def order(candidate):
+        tier = (not candidate.favorite) if favorites_first else False
+        return (tier, -candidate.priority, candidate.size, candidate.playlist, candidate.path)
+
+    selection = BudgetSelection(budget=budget)
+    for candidate in sorted(candidates, key=order):
+        if selection.used + candidate.size > budget:
+            selection.skipped_entries += 1
+            selection.skipped_bytes += candidate.size
+            continue
+        selection.used += candidate.size
+        selection.selected.setdefault(candidate.playlist, []).extend(candidate.files)
+    for playlist, paths in selection.selected.items():
+        selection.selected[playlist] = sorted(set(paths))
+    return selection
+
+
+def plan_budget(default, playlists, rom_root):
+    budget = budget_bytes(default)
+    if budget is None:
+        return None
+    favorites_first = bool(default.get("budget_favorites_first", True))
+    favorites = favorite_paths(default) if favorites_first else set()
+    candidates = []
+    for playlist in playlists:
+        candidates.extend(playlist_candidates(default, playlist, rom_root, favorites))
+    selection = select_within_budget(candidates, budget, favorites_first=favorites_first)
+    logger.debug(
+        "budget: %s files of %s entries fit in %s bytes (%s bytes used, %s entries skipped)",
+        selection.file_count,
+        len(candidates),
+        budget,
+        selection.used,
+        selection.skipped_entries,
+    )
+    return selection
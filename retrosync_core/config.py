@@ -4,6 +4,7 @@ import Levenshtein
 from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
 from .paths import expand_user_path, expand_user_path_list, retroarch_derived_paths
+from .transform import THUMBNAIL_FORMATS
 
 
 class RuntimeConfigModel(BaseModel):
@@ -29,6 +30,29 @@ class RuntimeConfigModel(BaseModel):
     target_roms: str | None = None
     target_cores: str | None = None
     target_cores_suffix: str | None = None
+    dedup: bool = False
+    dedup_min_size: int | None = None
+    dedup_link: str | None = None
+    cache_dir: str | None = None
+    delta_transfer: bool = False
+    delta_min_size: int | None = None
+    delta_block_size: int | None = None
+    webdav_partial_put: bool = True
+    upload_small_file_size: int | None = None
+    upload_small_interleave: int | None = None
+    parallel_systems: int | None = None
+    parallel_transfers: int | None = None
+    parallel_global_jobs: bool = False
+    job_workers: int | None = None
+    journal: bool = True
+    budget_mb: float | None = None
+    budget_favorites_first: bool = True
+    roms_referenced_only: bool = False
+    thumbnails_referenced_only: bool = False
+    thumbnail_max_size: int | None = None
+    thumbnail_format: str = "png"
+    transform_workers: int | None = None
+    repack_zip: bool = False
 
 
 class PlaylistConfigModel(BaseModel):
@@ -39,6 +63,9 @@ class PlaylistConfigModel(BaseModel):
     dest_folder: str | None = None
     src_core_path: str | None = None
     src_core_name: str | None = None
+    priority: int = 0
+    roms_referenced_only: bool | None = None
+    repack_zip: bool | None = None
     disabled: bool = False
 
 
@@ -165,6 +192,7 @@ def expand_config(default):
         "dest_config",
         "dest_roms",
         "dest_thumbnails",
+        "cache_dir",
     ]:
         if default.get(item) is not None:
             default[item] = expand_user_path(default.get(item))
@@ -192,6 +220,7 @@ def normalize_transport_config(config, transport_override=None):
         "hostname": ssh,
         "username": ssh,
         "password": ssh,
+        "port": ssh,
     }
     for item, section in section_map.items():
         if item in section:
@@ -209,6 +238,26 @@ def normalize_transport_config(config, transport_override=None):
     return default
 
 
+def resolve_targets(config, default):
+    targets = []
+    seen = set()
+    for idx, target in enumerate(config.get("targets", []), start=1):
+        name = str(target.get("name", "")).strip()
+        if not name:
+            raise ValueError(f"[targets][{idx}] 'name' is required")
+        if name in seen:
+            raise ValueError(f"[targets][{idx}] duplicate target name '{name}'")
+        seen.add(name)
+        if target.get("disabled", False):
+            continue
+        merged = dict(default)
+        merged.update({key: value for key, value in target.items() if key != "disabled"})
+        merged["target"] = name
+        merged["transport"] = str(merged.get("transport", "filesystem")).strip().lower()
+        targets.append((name, expand_config(merged)))
+    return targets
+
+
 def normalize_playlists(playlists):
     for playlist in playlists:
         if playlist.get("dest_folder") is None:
@@ -267,6 +316,26 @@ def validate_runtime_config(
     elif runtime.transport == "webdav":
         require_default("host", "WebDAV transport")
 
+    if runtime.dedup_link is not None and runtime.dedup_link not in {"reflink", "hardlink"}:
+        errors.append("[default] 'dedup_link' must be 'reflink' or 'hardlink'")
+
+    if runtime.thumbnail_format not in THUMBNAIL_FORMATS:
+        errors.append("[default] 'thumbnail_format' must be 'png' or 'png8'")
+
+    for key in (
+        "parallel_systems",
+        "parallel_transfers",
+        "job_workers",
+        "thumbnail_max_size",
+        "transform_workers",
+    ):
+        value = getattr(runtime, key)
+        if value is not None and value < 1:
+            errors.append(f"[default] '{key}' must be at least 1")
+
+    if runtime.budget_mb is not None and runtime.budget_mb <= 0:
+        errors.append("[default] 'budget_mb' must be greater than 0")
+
     if do_sync_bios:
         require_default("src_bios", "--sync-bios")
         require_default("dest_bios", "--sync-bios")
@@ -287,6 +356,8 @@ def validate_runtime_config(
     if do_sync_thumbnails:
         require_default("src_thumbnails", "--sync-thumbnails")
         require_default("dest_thumbnails", "--sync-thumbnails")
+        if runtime.thumbnails_referenced_only:
+            require_default("src_playlists", "thumbnails_referenced_only")
 
     if needs_system_jobs and parsed_playlists:
         require_playlist_attr("name", "system jobs")
@@ -0,0 +1,153 @@
+import concurrent.futures
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+logger = logging.getLogger()
+
+
+@dataclass
+class JobNode:
+    key: str
+    run: Callable[[], None]
+    needs: tuple = ()
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def seconds(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+@dataclass
+class DagResult:
+    nodes: list = field(default_factory=list)
+
+    def critical_path(self):
+        by_key = {node.key: node for node in self.nodes}
+        length = {}
+        previous = {}
+        for node in self.nodes:
+            best = None
+            for key in node.needs:
+                if best is None or length[key] > length[best]:
+                    best = key
+            length[node.key] = node.seconds + (length[best] if best is not None else 0.0)
+            previous[node.key] = best
+        if not length:
+            return []
+        key = max(length, key=lambda item: length[item])
+        path = []
+        while key is not None:
+            path.append(by_key[key])
+            key = previous[key]
+        return list(reversed(path))
+
+
+def resolve_dependencies(nodes, inputs, outputs):
+    # inputs/outputs map a node key to the resources it reads or writes. A node needs every
+    # node listed before it that writes one of its inputs.
+    producers = {}
+    for node in nodes:
+        node.needs = tuple(
+            dict.fromkeys(
+                list(node.needs)
+                + [
+                    key
+                    for resource in inputs.get(node.key, ())
+                    for key in producers.get(resource, [])
+                ]
+            )
+        )
+        for resource in outputs.get(node.key, ()):
+            producers.setdefault(resource, []).append(node.key)
+    return nodes
+
+
+def order_nodes(nodes):
+    keys = {node.key for node in nodes}
+    for node in nodes:
+        for key in node.needs:
+            if key not in keys:
+                raise ValueError(f"Job '{node.key}' depends on unknown job '{key}'.")
+    ordered = []
+    done = set()
+    pending = list(nodes)
+    while pending:
+        ready = [node for node in pending if all(key in done for key in node.needs)]
+        if not ready:
+            raise ValueError(
+                "Job dependencies contain a cycle: " + ", ".join(node.key for node in pending)
+            )
+        for node in ready:
+            ordered.append(node)
+            done.add(node.key)
+        pending = [node for node in pending if node.key not in done]
+    return ordered
+
+
+class DagExecutor:
+    def __init__(self, nodes, workers=1, cancel=None):
+        self.nodes = order_nodes(nodes)
+        self.workers = max(1, int(workers))
+        self.cancel = cancel
+
+    def _run_node(self, node):
+        node.started = time.monotonic()
+        try:
+            node.run()
+        finally:
+            node.finished = time.monotonic()
+            logger.debug("DagExecutor::_run_node: %s took %.2fs", node.key, node.seconds)
+
+    def run(self):
+        waiting = {node.key: set(node.needs) for node in self.nodes}
+        dependents = {node.key: [] for node in self.nodes}
+        for node in self.nodes:
+            for key in node.needs:
+                dependents[key].append(node)
+        ready = [node for node in self.nodes if not node.needs]
+        running = {}
+        error = None
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="sync-job"
+        )
+        try:
+            while ready or running:
+                # Ready jobs keep their declaration order, so a single worker runs them in
+                # the same order as the fixed pipeline.
+                while ready and error is None and len(running) < self.workers:
+                    node = ready.pop(0)
+                    running[executor.submit(self._run_node, node)] = node
+                if not running:
+                    break
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    node = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        if error is None:
+                            error = exc
+                            if self.cancel is not None:
+                                self.cancel(str(exc) or "Stopping workers...")
+                        continue
+                    for dependent in dependents[node.key]:
+                        waiting[dependent.key].discard(node.key)
+                        if not waiting[dependent.key]:
+                            ready.append(dependent)
+                    ready.sort(key=self.nodes.index)
+        except BaseException as exc:
+            if self.cancel is not None:
+                self.cancel(str(exc) or "Stopping workers...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+        if error is not None:
+            raise error
+        return DagResult(nodes=[node for node in self.nodes if node.finished is not None])
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from .paths import default_cache_dir
+
+logger = logging.getLogger()
+
+DEFAULT_DELTA_BLOCK_SIZE = 1024 * 1024
+DEFAULT_DELTA_MIN_SIZE = 64 * 1024 * 1024
+DELTA_MAX_RANGE_SIZE = 8 * 1024 * 1024
+# Above this share of changed bytes a plain upload is as cheap as patching.
+DELTA_MAX_CHANGED_RATIO = 0.5
+
+
+def block_digests(path: Path, block_size=DEFAULT_DELTA_BLOCK_SIZE):
+    blocks = []
+    with open(path, "rb") as fd:
+        while chunk := fd.read(block_size):
+            blocks.append(hashlib.blake2b(chunk, digest_size=16).hexdigest())
+    return blocks
+
+
+def changed_ranges(old_blocks, new_blocks, block_size, file_size, max_length=DELTA_MAX_RANGE_SIZE):
+    ranges = []
+    for idx, digest in enumerate(new_blocks):
+        if idx < len(old_blocks) and old_blocks[idx] == digest:
+            continue
+        offset = idx * block_size
+        length = min(block_size, file_size - offset)
+        if (
+            ranges
+            and ranges[-1][0] + ranges[-1][1] == offset
+            and ranges[-1][1] + length <= max_length
+        ):
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+        else:
+            ranges.append((offset, length))
+    return ranges
+
+
+def read_range(path: Path, offset, length):
+    with open(path, "rb") as fd:
+        fd.seek(offset)
+        return fd.read(length)
+
+
+class BlockSignatureCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self.path) as fd:
+                self._entries = json.load(fd)
+        except (OSError, ValueError):
+            self._entries = {}
+        return self._entries
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key, size, block_size, blocks):
+        with self._lock:
+            self._load()[key] = {"size": size, "block_size": block_size, "blocks": blocks}
+            self._dirty = True
+
+    def discard(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(
+                f".{self.path.name}.{os.getpid()}-{threading.get_ident()}.tmp"
+            )
+            with open(tmp_path, "w") as fd:
+                json.dump(self._entries, fd)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+class DeltaSync:
+    def __init__(self, cache, *, namespace, block_size, min_size):
+        self.cache = cache
+        self.namespace = namespace
+        self.block_size = block_size
+        self.min_size = min_size
+        self.bytes_skipped = 0
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, default, namespace):
+        if not default.get("delta_transfer", False):
+            return None
+        cache_dir = Path(default.get("cache_dir") or default_cache_dir())
+        # Fan-out targets run on their own threads, so each keeps its own file.
+        if default.get("target"):
+            cache_path = cache_dir / f"block-signatures-{default['target']}.json"
+        else:
+            cache_path = cache_dir / "block-signatures.json"
+        return cls(
+            BlockSignatureCache(cache_path),
+            namespace=namespace,
+            block_size=int(default.get("delta_block_size", DEFAULT_DELTA_BLOCK_SIZE)),
+            min_size=int(default.get("delta_min_size", DEFAULT_DELTA_MIN_SIZE)),
+        )
+
+    def applies_to(self, file_size):
+        return file_size >= self.min_size
+
+    def key(self, remote_path):
+        return f"{self.namespace}:{remote_path}"
+
+    def plan(self, remote_path, src_filename: Path, remote_size=None):
+        new_blocks = block_digests(src_filename, self.block_size)
+        signature = self.cache.get(self.key(remote_path))
+        if signature is None or signature.get("block_size") != self.block_size:
+            return None, new_blocks
+        if remote_size is not None and remote_size != signature.get("size"):
+            logger.debug(
+                "DeltaSync::plan: remote size changed for %s (cached=%s remote=%s)",
+                remote_path,
+                signature.get("size"),
+                remote_size,
+            )
+            return None, new_blocks
+        file_size = src_filename.stat().st_size
+        ranges = changed_ranges(signature["blocks"], new_blocks, self.block_size, file_size)
+        changed = sum(length for _, length in ranges)
+        logger.debug(
+            "DeltaSync::plan: %s changed_ranges=%s changed_bytes=%s of %s",
+            remote_path,
+            len(ranges),
+            changed,
+            file_size,
+        )
+        if changed > file_size * DELTA_MAX_CHANGED_RATIO:
+            return None, new_blocks
+        return ranges, new_blocks
+
+    def commit(self, remote_path, src_filename: Path, blocks, ranges=None):
+        file_size = src_filename.stat().st_size
+        if ranges is not None:
+            with self._stats_lock:
+                self.bytes_skipped += file_size - sum(length for _, length in ranges)
+        self.cache.put(self.key(remote_path), file_size, self.block_size, blocks)
+
+    def forget(self, remote_path):
+        self.cache.discard(self.key(remote_path))
+
+    def flush(self):
+        self.cache.flush()
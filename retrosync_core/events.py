@@ -1,8 +1,19 @@
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field, replace
 from enum import Enum
+import json
+import logging
+from pathlib import Path
+import queue
+import threading
 import time
 from typing import Any, Protocol
 
+logger = logging.getLogger()
+
+EVENT_QUEUE_SIZE = 10000
+EVENT_COALESCE_SECONDS = 0.25
+EVENT_FILE_BUFFER = 256
+
 
 class EventType(str, Enum):
     RUN_STARTED = "run_started"
@@ -19,6 +30,9 @@ class EventType(str, Enum):
     TRANSFER_STARTED = "transfer_started"
     TRANSFER_ADVANCED = "transfer_advanced"
     TRANSFER_FINISHED = "transfer_finished"
+    TRANSFER_BYTES = "transfer_bytes"
+    TRANSFER_RETRIED = "transfer_retried"
+    FILE_TRANSFERRED = "file_transferred"
     SUMMARY_EMITTED = "summary_emitted"
 
 
@@ -53,3 +67,155 @@ class MemoryEventSink:
 
     def emit(self, event: SyncEvent) -> None:
         self.events.append(event)
+
+
+def event_to_dict(event: SyncEvent):
+    record = asdict(event)
+    record["event_type"] = event.event_type.value
+    return record
+
+
+def read_events(path):
+    events = []
+    with open(path) as fd:
+        for line in fd:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # An interrupted run can leave a torn last line behind.
+                logger.debug("read_events: skipping unreadable line in %s", path)
+    return events
+
+
+class JsonlEventSink:
+    def __init__(self, path, buffer_records=EVENT_FILE_BUFFER):
+        self.path = Path(path)
+        self.buffer_records = buffer_records
+        self._lock = threading.Lock()
+        self._lines = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = open(self.path, "a")
+
+    def emit(self, event: SyncEvent) -> None:
+        line = json.dumps(event_to_dict(event), default=str)
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) >= self.buffer_records:
+                self._write()
+
+    def _write(self):
+        if self._fd is None or not self._lines:
+            return
+        self._fd.write("\n".join(self._lines) + "\n")
+        self._lines = []
+
+    def flush(self):
+        with self._lock:
+            self._write()
+            if self._fd is not None:
+                self._fd.flush()
+
+    def close(self):
+        with self._lock:
+            self._write()
+            if self._fd is not None:
+                self._fd.close()
+                self._fd = None
+
+
+COALESCED_EVENTS = (EventType.TRANSFER_ADVANCED, EventType.TRANSFER_BYTES)
+
+
+class EventBus:
+    # Hands events to a background thread so a slow sink does not hold up transfers.
+    # Per-file advance and byte events are merged into one event per job and time window.
+    def __init__(self, sink, maxsize=EVENT_QUEUE_SIZE, window=EVENT_COALESCE_SECONDS):
+        self.sink = sink
+        self.window = window
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending = {}
+        self._pending_since = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._drain, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: SyncEvent) -> None:
+        if self._closed:
+            self._deliver(event)
+            return
+        # A full queue blocks the producer instead of losing events.
+        self._queue.put(event)
+
+    def flush(self):
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        close = getattr(self.sink, "close", None)
+        if callable(close):
+            close()
+
+    def _deliver(self, event):
+        try:
+            self.sink.emit(event)
+        except Exception:
+            logger.debug("EventBus::_deliver: sink failed for %s", event.event_type, exc_info=True)
+
+    def _coalesce(self, event):
+        key = (event.run_id, event.event_type, event.system, event.job, event.step)
+        pending = self._pending.get(key)
+        if pending is not None and event.event_type == EventType.TRANSFER_ADVANCED:
+            event = replace(event, advance=(pending.advance or 0) + (event.advance or 0))
+        self._pending[key] = event
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def _flush_pending(self):
+        pending = list(self._pending.values())
+        self._pending = {}
+        self._pending_since = None
+        for event in pending:
+            self._deliver(event)
+
+    def _drain(self):
+        while True:
+            timeout = None
+            if self._pending_since is not None:
+                timeout = self._pending_since + self.window - time.monotonic()
+                if timeout <= 0:
+                    self._flush_pending()
+                    timeout = None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush_pending()
+                continue
+            if item is None:
+                self._flush_pending()
+                return
+            if isinstance(item, threading.Event):
+                try:
+                    self._flush_pending()
+                    flush = getattr(self.sink, "flush", None)
+                    if callable(flush):
+                        flush()
+                except Exception:
+                    logger.debug("EventBus::_drain: sink flush failed", exc_info=True)
+                finally:
+                    item.set()
+                continue
+            if item.event_type in COALESCED_EVENTS:
+                self._coalesce(item)
+                continue
+            # Keep the order of merged events relative to everything else.
+            self._flush_pending()
+            self._deliver(item)
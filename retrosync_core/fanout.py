@@ -0,0 +1,238 @@
+import concurrent.futures
+import logging
+from dataclasses import dataclass, replace
+
+from .events import EventType, NullEventSink
+from .inventory import SourceInventoryCache
+from .journal import RunJournal
+from .runner import (
+    CancelToken,
+    JobRegistry,
+    SerializedReporter,
+    SyncAbortError,
+    SyncReporter,
+    SyncRunConfig,
+    SyncRunner,
+)
+from .timing import span, start_timings, stop_timings
+
+logger = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class SyncTarget:
+    name: str
+    default: dict
+    transport: object
+
+
+class TargetEventSink:
+    def __init__(self, sink, target):
+        self.sink = sink
+        self.target = target
+        self.summary = None
+
+    def emit(self, event):
+        if event.event_type == EventType.SUMMARY_EMITTED:
+            self.summary = event
+        self.sink.emit(replace(event, data={**event.data, "target": self.target}))
+
+    def flush(self):
+        flush = getattr(self.sink, "flush", None)
+        if callable(flush):
+            flush()
+
+
+class TargetReporter:
+    # The overall bar and the file bar are owned by the fan-out runner; a single file bar
+    # cannot show the transfers of several targets at once.
+    def __init__(self, reporter: SyncReporter, target):
+        self._reporter = reporter
+        self.target = target
+
+    def start(self, *, overall_total, supports_per_file_progress):
+        pass
+
+    def finish(self):
+        pass
+
+    def update_overall(self, *, description=None, advance=0):
+        pass
+
+    def add_current_task(self, description):
+        return self._reporter.add_current_task(f"[{self.target}] {description}")
+
+    def stop_current_task(self, task_id, *, description):
+        self._reporter.stop_current_task(task_id, description=f"[{self.target}] {description}")
+
+    def add_system_steps(self, *, name, total):
+        return self._reporter.add_system_steps(name=f"{self.target}: {name}", total=total)
+
+    def advance_system_steps(self, task_id, *, advance=1):
+        self._reporter.advance_system_steps(task_id, advance=advance)
+
+    def hide_system_steps(self, task_id):
+        self._reporter.hide_system_steps(task_id)
+
+    def add_step_task(self, *, action, name):
+        return self._reporter.add_step_task(action=action, name=f"{self.target}: {name}")
+
+    def finish_step_task(self, task_id):
+        self._reporter.finish_step_task(task_id)
+
+    def begin_transport_file_progress(self, total):
+        pass
+
+    def advance_transport_file_progress(self, *, step=1):
+        pass
+
+    def complete_transport_file_progress(self):
+        pass
+
+    def end_transport_file_progress(self):
+        pass
+
+    def set_transport_status(self, message):
+        self._reporter.set_transport_status(f"[{self.target}] {message}")
+
+    def hide_transport_tasks(self):
+        pass
+
+    def update_throughput(self, *, task_id, job, system, overall):
+        self._reporter.update_throughput(task_id=task_id, job=None, system=system, overall=None)
+
+    def emit_summary(self, message):
+        pass
+
+
+class FanOutRunner:
+    def __init__(
+        self,
+        *,
+        targets,
+        playlists,
+        reporter: SyncReporter,
+        job_registry: JobRegistry | None = None,
+        event_sink=None,
+    ):
+        self.targets = targets
+        self.playlists = playlists
+        self.reporter = reporter
+        self.job_registry = job_registry or JobRegistry()
+        self.event_sink = event_sink or NullEventSink()
+        self.inventory_cache = SourceInventoryCache()
+        self.summaries = {}
+
+    def _runner(self, target, reporter):
+        runner = SyncRunner(
+            default=target.default,
+            playlists=self.playlists,
+            transport=target.transport,
+            reporter=TargetReporter(reporter, target.name),
+            job_registry=self.job_registry,
+            event_sink=TargetEventSink(self.event_sink, target.name),
+        )
+        runner.inventory_cache = self.inventory_cache
+        return runner
+
+    def _run_target(self, target, reporter, cfg, system_name, cancel_token, resume, plan=None):
+        runner = self._runner(target, reporter)
+        state = None
+        if resume:
+            journal = RunJournal.from_config(target.default)
+            state = journal.resume_state() if journal is not None else None
+        if state is not None:
+            # An interrupted target continues with the plan it recorded.
+            plan = None
+        elif plan is not None and target is not self.targets[0]:
+            with span("fanout.target_plan"):
+                plan = runner.target_plan(plan)
+        runner.run(cfg, system_name=system_name, cancel_token=cancel_token, plan=plan, resume=state)
+        summary = runner.event_sink.summary
+        return summary.message if summary is not None else ""
+
+    def run(self, cfg: SyncRunConfig, *, system_name=None, cancel_token=None, resume=False):
+        cancel_token = cancel_token or CancelToken()
+        reporter = SerializedReporter(self.reporter)
+        self.summaries = {}
+        failures = {}
+        overall_total = len(self.targets) + (1 if cfg.do_update_playlists else 0)
+        timings = start_timings() if cfg.do_timings else None
+        self.reporter.start(overall_total=overall_total, supports_per_file_progress=False)
+        try:
+            if cfg.do_update_playlists and self.targets:
+                # Playlists are rebuilt from the local folders, once for all targets.
+                update_cfg = replace(
+                    cfg,
+                    do_sync_playlists=False,
+                    do_sync_bios=False,
+                    do_sync_favorites=False,
+                    do_sync_thumbnails=False,
+                    do_sync_roms=False,
+                )
+                first = self.targets[0]
+                local = replace(first, name="local", default={**first.default, "journal": False})
+                self._run_target(local, reporter, update_cfg, system_name, cancel_token, False)
+                reporter.update_overall(advance=1)
+                cfg = replace(cfg, do_update_playlists=False)
+
+            # Selections and conversions are worked out once; each target only compares the
+            # plan with its own listing.
+            plan = None
+            if self.targets:
+                with span("fanout.plan"):
+                    plan = self._runner(self.targets[0], reporter).plan(
+                        cfg, system_name=system_name
+                    )
+
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, len(self.targets)), thread_name_prefix="sync-target"
+            )
+            futures = {
+                executor.submit(
+                    self._run_target,
+                    target,
+                    reporter,
+                    cfg,
+                    system_name,
+                    cancel_token,
+                    resume,
+                    plan,
+                ): target
+                for target in self.targets
+            }
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    target = futures[future]
+                    try:
+                        self.summaries[target.name] = future.result()
+                    except SyncAbortError as exc:
+                        # A target that dropped off the network does not stop the others.
+                        logger.debug("FanOutRunner::run: target %s failed: %s", target.name, exc)
+                        failures[target.name] = str(exc)
+                    reporter.update_overall(
+                        description=f"[bold #AAAAAA]{target.name} done", advance=1
+                    )
+            except BaseException:
+                cancel_token.cancel("Stopping workers...")
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            finally:
+                executor.shutdown(wait=True)
+        except KeyboardInterrupt as exc:
+            raise SyncAbortError("Stopping workers...") from exc
+        finally:
+            self.reporter.finish()
+            if timings is not None:
+                stop_timings()
+
+        for target in self.targets:
+            if target.name in self.summaries:
+                self.reporter.emit_summary(f"{target.name}: {self.summaries[target.name]}")
+            elif target.name in failures:
+                self.reporter.emit_summary(f"{target.name}: failed: {failures[target.name]}")
+        if timings is not None and timings.format_table():
+            self.reporter.emit_summary(timings.format_table())
+        if failures:
+            raise SyncAbortError("Sync failed for target(s): " + ", ".join(sorted(failures)))
+        return self.summaries
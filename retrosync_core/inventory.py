@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger()
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_DEDUP_MIN_SIZE = 64 * 1024
+
+
+def file_digest(path: Path, chunk_size=HASH_CHUNK_SIZE):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as fd:
+        while chunk := fd.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentIndex:
+    def __init__(self, min_size=DEFAULT_DEDUP_MIN_SIZE):
+        self.min_size = min_size
+        self.duplicate_count = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        # Files are only hashed once a second file of the same size shows up.
+        self._by_size: dict[int, list[tuple[Path, Path]]] = {}
+        self._digests: dict[Path, str] = {}
+        # Only a destination whose transfer has finished may serve as an origin.
+        self._confirmed: set[Path] = set()
+
+    def register(self, src: Path, dest: Path, pending=()):
+        # pending holds destinations the caller sends before it makes any copy from them.
+        try:
+            size = src.stat().st_size
+        except OSError:
+            return None
+        if size < self.min_size:
+            return None
+
+        with self._lock:
+            candidates = self._by_size.setdefault(size, [])
+            earlier = list(candidates)
+            candidates.append((src, dest))
+            if not earlier:
+                return None
+            unhashed = [path for path, _ in earlier + [(src, dest)] if path not in self._digests]
+
+        # Hashing a large file takes a while, so other uploads are not held up by it.
+        digests = {}
+        for path in unhashed:
+            try:
+                digests[path] = file_digest(path)
+            except OSError as exc:
+                logger.debug("ContentIndex::register: cannot hash %s: %s", path, exc)
+
+        with self._lock:
+            self._digests.update(digests)
+            digest = self._digests.get(src)
+            if digest is None:
+                return None
+            for candidate_src, candidate_dest in self._by_size[size]:
+                if candidate_dest == dest or self._digests.get(candidate_src) != digest:
+                    continue
+                if candidate_dest in self._confirmed or candidate_dest in pending:
+                    logger.debug(
+                        "ContentIndex::register: duplicate src=%s dest=%s origin=%s bytes=%s",
+                        src,
+                        dest,
+                        candidate_dest,
+                        size,
+                    )
+                    return candidate_dest
+            return None
+
+    def confirm(self, dest: Path):
+        with self._lock:
+            self._confirmed.add(dest)
+
+    def record_copy(self, src: Path):
+        # Only copies made on the server count, not duplicates that were already in place.
+        try:
+            size = src.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            self.duplicate_count += 1
+            self.bytes_saved += size
+
+
+def source_inventory(src_path: Path, whitelist=(), recursive=True, exclude=None):
+    inventory = {}
+    src_path = Path(src_path)
+    if not src_path.is_dir():
+        return inventory
+    generator = src_path.rglob("*") if recursive else src_path.glob("*")
+    for filename in generator:
+        try:
+            if not filename.is_file():
+                continue
+            rel = filename.relative_to(src_path)
+            if exclude is not None and exclude(rel):
+                continue
+            if whitelist and filename.suffix not in whitelist:
+                continue
+            stat = filename.stat()
+        except OSError:
+            continue
+        inventory[rel.as_posix()] = (stat.st_size, int(stat.st_mtime))
+    return dict(sorted(inventory.items()))
+
+
+class SourceInventoryCache:
+    # Shared by the runners of several targets, so that each source folder is scanned once.
+    def __init__(self):
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, src_path: Path, exclude=None):
+        key = str(src_path)
+        with self._lock:
+            entry = self._entries.setdefault(key, (threading.Lock(), []))
+        lock, inventory = entry
+        with lock:
+            if inventory:
+                self.hits += 1
+                logger.debug("SourceInventoryCache::get: reusing scan of %s", key)
+            else:
+                inventory.append(source_inventory(src_path, exclude=exclude))
+            return dict(inventory[0])
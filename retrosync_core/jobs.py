@@ -5,10 +5,25 @@ import logging
 import re
 import tempfile
 from collections import defaultdict
+from dataclasses import replace
 from pathlib import Path
 
 from lxml import etree
 
+from .budget import load_playlist_items, rom_relative_path
+from .inventory import source_inventory
+from .journal import file_fingerprint
+from .plan import ACTION_UPDATE, JobPlan, PlanEntry, relative_plan_paths, restrict_plan
+from .progress import ByteMeter, current_meter, metering
+from .timing import span
+from .transform import (
+    TransformCache,
+    downscale_image,
+    repack_names,
+    repack_params,
+    thumbnail_params,
+    zip_rom,
+)
 from .transports import TransportError
 
 logger = logging.getLogger()
@@ -21,20 +36,182 @@ item_tpl = {
     "crc32": "00000000|crc",
     "db_name": "",
 }
+THUMBNAIL_FOLDERS = ["Named_Boxarts", "Named_Snaps", "Named_Titles"]
+# RetroArch replaces these in labels to name the thumbnail files.
+THUMBNAIL_UNSAFE_CHARS = re.compile(r"[&*/:`<>?\\|]")
 
 
 class JobBase:
-    pass
+    job_plan = None
+    journal = None
+    inventory_cache = None
+    selected = None
+    selective = False
+    transform_src = None
+    transformed = frozenset()
+    rom_selections = None
+    uses_transport = True
+    after_systems = False
+
+    def build_plan(self, system=None):
+        return JobPlan(
+            job=self.name,
+            system=system,
+            file_count=self.size,
+            transfer_bytes=self.transfer_bytes,
+        )
+
+    def apply_plan(self, job_plan):
+        self.job_plan = job_plan
+        self.selected = job_plan.selected
+        self.transform_src = (
+            None if job_plan.transform_src is None else Path(job_plan.transform_src)
+        )
+        self.transformed = frozenset(job_plan.transformed or ())
+        self.size = job_plan.file_count
+        self.transfer_bytes = job_plan.transfer_bytes
+        if job_plan.src is not None:
+            self.src = Path(job_plan.src)
+        if job_plan.dst is not None:
+            self.dst = Path(job_plan.dst)
+
+    def destination(self):
+        return self.dst
+
+    def plan_for_target(self, job_plan):
+        # Only the destination of a plan made for another target changes.
+        if job_plan.dst is None:
+            return replace(job_plan)
+        return replace(job_plan, dst=str(self.destination()))
+
+    def retarget_directory(self, job_plan):
+        # The selection and the converted files of a plan made for another target are reused;
+        # only the listing of this target is compared again.
+        self.apply_plan(job_plan)
+        self.dst = self.destination()
+        if job_plan.selected is None:
+            target_plan = self.plan_directory(job_plan.system)
+        else:
+            inventory = {}
+            for rel in job_plan.selected:
+                try:
+                    stat = self.source_file(rel).stat()
+                except OSError:
+                    continue
+                inventory[rel] = (stat.st_size, int(stat.st_mtime))
+            target_plan = self.plan_selection(job_plan.system, inventory)
+        return replace(
+            target_plan,
+            kind=job_plan.kind,
+            selected=job_plan.selected,
+            transform=job_plan.transform,
+            transform_src=job_plan.transform_src,
+            transformed=job_plan.transformed,
+            replan=job_plan.replan,
+        )
+
+    def plan_selection(self, system, inventory):
+        # The listing is compared in full, so files that dropped out of the selection are
+        # planned for deletion; only the selected files are sent.
+        job_plan = JobPlan(job=self.name, system=system, src=str(self.src), dst=str(self.dst))
+        job_plan = self.transport.plan_from_listing(job_plan, self.dst, inventory)
+        job_plan.selected = list(inventory)
+        return restrict_plan(job_plan, inventory)
+
+    def scan_source(self):
+        with span("jobs.scan_source"):
+            if self.inventory_cache is not None:
+                return self.inventory_cache.get(self.src, exclude=self.transport.is_excluded_path)
+            return source_inventory(self.src, exclude=self.transport.is_excluded_path)
+
+    def plan_directory(self, system=None, inventory=None):
+        if inventory is None:
+            inventory = self.scan_source()
+        job_plan = JobPlan(job=self.name, system=system, src=str(self.src), dst=str(self.dst))
+        return self.transport.plan_changes(job_plan, self.src, self.dst, inventory)
+
+    def sync_directory(self, callback=None, cancel_check=None):
+        kwargs = {
+            "callback": callback,
+        }
+        if cancel_check is not None:
+            kwargs["cancel_check"] = cancel_check
+        if self.job_plan is not None and (self.job_plan.exact or self.selected is not None):
+            # Deleting first frees space on the device for the uploads.
+            self.transport.delete_planned(self.dst, self.job_plan, cancel_check=cancel_check)
+            if self.journal is not None and self.transport.capabilities.per_file_callback:
+                self.sync_journaled(**kwargs)
+            else:
+                self.send_planned(self.job_plan, **kwargs)
+        else:
+            self.transport.copy_files(self.src, self.dst, whitelist=[], recursive=True, **kwargs)
+
+    def sync_journaled(self, callback=None, **kwargs):
+        # The whole job is sent in one pass; each file is recorded as soon as its transfer
+        # is confirmed, so that an interrupted run can continue after the last confirmed file.
+        pending = {}
+        entries = []
+        for entry in self.job_plan.transfer_entries():
+            source = self.source_file(entry.path)
+            fingerprint = file_fingerprint(source)
+            if self.journal.is_done(entry.path, fingerprint):
+                if callback:
+                    callback()
+                continue
+            pending[str(source)] = (entry.path, fingerprint)
+            entries.append(entry)
+        logger.debug(
+            "%s::sync_journaled: %s files confirmed earlier, %s pending",
+            type(self).__name__,
+            len(self.job_plan.transfer_entries()) - len(entries),
+            len(entries),
+        )
+        if not entries:
+            return
+        parent = current_meter()
+        meter = ByteMeter(parent=parent)
+
+        def on_file(path, size, seconds):
+            confirmed = pending.get(path)
+            if confirmed is not None:
+                self.journal.record([confirmed])
+            if parent is not None and parent.on_file is not None:
+                parent.on_file(path, size, seconds)
+
+        meter.on_file = on_file
+        meter.on_retry = parent.on_retry if parent is not None else None
+        with metering(meter):
+            self.send_planned(replace(self.job_plan, entries=entries), callback=callback, **kwargs)
+
+    def source_file(self, rel):
+        if rel in self.transformed:
+            return self.transform_src / rel
+        return self.src / rel
+
+    def send_planned(self, job_plan, **kwargs):
+        if self.selected is not None:
+            # Only part of the folder is synced, so rsync cannot be pointed at all of it.
+            paths = relative_plan_paths(job_plan)
+            converted = [path for path in paths if path.as_posix() in self.transformed]
+            if converted:
+                self.transport.copy_file_list(self.transform_src, self.dst, converted, **kwargs)
+                paths = [path for path in paths if path.as_posix() not in self.transformed]
+            self.transport.copy_file_list(self.src, self.dst, paths, **kwargs)
+            return
+        self.transport.sync_planned(self.src, self.dst, job_plan, **kwargs)
 
 
 class GlobalJob(JobBase):
-    def __init__(self, default, playlists, transport):
+    def __init__(self, default, playlists, transport, job_plan=None):
         self.default = default
         self.playlists = playlists
         self.transport = transport
         self.size = 1
         self.transfer_bytes = 0
-        self.setup()
+        if job_plan is not None:
+            self.apply_plan(job_plan)
+        else:
+            self.setup()
 
     def setup(self):
         pass
@@ -45,19 +222,21 @@ class BiosSync(GlobalJob):
 
     def setup(self):
         self.src = Path(self.default.get("src_bios"))
-        self.dst = Path(self.default.get("dest_bios"))
+        self.dst = self.destination()
         self.size = self.transport.guess_file_count(self.src, [], True)
         self.transfer_bytes = self.transport.guess_total_size(self.src, [], True)
 
+    def destination(self):
+        return Path(self.default.get("dest_bios"))
+
+    def build_plan(self, system=None):
+        return self.plan_directory(system)
+
+    def plan_for_target(self, job_plan):
+        return self.retarget_directory(job_plan)
+
     def do(self, callback=None, cancel_check=None):
-        kwargs = {
-            "whitelist": [],
-            "recursive": True,
-            "callback": callback,
-        }
-        if cancel_check is not None:
-            kwargs["cancel_check"] = cancel_check
-        self.transport.copy_files(self.src, self.dst, **kwargs)
+        self.sync_directory(callback=callback, cancel_check=cancel_check)
 
 
 class ThumbnailsSync(BiosSync):
@@ -65,26 +244,116 @@ class ThumbnailsSync(BiosSync):
 
     def setup(self):
         self.src = Path(self.default.get("src_thumbnails"))
-        self.dst = Path(self.default.get("dest_thumbnails"))
+        self.dst = self.destination()
+        if self.default.get("thumbnails_referenced_only", False):
+            # Worked out from the playlists when the plan is built.
+            self.size = 0
+            self.transfer_bytes = 0
+            return
         self.size = self.transport.guess_file_count(self.src, [], True)
         self.transfer_bytes = self.transport.guess_total_size(self.src, [], True)
 
+    def destination(self):
+        return Path(self.default.get("dest_thumbnails"))
+
+    def build_plan(self, system=None):
+        referenced_only = self.default.get("thumbnails_referenced_only", False)
+        params = thumbnail_params(self.default)
+        if not referenced_only and params is None:
+            return self.plan_directory(system)
+        if referenced_only:
+            with span("jobs.referenced_thumbnails"):
+                inventory = self.referenced_thumbnails()
+        else:
+            inventory = self.scan_source()
+        stats = None
+        if params is not None:
+            inventory, stats = self.transform_thumbnails(inventory, params)
+        self.selected = list(inventory)
+        job_plan = self.plan_selection(system, inventory)
+        job_plan.transform = None if stats is None else stats.to_dict()
+        return job_plan
+
+    def transform_thumbnails(self, inventory, params):
+        # The plan is made against the resized images, which are then sent from the cache.
+        images = [rel for rel in inventory if rel.lower().endswith(".png")]
+        cache = TransformCache.from_config(self.default, "thumbnails", params)
+        with span("jobs.transform_thumbnails"):
+            inventory, stats = cache.apply(
+                self.src, images, downscale_image, workers=self.default.get("transform_workers")
+            )
+        self.src = cache.tree
+        return inventory, stats
+
+    def referenced_thumbnails(self):
+        src_roms = self.default.get("src_roms") or []
+        if not isinstance(src_roms, list):
+            src_roms = [src_roms]
+        selections = self.rom_selections or {}
+        inventory = {}
+        for playlist in self.playlists:
+            if playlist.get("disabled", False):
+                continue
+            name = playlist.get("name")
+            # The labels are matched with the index PlaylistUpdateJob uses to pick them.
+            index_job = PlaylistUpdateJob(self.default, self.transport)
+            index_job.setup(playlist)
+            index_job.thumbnail_index = index_job.build_thumbnail_index()
+            rom_dirs = [Path(root) / playlist.get("src_folder", "") for root in src_roms]
+            selected = selections.get(name)
+            selected = None if selected is None else set(selected)
+            system = Path(name).stem
+            for item in load_playlist_items(Path(self.default.get("src_playlists")) / name):
+                path = item.get("path", "")
+                if selected is not None and rom_relative_path(path, rom_dirs) not in selected:
+                    continue
+                stem = Path(path.split("#")[0]).stem
+                label = THUMBNAIL_UNSAFE_CHARS.sub("_", item.get("label") or stem)
+                thumbnail = index_job.match_thumbnail(stem, label) or label
+                for folder in THUMBNAIL_FOLDERS:
+                    rel = f"{system}/{folder}/{thumbnail}.png"
+                    try:
+                        stat = (self.src / rel).stat()
+                    except OSError:
+                        continue
+                    inventory[rel] = (stat.st_size, int(stat.st_mtime))
+        logger.debug("ThumbnailsSync::referenced_thumbnails: %s thumbnails", len(inventory))
+        return dict(sorted(inventory.items()))
+
 
 class FavoritesSync(BiosSync):
     name = "Favorites"
+    # The favorites list is rewritten against the systems' dest_folder layout.
+    after_systems = True
 
     def setup(self):
         self.src = Path(self.default.get("src_config")) / "content_favorites.lpl"
-        self.dst = Path(self.default.get("dest_config")) / "content_favorites.lpl"
+        self.dst = self.destination()
         self.size = 1
         self.transfer_bytes = self.src.stat().st_size if self.src.exists() else 0
 
+    def destination(self):
+        return Path(self.default.get("dest_config")) / "content_favorites.lpl"
+
+    def plan_for_target(self, job_plan):
+        return JobBase.plan_for_target(self, job_plan)
+
+    def build_plan(self, system=None):
+        job_plan = JobBase.build_plan(self, system)
+        job_plan.src = str(self.src)
+        job_plan.dst = str(self.dst)
+        job_plan.entries = [
+            PlanEntry(path=self.dst.name, action=ACTION_UPDATE, size=self.transfer_bytes)
+        ]
+        return job_plan
+
     def do(self, callback=None, cancel_check=None):
         with tempfile.NamedTemporaryFile() as temp_file:
-            self.migrate(
-                self.src,
-                temp_file,
-            )
+            with span("jobs.favorites_migrate"):
+                self.migrate(
+                    self.src,
+                    temp_file,
+                )
             kwargs = {}
             if cancel_check is not None:
                 kwargs["cancel_check"] = cancel_check
@@ -105,6 +374,10 @@ class FavoritesSync(BiosSync):
         with open(favorites_file) as file:
             data = json.load(file)
 
+        src_roms = self.default.get("src_roms") or []
+        if not isinstance(src_roms, list):
+            src_roms = [src_roms]
+
         items = []
         src_items = data["items"]
         src_items_len = len(src_items)
@@ -114,6 +387,13 @@ class FavoritesSync(BiosSync):
             dest_rom_dir = Path(self.default.get("target_roms")) / playlist.get("dest_folder")
             src_path = new_item["path"].split("#")[0]
             src_name = Path(src_path).name
+            if src_roms and repack_params(self.default, playlist) is not None:
+                # RomSyncJob sends the raw cartridges of the primary folder as zips.
+                src_rom_dir = Path(src_roms[0]) / playlist.get("src_folder", "")
+                rel = rom_relative_path(src_path, [src_rom_dir])
+                repacked = repack_names(src_rom_dir, [] if rel is None else [rel])
+                if rel in repacked:
+                    src_name = Path(repacked[rel]).name
             new_path = dest_rom_dir / src_name
             new_item["path"] = str(new_path)
             core_path = (
@@ -128,8 +408,10 @@ class FavoritesSync(BiosSync):
             items.append(new_item)
 
         data["items"] = items
-        doc = json.dumps(data)
-        logger.debug(json.dumps(data, indent=2))
+        with span("jobs.json_dump"):
+            doc = json.dumps(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(data, indent=2))
         temp_file.write(doc.encode("utf-8"))
         temp_file.flush()
         temp_file.seek(0)
@@ -142,6 +424,11 @@ class SystemJob(JobBase):
         self.size = 1
         self.transfer_bytes = 0
 
+    def apply_plan(self, job_plan, playlist=None):
+        if playlist is not None:
+            self.playlist = playlist
+        super().apply_plan(job_plan)
+
     def get_src_rom_roots(self):
         src_roms = self.default.get("src_roms")
         if isinstance(src_roms, list):
@@ -159,27 +446,80 @@ class SystemJob(JobBase):
 
 class RomSyncJob(SystemJob):
     name = "Sync ROMs"
+    selective = True
 
     def setup(self, playlist):
         self.playlist = playlist
         self.src = self.get_primary_src_rom_root() / self.playlist.get("src_folder")
-        self.dst = Path(self.default.get("dest_roms")) / self.playlist.get("dest_folder")
+        self.dst = self.destination()
+        if self.selected is not None:
+            inventory = self.selected_inventory()
+            self.size = len(inventory)
+            self.transfer_bytes = sum(size for size, _ in inventory.values())
+            return
         self.size = self.transport.guess_file_count(self.src, [], True)
         self.transfer_bytes = self.transport.guess_total_size(self.src, [], True)
 
+    def destination(self):
+        return Path(self.default.get("dest_roms")) / self.playlist.get("dest_folder")
+
+    def plan_for_target(self, job_plan):
+        return self.retarget_directory(job_plan)
+
+    def selected_inventory(self):
+        inventory = {}
+        for rel in self.selected:
+            try:
+                stat = (self.src / rel).stat()
+            except OSError:
+                continue
+            inventory[rel] = (stat.st_size, int(stat.st_mtime))
+        return inventory
+
+    def build_plan(self, system=None):
+        self.transform_src = None
+        self.transformed = frozenset()
+        params = repack_params(self.default, self.playlist)
+        if params is not None:
+            return self.plan_repacked(system, params)
+        if self.selected is None:
+            return self.plan_directory(system)
+        job_plan = self.plan_selection(system, self.selected_inventory())
+        job_plan.selected = list(self.selected)
+        return job_plan
+
+    def plan_repacked(self, system, params):
+        inventory = self.scan_source() if self.selected is None else self.selected_inventory()
+        renamed = repack_names(self.src, inventory)
+        cache = TransformCache.from_config(self.default, "roms", params)
+        with span("jobs.repack_roms"):
+            repacked, stats = cache.apply(
+                self.src,
+                list(renamed),
+                zip_rom,
+                rename=renamed.get,
+                workers=self.default.get("transform_workers"),
+                by_name=True,
+            )
+        self.transform_src = cache.tree
+        self.transformed = frozenset(repacked)
+        inventory = {rel: value for rel, value in inventory.items() if rel not in renamed}
+        inventory.update(repacked)
+        inventory = dict(sorted(inventory.items()))
+        # rsync would compare the raw files of src, so the plan is made from the listing.
+        job_plan = self.plan_selection(system, inventory)
+        job_plan.transform = stats.to_dict()
+        job_plan.transform_src = str(cache.tree)
+        job_plan.transformed = sorted(self.transformed)
+        return job_plan
+
     def do(self, callback=None, cancel_check=None):
-        kwargs = {
-            "whitelist": [],
-            "recursive": True,
-            "callback": callback,
-        }
-        if cancel_check is not None:
-            kwargs["cancel_check"] = cancel_check
-        self.transport.copy_files(self.src, self.dst, **kwargs)
+        self.sync_directory(callback=callback, cancel_check=cancel_check)
 
 
 class PlaylistSyncJob(SystemJob):
     name = "Sync Playlist"
+    selective = True
 
     def setup(self, playlist):
         self.playlist = playlist
@@ -187,6 +527,16 @@ class PlaylistSyncJob(SystemJob):
         local = Path(self.default.get("src_playlists")) / self.playlist.get("name")
         self.transfer_bytes = local.stat().st_size if local.exists() else 0
 
+    def build_plan(self, system=None):
+        job_plan = super().build_plan(system)
+        job_plan.entries = [
+            PlanEntry(
+                path=self.playlist.get("name"), action=ACTION_UPDATE, size=self.transfer_bytes
+            )
+        ]
+        job_plan.selected = None if self.selected is None else list(self.selected)
+        return job_plan
+
     def migrate_playlist(self, temp_file):
         name = self.playlist.get("name")
         logger.debug(f"migrate_playlist: name={name}")
@@ -208,7 +558,16 @@ class PlaylistSyncJob(SystemJob):
         items = []
         src_items = data["items"]
         src_items_len = len(src_items)
+        selected = None if self.selected is None else set(self.selected)
+        repacked = {}
+        if repack_params(self.default, self.playlist) is not None:
+            # RomSyncJob sends these as zips from the primary folder.
+            rels = [rom_relative_path(item["path"], src_rom_dirs[:1]) for item in src_items]
+            repacked = repack_names(src_rom_dirs[0], [rel for rel in rels if rel is not None])
         for idx, item in enumerate(src_items):
+            rel = rom_relative_path(item["path"], src_rom_dirs)
+            if selected is not None and rel not in selected:
+                continue
             new_item = copy.copy(item)
             new_item["core_name"] = "DETECT"
             new_item["core_path"] = "DETECT"
@@ -218,12 +577,16 @@ class PlaylistSyncJob(SystemJob):
             new_path = src_path
             for src_rom_dir in src_rom_dirs:
                 new_path = new_path.replace(str(src_rom_dir), str(target_rom_dir))
+            if rel in repacked:
+                new_path = new_path[: -len(Path(src_path).suffix)] + ".zip"
             new_item["path"] = new_path
             items.append(new_item)
 
         data["items"] = items
-        doc = json.dumps(data)
-        logger.debug(json.dumps(data, indent=2))
+        with span("jobs.json_dump"):
+            doc = json.dumps(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(data, indent=2))
         temp_file.write(doc.encode("utf-8"))
         temp_file.flush()
         temp_file.seek(0)
@@ -231,7 +594,8 @@ class PlaylistSyncJob(SystemJob):
     def do(self, callback=None, cancel_check=None):
         name = self.playlist.get("name")
         with tempfile.NamedTemporaryFile() as temp_file:
-            self.migrate_playlist(temp_file)
+            with span("jobs.migrate_playlist"):
+                self.migrate_playlist(temp_file)
             kwargs = {}
             if cancel_check is not None:
                 kwargs["cancel_check"] = cancel_check
@@ -244,6 +608,7 @@ class PlaylistSyncJob(SystemJob):
 
 class PlaylistUpdateJob(SystemJob):
     name = "Update Playlist"
+    uses_transport = False
 
     def setup(self, playlist):
         self.playlist = playlist
@@ -302,12 +667,7 @@ class PlaylistUpdateJob(SystemJob):
         if not system_dir.is_dir():
             return index
 
-        thumb_folders = [
-            "Named_Boxarts",
-            "Named_Snaps",
-            "Named_Titles",
-        ]
-        for folder in thumb_folders:
+        for folder in THUMBNAIL_FOLDERS:
             path = system_dir / folder
             if not path.is_dir():
                 continue
@@ -334,12 +694,18 @@ class PlaylistUpdateJob(SystemJob):
         )
         if mode != "prefer-thumbnail":
             return default_label
+        matched = self.match_thumbnail(stem, default_label)
+        if matched is None:
+            self.thumbnail_miss_count += 1
+            return default_label
+        self.thumbnail_match_count += 1
+        return matched
 
+    def match_thumbnail(self, stem, default_label):
         candidates = [default_label, stem]
         for candidate in candidates:
             exact = self.thumbnail_index["exact"].get(candidate.casefold())
             if exact:
-                self.thumbnail_match_count += 1
                 if exact != default_label:
                     logger.debug(
                         "update_playlist: thumbnail label adapted system=%s stem=%s from=%s to=%s match=exact candidate=%s",
@@ -357,7 +723,6 @@ class PlaylistUpdateJob(SystemJob):
                 continue
             normalized_matches = self.thumbnail_index["normalized"].get(normalized, set())
             if len(normalized_matches) == 1:
-                self.thumbnail_match_count += 1
                 matched = next(iter(normalized_matches))
                 if matched != default_label:
                     logger.debug(
@@ -377,7 +742,6 @@ class PlaylistUpdateJob(SystemJob):
                 continue
             relaxed_matches = self.thumbnail_index["relaxed"].get(relaxed, set())
             if len(relaxed_matches) == 1:
-                self.thumbnail_match_count += 1
                 matched = next(iter(relaxed_matches))
                 if matched != default_label:
                     logger.debug(
@@ -391,8 +755,7 @@ class PlaylistUpdateJob(SystemJob):
                     )
                 return matched
 
-        self.thumbnail_miss_count += 1
-        return default_label
+        return None
 
     def create_m3u(self, src_rom_dir):
         logger.debug("create_m3u: Create m3u files")
@@ -460,16 +823,20 @@ class PlaylistUpdateJob(SystemJob):
         data["scan_dat_file_path"] = str(src_rom_dir)
 
         if self.playlist.get("src_create_m3u"):
-            self.create_m3u(src_rom_dir)
+            with span("jobs.create_m3u"):
+                self.create_m3u(src_rom_dir)
 
         whitelist = self.playlist.get("src_whitelist", False)
         blacklist = self.playlist.get("src_blacklist", False)
-        self.name_map = self.build_file_map(src_rom_dir, self.playlist.get("src_dat_file", ""))
-        self.thumbnail_index = self.build_thumbnail_index()
+        with span("jobs.build_file_map"):
+            self.name_map = self.build_file_map(src_rom_dir, self.playlist.get("src_dat_file", ""))
+        with span("jobs.build_thumbnail_index"):
+            self.thumbnail_index = self.build_thumbnail_index()
         self.thumbnail_match_count = 0
         self.thumbnail_miss_count = 0
         items = []
-        files = glob.glob(str(src_rom_dir / "*"))
+        with span("jobs.glob"):
+            files = glob.glob(str(src_rom_dir / "*"))
         files.sort()
         files_len = len(files)
 
@@ -481,7 +848,8 @@ class PlaylistUpdateJob(SystemJob):
                 f"update_playlist: Update first pass [{idx + 1}/{files_len}] path={Path(file).name}"
             )
             if Path(file).is_dir():
-                subs = glob.glob(str(Path(file) / "*"))
+                with span("jobs.glob"):
+                    subs = glob.glob(str(Path(file) / "*"))
                 for sub in subs:
                     file_list.append(sub)
             else:
@@ -513,8 +881,9 @@ class PlaylistUpdateJob(SystemJob):
             self.thumbnail_match_count,
             self.thumbnail_miss_count,
         )
-        doc = json.dumps(data, indent=2)
-        logger.debug(json.dumps(data, indent=2))
+        with span("jobs.json_dump"):
+            doc = json.dumps(data, indent=2)
+        logger.debug(doc)
         if not self.transport.dry_run:
             with open(str(local), "w") as new_file:
                 new_file.write(doc)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .paths import default_cache_dir
+from .plan import SyncPlan
+
+logger = logging.getLogger()
+
+JOURNAL_FILE_NAME = "journal.jsonl"
+JOURNAL_BATCH_RECORDS = 64
+JOURNAL_BATCH_SECONDS = 2.0
+
+
+def file_fingerprint(path: Path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def plan_fingerprint(job_plan):
+    data = json.dumps(asdict(job_plan), sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+
+@dataclass
+class JournalState:
+    run_id: str
+    plan: SyncPlan
+    jobs: dict = field(default_factory=dict)
+    files: dict = field(default_factory=dict)
+
+    def job_done(self, key, fingerprint):
+        return self.jobs.get(key) == fingerprint
+
+    def done_files(self, key):
+        return self.files.get(key, {})
+
+
+class RunJournal:
+    def __init__(
+        self,
+        path: Path,
+        batch_records=JOURNAL_BATCH_RECORDS,
+        batch_seconds=JOURNAL_BATCH_SECONDS,
+    ):
+        self.path = Path(path)
+        self.batch_records = batch_records
+        self.batch_seconds = batch_seconds
+        self.run_id = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self._fd = None
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def from_config(cls, default):
+        if not default.get("journal", True):
+            return None
+        cache_dir = Path(default.get("cache_dir") or default_cache_dir())
+        if default.get("target"):
+            return cls(cache_dir / f"journal-{default['target']}.jsonl")
+        return cls(cache_dir / JOURNAL_FILE_NAME)
+
+    def _records(self):
+        try:
+            with open(self.path) as fd:
+                lines = fd.readlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A crash can leave a torn last line behind.
+                logger.debug("RunJournal::_records: skipping unreadable line")
+        return records
+
+    def resume_state(self):
+        state = None
+        for record in self._records():
+            kind = record.get("type")
+            if kind == "start":
+                try:
+                    plan = SyncPlan.from_dict(record["plan"])
+                except (KeyError, TypeError, ValueError):
+                    state = None
+                    continue
+                state = JournalState(run_id=record["run"], plan=plan)
+            elif state is None or record.get("run") != state.run_id:
+                continue
+            elif kind == "file":
+                state.files.setdefault(record["job"], {})[record["path"]] = record["fp"]
+            elif kind == "job":
+                state.jobs[record["job"]] = record["fp"]
+            elif kind == "finish":
+                state = None
+        if state is not None:
+            logger.debug(
+                "RunJournal::resume_state: run=%s jobs=%s files=%s",
+                state.run_id,
+                len(state.jobs),
+                sum(len(files) for files in state.files.values()),
+            )
+        return state
+
+    def start(self, run_id, plan, resumed=False):
+        self.run_id = run_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = open(self.path, "a")
+        if not resumed:
+            self._append({"type": "start", "plan": plan.to_dict()}, sync=True)
+
+    def _append(self, record, sync=False):
+        record = {"run": self.run_id, **record}
+        with self._lock:
+            if self._fd is None:
+                return
+            self._pending.append(json.dumps(record))
+            due = time.monotonic() - self._last_sync >= self.batch_seconds
+            if sync or due or len(self._pending) >= self.batch_records:
+                self._sync()
+
+    def _sync(self):
+        if not self._pending:
+            return
+        self._fd.write("\n".join(self._pending) + "\n")
+        self._fd.flush()
+        os.fsync(self._fd.fileno())
+        self._pending = []
+        self._last_sync = time.monotonic()
+
+    def record_files(self, job_key, files):
+        for rel_path, fingerprint in files:
+            self._append({"type": "file", "job": job_key, "path": rel_path, "fp": fingerprint})
+
+    def record_job(self, job_key, fingerprint):
+        self._append({"type": "job", "job": job_key, "fp": fingerprint}, sync=True)
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            self._sync()
+            self._fd.close()
+            self._fd = None
+
+    def finish(self):
+        self._append({"type": "finish"}, sync=True)
+        self.close()
+        self.compact()
+
+    def compact(self):
+        # Once a run succeeded, neither its records nor those of the runs it superseded are
+        # needed for a resume anymore.
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as fd:
+            fd.flush()
+            os.fsync(fd.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class JournalScope:
+    def __init__(self, journal: RunJournal, job_key, done_files=None):
+        self.journal = journal
+        self.job_key = job_key
+        self.done_files = dict(done_files or {})
+        self._lock = threading.Lock()
+
+    def is_done(self, rel_path, fingerprint):
+        return fingerprint is not None and self.done_files.get(rel_path) == fingerprint
+
+    def record(self, files):
+        # Transfers running in parallel confirm their files from their own threads.
+        with self._lock:
+            self.journal.record_files(self.job_key, files)
+            self.done_files.update(files)
@@ -0,0 +1,31 @@
+import logging
+import posixpath
+from pathlib import PurePosixPath
+
+
+logger = logging.getLogger()
+
+
+def walk_remote_tree(root, list_dir, exclude=None):
+    # list_dir(path) -> ({name: (size, mtime)}, [subdir names]), raises FileNotFoundError.
+    root = str(root).rstrip("/") or "/"
+    manifest = {}
+    pending = [("", root)]
+    while pending:
+        rel, remote_dir = pending.pop()
+        try:
+            files, dirs = list_dir(remote_dir)
+        except FileNotFoundError:
+            continue
+        for name, (size, mtime) in files.items():
+            rel_path = posixpath.join(rel, name) if rel else name
+            if exclude is not None and exclude(PurePosixPath(rel_path)):
+                continue
+            manifest[rel_path] = (size, mtime)
+        for name in dirs:
+            rel_path = posixpath.join(rel, name) if rel else name
+            if exclude is not None and exclude(PurePosixPath(rel_path)):
+                continue
+            pending.append((rel_path, posixpath.join(remote_dir, name)))
+    logger.debug("walk_remote_tree: root=%s files=%s", root, len(manifest))
+    return dict(sorted(manifest.items()))
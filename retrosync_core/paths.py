@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -41,3 +42,8 @@ def retroarch_derived_paths(base, *, prefix):
         f"{prefix}_cores": base_path / "cores",
         f"{prefix}_thumbnails": base_path / "thumbnails",
     }
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "retrosync"
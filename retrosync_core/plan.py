@@ -0,0 +1,305 @@
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+
+PLAN_VERSION = 1
+ACTION_ADD = "add"
+ACTION_UPDATE = "update"
+ACTION_DELETE = "delete"
+ACTION_SYMBOLS = {ACTION_ADD: "+", ACTION_UPDATE: "~", ACTION_DELETE: "-"}
+DIFF_ENTRIES_PER_JOB = 50
+DEFAULT_MIRROR_MAX_DELETE_PERCENT = 25
+DEFAULT_FREE_SPACE_RESERVE_MB = 64
+
+
+def format_plan_size(num_bytes):
+    gib = 1024**3
+    mib = 1024**2
+    if num_bytes >= gib:
+        return f"{num_bytes / gib:.2f} GB"
+    return f"{num_bytes / mib:.2f} MB"
+
+
+@dataclass
+class PlanEntry:
+    path: str
+    action: str
+    size: int = 0
+
+
+@dataclass
+class JobPlan:
+    job: str
+    kind: str = ""
+    system: str | None = None
+    src: str | None = None
+    dst: str | None = None
+    file_count: int = 1
+    transfer_bytes: int = 0
+    exact: bool = False
+    entries: list[PlanEntry] = field(default_factory=list)
+    remote_files: int = 0
+    # Deleted files and folders that can be removed as a whole, one request each.
+    delete_roots: list[str] = field(default_factory=list)
+    # Paths that fit the storage budget; None syncs the whole folder.
+    selected: list[str] | None = None
+    # TransformStats of the files that were converted before the transfer.
+    transform: dict | None = None
+    # Folder the converted files are sent from; the other files come from src.
+    transform_src: str | None = None
+    transformed: list[str] | None = None
+    # Planned before the playlist update of the same run, which can change what there is to
+    # send; the job is planned again when it starts.
+    replan: bool = False
+
+    def count(self, action):
+        return sum(1 for entry in self.entries if entry.action == action)
+
+    def transfer_entries(self):
+        return [entry for entry in self.entries if entry.action != ACTION_DELETE]
+
+    def delete_entries(self):
+        return [entry for entry in self.entries if entry.action == ACTION_DELETE]
+
+    def net_bytes(self):
+        # Updates are counted in full; the old copy is only replaced at the end of the upload.
+        return self.transfer_bytes - sum(entry.size for entry in self.delete_entries())
+
+    def delete_percent(self):
+        if not self.remote_files:
+            return 0.0
+        return 100.0 * self.count(ACTION_DELETE) / self.remote_files
+
+    def has_work(self):
+        return self.replan or not self.exact or bool(self.entries)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["entries"] = [PlanEntry(**entry) for entry in data.get("entries", [])]
+        return cls(**data)
+
+
+@dataclass
+class SystemPlan:
+    name: str
+    playlist_name: str
+    jobs: list[JobPlan] = field(default_factory=list)
+
+    @property
+    def transfer_bytes(self):
+        return sum(job.transfer_bytes for job in self.jobs)
+
+    @property
+    def file_count(self):
+        return sum(job.file_count for job in self.jobs)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data["name"],
+            playlist_name=data["playlist_name"],
+            jobs=[JobPlan.from_dict(job) for job in data.get("jobs", [])],
+        )
+
+
+@dataclass
+class SyncPlan:
+    options: dict
+    system_name: str | None = None
+    global_jobs: list[JobPlan] = field(default_factory=list)
+    systems: list[SystemPlan] = field(default_factory=list)
+    created: float = field(default_factory=time.time)
+    planning_seconds: float = 0.0
+    budget: dict | None = None
+    version: int = PLAN_VERSION
+
+    @property
+    def transfer_bytes(self):
+        return sum(job.transfer_bytes for job in self.global_jobs) + sum(
+            system.transfer_bytes for system in self.systems
+        )
+
+    @property
+    def file_count(self):
+        return sum(job.file_count for job in self.global_jobs) + sum(
+            system.file_count for system in self.systems
+        )
+
+    @property
+    def delete_count(self):
+        return sum(job.count(ACTION_DELETE) for job in self.all_jobs())
+
+    def all_jobs(self):
+        jobs = list(self.global_jobs)
+        for system in self.systems:
+            jobs.extend(system.jobs)
+        return jobs
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported sync plan version {data.get('version')!r}.")
+        return cls(
+            options=dict(data.get("options", {})),
+            system_name=data.get("system_name"),
+            global_jobs=[JobPlan.from_dict(job) for job in data.get("global_jobs", [])],
+            systems=[SystemPlan.from_dict(system) for system in data.get("systems", [])],
+            created=data.get("created", 0.0),
+            planning_seconds=data.get("planning_seconds", 0.0),
+            budget=data.get("budget"),
+            version=data["version"],
+        )
+
+    def save(self, path):
+        with open(path, "w") as fd:
+            json.dump(self.to_dict(), fd, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as fd:
+                data = json.load(fd)
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"Cannot read sync plan '{path}': {exc}") from exc
+        return cls.from_dict(data)
+
+    def format_diff(self, entries_per_job=DIFF_ENTRIES_PER_JOB):
+        lines = []
+
+        def describe(job_plan, indent):
+            label = (
+                job_plan.job if job_plan.system is None else f"{job_plan.system}: {job_plan.job}"
+            )
+            if not job_plan.exact:
+                lines.append(
+                    f"{indent}{label}: {job_plan.file_count} files, "
+                    f"{format_plan_size(job_plan.transfer_bytes)} (remote state unknown)"
+                )
+            else:
+                lines.append(
+                    f"{indent}{label}: {job_plan.count(ACTION_ADD)} to add, "
+                    f"{job_plan.count(ACTION_UPDATE)} to update, "
+                    f"{job_plan.count(ACTION_DELETE)} to delete, "
+                    f"{format_plan_size(job_plan.transfer_bytes)}"
+                )
+            for entry in job_plan.entries[:entries_per_job]:
+                lines.append(
+                    f"{indent}  {ACTION_SYMBOLS.get(entry.action, '?')} {entry.path} "
+                    f"({format_plan_size(entry.size)})"
+                )
+            hidden = len(job_plan.entries) - entries_per_job
+            if hidden > 0:
+                lines.append(f"{indent}  ... {hidden} more")
+
+        for job_plan in self.global_jobs:
+            describe(job_plan, "")
+        for system in self.systems:
+            lines.append(
+                f"{system.name}: {system.file_count} files, "
+                f"{format_plan_size(system.transfer_bytes)}"
+            )
+            for job_plan in system.jobs:
+                describe(job_plan, "  ")
+        return "\n".join(lines)
+
+
+def diff_inventory(job_plan: JobPlan, inventory, manifest, *, is_stale, mirror=False):
+    if manifest is None:
+        job_plan.exact = False
+        job_plan.entries = [
+            PlanEntry(path=path, action=ACTION_ADD, size=size)
+            for path, (size, _) in inventory.items()
+        ]
+        job_plan.file_count = len(inventory)
+        job_plan.transfer_bytes = sum(size for size, _ in inventory.values())
+        return job_plan
+
+    entries = []
+    for path, (size, mtime) in inventory.items():
+        remote = manifest.get(path)
+        if remote is None:
+            entries.append(PlanEntry(path=path, action=ACTION_ADD, size=size))
+        elif is_stale(size, mtime, remote):
+            entries.append(PlanEntry(path=path, action=ACTION_UPDATE, size=size))
+    if mirror:
+        deleted = [path for path in manifest if path not in inventory]
+        for path in deleted:
+            entries.append(PlanEntry(path=path, action=ACTION_DELETE, size=manifest[path][0] or 0))
+        job_plan.delete_roots = deletion_roots(deleted, inventory)
+    job_plan.remote_files = len(manifest)
+
+    job_plan.exact = True
+    job_plan.entries = entries
+    job_plan.file_count = sum(1 for entry in entries if entry.action != ACTION_DELETE)
+    job_plan.transfer_bytes = sum(entry.size for entry in entries if entry.action != ACTION_DELETE)
+    return job_plan
+
+
+def systems_that_fit(plan: SyncPlan, available, include=None):
+    include = include or (lambda job_plan: True)
+    remaining = available - sum(
+        job_plan.net_bytes() for job_plan in plan.global_jobs if include(job_plan)
+    )
+    fits = []
+    too_large = []
+    for system in plan.systems:
+        needed = sum(job_plan.net_bytes() for job_plan in system.jobs if include(job_plan))
+        if needed <= remaining:
+            fits.append(system.name)
+            remaining -= max(needed, 0)
+        else:
+            too_large.append(system.name)
+    return fits, too_large
+
+
+def deletion_roots(deleted, kept):
+    # A folder is removed as a whole when nothing below it is kept.
+    kept_dirs = set()
+    for path in kept:
+        parent = PurePosixPath(path).parent
+        while parent.parts:
+            kept_dirs.add(parent.as_posix())
+            parent = parent.parent
+    roots = set()
+    for path in deleted:
+        root = path
+        for parent in reversed(PurePosixPath(path).parents[:-1]):
+            if parent.as_posix() not in kept_dirs:
+                root = parent.as_posix()
+                break
+        roots.add(root)
+    return sorted(roots)
+
+
+def plan_from_changes(job_plan: JobPlan, inventory, changes):
+    entries = []
+    for path, action in changes:
+        size = 0 if action == ACTION_DELETE else inventory.get(path, (0, 0))[0]
+        entries.append(PlanEntry(path=path, action=action, size=size))
+    job_plan.exact = True
+    job_plan.entries = entries
+    job_plan.file_count = sum(1 for entry in entries if entry.action != ACTION_DELETE)
+    job_plan.transfer_bytes = sum(entry.size for entry in entries if entry.action != ACTION_DELETE)
+    return job_plan
+
+
+def restrict_plan(job_plan: JobPlan, paths):
+    # Deletions are kept only where the plan removes them itself; rsync's would need --delete.
+    entries = [
+        entry
+        for entry in job_plan.entries
+        if entry.path in paths or (entry.action == ACTION_DELETE and job_plan.delete_roots)
+    ]
+    job_plan.entries = entries
+    job_plan.file_count = sum(1 for entry in entries if entry.action != ACTION_DELETE)
+    job_plan.transfer_bytes = sum(entry.size for entry in entries if entry.action != ACTION_DELETE)
+    return job_plan
+
+
+def relative_plan_paths(job_plan: JobPlan):
+    return [Path(entry.path) for entry in job_plan.transfer_entries()]
@@ -0,0 +1,168 @@
+import cProfile
+import fnmatch
+import io
+import logging
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+logger = logging.getLogger()
+
+PROFILE_TOP = 20
+PROFILE_SAMPLE_SECONDS = 0.005
+# From Python 3.12 on cProfile sits on sys.monitoring: one profiler sees every thread, and
+# only one can be enabled at a time. Before that each thread needs its own profiler.
+SHARED_PROFILER = sys.version_info >= (3, 12)
+
+_active = None
+_null_section = nullcontext()
+
+
+class RunProfiler:
+    def __init__(self, output, phases=(), top=PROFILE_TOP, interval=PROFILE_SAMPLE_SECONDS):
+        self.output = Path(output)
+        self.phases = tuple(phases)
+        self.top = top
+        self.interval = interval
+        self.samples = Counter()
+        self._profiles = []
+        self._shared = None
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def wants(self, key):
+        if not self.phases:
+            return key == "run"
+        return any(fnmatch.fnmatch(key, pattern) for pattern in self.phases)
+
+    def _thread_hook(self, frame, event, arg):
+        # Called once in every thread started while profiling, e.g. the WebDAV upload workers.
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def _enter(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._stop.clear()
+                self._sampler = threading.Thread(
+                    target=self._sample, name="profile-sampler", daemon=True
+                )
+                self._sampler.start()
+                if SHARED_PROFILER:
+                    self._shared = cProfile.Profile()
+                    self._shared.enable()
+                else:
+                    threading.setprofile(self._thread_hook)
+        if SHARED_PROFILER:
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def _exit(self, profile):
+        if profile is not None:
+            profile.disable()
+        with self._lock:
+            if profile is not None:
+                self._profiles.append(profile)
+            self._depth -= 1
+            if self._depth > 0:
+                return
+            if self._shared is not None:
+                self._shared.disable()
+                self._profiles.append(self._shared)
+                self._shared = None
+            else:
+                threading.setprofile(None)
+            self._stop.set()
+            sampler = self._sampler
+        sampler.join()
+
+    @contextmanager
+    def section(self, key):
+        logger.debug("RunProfiler::section: profiling %s", key)
+        profile = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(profile)
+
+    def stats(self):
+        stats = None
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # A thread that never ran Python code while profiled has no stats.
+                continue
+        return stats
+
+    def write(self):
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        stats = self.stats()
+        if stats is not None:
+            stats.dump_stats(self.output)
+        collapsed = self.output.with_suffix(".collapsed")
+        with open(collapsed, "w") as fd:
+            for stack, count in self.samples.most_common():
+                fd.write(f"{stack} {count}\n")
+        return collapsed
+
+    def format_top(self):
+        stats = self.stats()
+        if stats is None:
+            return ""
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats("tottime").print_stats(self.top)
+        return stream.getvalue().strip()
+
+
+def start_profiler(profiler: RunProfiler):
+    global _active
+    _active = profiler
+    return profiler
+
+
+def stop_profiler():
+    global _active
+    profiler = _active
+    _active = None
+    return profiler
+
+
+def profile_phase(key):
+    profiler = _active
+    if profiler is None or not profiler.wants(key):
+        return _null_section
+    return profiler.section(key)
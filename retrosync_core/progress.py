@@ -0,0 +1,169 @@
+import contextvars
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .timing import record
+
+ROLLING_WINDOW_SECONDS = 5.0
+REPORT_INTERVAL_SECONDS = 0.5
+
+_current_meter = contextvars.ContextVar("retrosync_byte_meter", default=None)
+
+RSYNC_PROGRESS_RE = re.compile(r"^\s*([\d.,]+)([KMGT]?)\s+(\d+)%")
+RSYNC_UNITS = {"": 1, "K": 1000, "M": 1000**2, "G": 1000**3, "T": 1000**4}
+
+
+class ByteMeter:
+    def __init__(
+        self,
+        total=0,
+        parent=None,
+        listener=None,
+        window=ROLLING_WINDOW_SECONDS,
+        interval=REPORT_INTERVAL_SECONDS,
+    ):
+        self.total = max(0, int(total or 0))
+        self.done = 0
+        self.parent = parent
+        self.listener = listener
+        self.on_file = None
+        self.on_retry = None
+        self.window = window
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._samples = deque([(time.monotonic(), 0)])
+        self._last_report = 0.0
+
+    def add(self, count):
+        if count <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self.done += count
+            self._samples.append((now, self.done))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+            due = self.listener is not None and now - self._last_report >= self.interval
+            if due:
+                self._last_report = now
+        if self.parent is not None:
+            self.parent.add(count)
+        if due:
+            self.listener(self)
+
+    def flush(self):
+        if self.listener is not None:
+            with self._lock:
+                self._last_report = time.monotonic()
+            self.listener(self)
+
+    def rate(self):
+        with self._lock:
+            first_ts, first_done = self._samples[0]
+            last_ts, last_done = self._samples[-1]
+        if last_ts <= first_ts:
+            return 0.0
+        return (last_done - first_done) / (last_ts - first_ts)
+
+    def eta(self):
+        rate = self.rate()
+        if rate <= 0 or not self.total:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def snapshot(self):
+        return {"done": self.done, "total": self.total, "rate": self.rate(), "eta": self.eta()}
+
+
+@contextmanager
+def metering(meter):
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+
+def current_meter():
+    return _current_meter.get()
+
+
+def report_bytes(count):
+    meter = _current_meter.get()
+    if meter is not None and count:
+        meter.add(count)
+
+
+def report_file(path, size, seconds):
+    record("transport.upload", seconds)
+    meter = _current_meter.get()
+    if meter is not None and meter.on_file is not None:
+        meter.on_file(str(path), size, seconds)
+
+
+def report_retry(reason):
+    meter = _current_meter.get()
+    if meter is not None and meter.on_retry is not None:
+        meter.on_retry(reason)
+
+
+def format_throughput(snapshot):
+    if not snapshot or not snapshot.get("done"):
+        return ""
+    text = f"{snapshot['rate'] / 1024**2:.1f} MB/s"
+    if snapshot.get("eta") is not None:
+        eta = int(snapshot["eta"])
+        text += f", ETA {eta // 3600}:{eta // 60 % 60:02d}:{eta % 60:02d}"
+    return text
+
+
+class ProgressReader:
+    # Reports the bytes of a request body as the HTTP client reads them. A retry rewinds
+    # the body; bytes read again after that are not reported a second time.
+    def __init__(self, fd, meter):
+        self._fd = fd
+        self._meter = meter
+        self._position = 0
+        self._reported = 0
+
+    def read(self, size=-1):
+        data = self._fd.read(size)
+        if data:
+            self._position += len(data)
+            if self._position > self._reported:
+                self._meter.add(self._position - self._reported)
+                self._reported = self._position
+        return data
+
+    def seek(self, offset, whence=0):
+        result = self._fd.seek(offset, whence)
+        self._position = self._fd.tell()
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._fd, name)
+
+
+class RsyncProgressParser:
+    def __init__(self):
+        self.current = 0
+
+    def feed(self, line):
+        # --progress rewrites the same line with \r while a file is transferred.
+        sent = 0
+        for segment in line.replace("\r", "\n").splitlines():
+            match = RSYNC_PROGRESS_RE.match(segment)
+            if match is None:
+                continue
+            value = float(match.group(1).replace(",", "")) * RSYNC_UNITS[match.group(2)]
+            value = int(value)
+            if value < self.current:
+                self.current = 0
+            sent += value - self.current
+            self.current = value
+            if match.group(3) == "100":
+                self.current = 0
+        return sent
@@ -0,0 +1,67 @@
+import logging
+import os
+import re
+import shlex
+from pathlib import Path
+
+logger = logging.getLogger()
+
+CUE_FILE = re.compile(r'^\s*FILE\s+(?:"([^"]+)"|(\S+))', re.IGNORECASE)
+
+
+def _read_lines(path: Path):
+    try:
+        return path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError as exc:
+        logger.debug("references: cannot read %s: %s", path, exc)
+        return []
+
+
+def rom_dependencies(path: Path):
+    # Files a playlist entry needs besides itself: m3u members, cue and gdi tracks.
+    suffix = path.suffix.lower()
+    names = []
+    if suffix == ".m3u":
+        names = [
+            line.strip()
+            for line in _read_lines(path)
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    elif suffix == ".cue":
+        for line in _read_lines(path):
+            match = CUE_FILE.match(line)
+            if match:
+                names.append(match.group(1) or match.group(2))
+    elif suffix == ".gdi":
+        for line in _read_lines(path)[1:]:
+            try:
+                fields = shlex.split(line)
+            except ValueError:
+                fields = line.split()
+            if len(fields) >= 5:
+                names.append(fields[4])
+    return [path.parent / name.replace("\\", "/") for name in names]
+
+
+def referenced_files(rom_dir: Path, rel):
+    # The entry and everything it pulls in, relative to rom_dir, with sizes. Files outside of
+    # rom_dir are not synced by RomSyncJob and are left out.
+    files = {}
+    pending = [Path(rom_dir) / rel]
+    while pending:
+        path = Path(os.path.normpath(pending.pop()))
+        try:
+            key = path.relative_to(rom_dir).as_posix()
+        except ValueError:
+            logger.debug("references: %s is outside of %s", path, rom_dir)
+            continue
+        if key in files:
+            continue
+        try:
+            size = path.stat().st_size
+        except OSError:
+            logger.debug("references: %s is missing", path)
+            continue
+        files[key] = size
+        pending.extend(rom_dependencies(path))
+    return files
@@ -1,20 +1,36 @@
+import concurrent.futures
 import time
 import uuid
 import logging
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from threading import Event, Lock
+from threading import Event, Lock, RLock
 from typing import Protocol
 
+from .budget import budget_bytes, plan_budget, referenced_paths
+from .dag import DagExecutor, JobNode, resolve_dependencies
+from .delta import DeltaSync
 from .events import EventType, NullEventSink, SyncEvent
+from .inventory import DEFAULT_DEDUP_MIN_SIZE, ContentIndex
+from .journal import JournalScope, RunJournal, plan_fingerprint
+from .scheduler import TransferSlots, UploadStats
 from .jobs import (
     BiosSync,
     FavoritesSync,
+    GlobalJob,
+    JobBase,
     PlaylistSyncJob,
     PlaylistUpdateJob,
     RomSyncJob,
+    SystemJob,
     ThumbnailsSync,
 )
+from .plan import DEFAULT_FREE_SPACE_RESERVE_MB, JobPlan, SyncPlan, SystemPlan, systems_that_fit
+from .profiling import profile_phase
+from .progress import ByteMeter, metering
+from .timing import active_timings, span, start_timings, stop_timings
+from .transform import TransformStats
 from .transports import TransportError
 
 logger = logging.getLogger(__name__)
@@ -38,6 +54,20 @@ class SyncRunConfig:
     do_update_playlists: bool
     dry_run: bool = False
     do_debug: bool = False
+    do_timings: bool = False
+
+
+# kind -> (inputs, outputs). Resources of system jobs are scoped to their system; a global
+# job reading a system resource waits for that resource in every system.
+JOB_DATAFLOW = {
+    "bios_sync": ((), ("bios",)),
+    "thumbnails_sync": ((), ("thumbnails",)),
+    "favorites_sync": (("roms",), ("favorites",)),
+    "playlist_update_job": ((), ("local_playlist",)),
+    "playlist_sync_job": (("local_playlist",), ("playlist",)),
+    # The update writes m3u files into the ROM folder, and the playlist picks the ROMs.
+    "rom_sync_job": (("local_playlist",), ("roms",)),
+}
 
 
 @dataclass(frozen=True)
@@ -48,6 +78,13 @@ class JobRegistry:
     playlist_sync_job: type = PlaylistSyncJob
     playlist_update_job: type = PlaylistUpdateJob
     rom_sync_job: type = RomSyncJob
+    dataflow: dict = field(default_factory=lambda: dict(JOB_DATAFLOW))
+
+    def inputs(self, kind):
+        return self.dataflow.get(kind, ((), ()))[0]
+
+    def outputs(self, kind):
+        return self.dataflow.get(kind, ((), ()))[1]
 
 
 class SyncReporter(Protocol):
@@ -83,6 +120,15 @@ class SyncReporter(Protocol):
 
     def hide_transport_tasks(self) -> None: ...
 
+    def update_throughput(
+        self,
+        *,
+        task_id: int | None,
+        job: dict | None,
+        system: dict | None,
+        overall: dict | None,
+    ) -> None: ...
+
     def emit_summary(self, message: str) -> None: ...
 
 
@@ -110,6 +156,37 @@ class CancelToken:
             return self._reason
 
 
+class LinkedCancelToken(CancelToken):
+    def __init__(self, parent: CancelToken):
+        super().__init__()
+        self._parent = parent
+
+    def is_cancelled(self):
+        return self._parent.is_cancelled() or super().is_cancelled()
+
+    def reason(self):
+        if self._parent.is_cancelled():
+            return self._parent.reason()
+        return super().reason()
+
+
+class SerializedReporter:
+    def __init__(self, reporter: SyncReporter):
+        self._reporter = reporter
+        self._lock = RLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._reporter, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
 class SyncRunner:
     def __init__(
         self,
@@ -128,302 +205,1132 @@ class SyncRunner:
         self.job_registry = job_registry or JobRegistry()
         self.event_sink = event_sink or NullEventSink()
         self.run_id = str(uuid.uuid4())
+        self.transfer_slots = None
+        self.lane_seconds = {}
+        self.critical_path = []
+        self.journal = None
+        self.resume_state = None
+        self.inventory_cache = None
+        self.run_meter = None
+        self._system_meters = {}
+        self._run_playlists = []
+        self._run_budget = None
+        self._emit_lock = Lock()
 
     def _emit(self, event_type: EventType, **kwargs):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if not debug and isinstance(self.event_sink, NullEventSink):
+            return
         event = SyncEvent(event_type=event_type, run_id=self.run_id, **kwargs)
-        logger.debug(
-            "event: type=%s run_id=%s system=%s job=%s step=%s msg=%s err=%s advance=%s total=%s bytes=%s",
-            event.event_type.value,
-            event.run_id,
-            event.system,
-            event.job,
-            event.step,
-            event.message,
-            event.error,
-            event.advance,
-            event.total,
-            event.bytes_estimated,
+        if debug:
+            logger.debug(
+                "event: type=%s run_id=%s system=%s job=%s step=%s msg=%s err=%s advance=%s total=%s bytes=%s",
+                event.event_type.value,
+                event.run_id,
+                event.system,
+                event.job,
+                event.step,
+                event.message,
+                event.error,
+                event.advance,
+                event.total,
+                event.bytes_estimated,
+            )
+        with self._emit_lock:
+            self.event_sink.emit(event)
+
+    def _flush_events(self):
+        flush = getattr(self.event_sink, "flush", None)
+        if callable(flush):
+            flush()
+
+    def _setup_content_index(self):
+        if not self.default.get("dedup", False):
+            return None
+        capabilities = getattr(self.transport, "capabilities", None)
+        if not getattr(capabilities, "server_side_copy", False):
+            logger.debug("runner: dedup requested but transport has no server-side copy")
+            return None
+        content_index = ContentIndex(
+            min_size=int(self.default.get("dedup_min_size", DEFAULT_DEDUP_MIN_SIZE))
         )
-        self.event_sink.emit(event)
+        self.transport.content_index = content_index
+        return content_index
 
     def _raise_if_cancelled(self, cancel_token):
         if cancel_token.is_cancelled():
             raise SyncAbortError(cancel_token.reason())
 
-    def run(self, cfg: SyncRunConfig, *, system_name=None, cancel_token=None):
-        cancel_token = cancel_token or CancelToken()
-        jobs = []
-        if cfg.do_sync_bios:
-            jobs.append(self.job_registry.bios_sync(self.default, self.playlists, self.transport))
+    def _job_plan(self, job, kind, system=None):
+        if isinstance(job, JobBase):
+            job.inventory_cache = self.inventory_cache
+            job_plan = job.build_plan(system)
+        else:
+            job_plan = JobPlan(
+                job=job.name,
+                system=system,
+                file_count=job.size,
+                transfer_bytes=getattr(job, "transfer_bytes", 0),
+            )
+        job_plan.kind = kind
+        return job_plan
 
-        if cfg.do_sync_favorites:
-            jobs.append(
-                self.job_registry.favorites_sync(self.default, self.playlists, self.transport)
+    def _global_job(self, job_plan):
+        job_cls = getattr(self.job_registry, job_plan.kind)
+        if isinstance(job_cls, type) and issubclass(job_cls, GlobalJob):
+            return job_cls(self.default, self.playlists, self.transport, job_plan=job_plan)
+        return job_cls(self.default, self.playlists, self.transport)
+
+    def _prepare_system_job(self, job, job_plan, playlist):
+        if isinstance(job, SystemJob):
+            job.apply_plan(job_plan, playlist)
+        else:
+            job.setup(playlist)
+
+    def _replan_system_job(self, job, system_plan, job_plan, playlist):
+        if getattr(job, "selective", False):
+            job.selected = self._selected_roms(playlist, self._run_budget)
+        job.setup(playlist)
+        with span("runner.replan"):
+            new_plan = self._job_plan(job, job_plan.kind, system_plan.name)
+        logger.debug(
+            "runner: planned %s %s again after the playlist update: %s files",
+            system_plan.name,
+            job_plan.kind,
+            new_plan.file_count,
+        )
+        # The summary reports what was sent.
+        system_plan.jobs = [new_plan if item is job_plan else item for item in system_plan.jobs]
+        return new_plan
+
+    def _reads_all_playlists(self, cfg, plan):
+        # The budget and the referenced thumbnails read the playlists of every system, so they
+        # wait until all of them are updated; otherwise each system is planned again on its own.
+        if cfg.dry_run:
+            return False
+        if any(job_plan.replan for job_plan in plan.global_jobs):
+            return True
+        if budget_bytes(self.default) is None:
+            return False
+        return any(
+            job_plan.replan
+            and getattr(getattr(self.job_registry, job_plan.kind), "selective", False)
+            for system_plan in plan.systems
+            for job_plan in system_plan.jobs
+        )
+
+    def _pending_updates(self, plan):
+        updates = []
+        for system_plan in plan.systems:
+            jobs = [
+                job_plan
+                for job_plan in system_plan.jobs
+                if job_plan.kind == "playlist_update_job" and self._job_pending(job_plan)
+            ]
+            if jobs:
+                updates.append(
+                    SystemPlan(
+                        name=system_plan.name, playlist_name=system_plan.playlist_name, jobs=jobs
+                    )
+                )
+        return updates
+
+    def _run_updates_first(
+        self, cfg, plan, updates, playlists_by_name, supports_per_file_progress, cancel_token
+    ):
+        for system_plan in updates:
+            self._run_system(
+                cfg,
+                system_plan,
+                playlists_by_name[system_plan.playlist_name],
+                self.reporter,
+                supports_per_file_progress,
+                cancel_token,
             )
+        for system_plan in plan.systems:
+            system_plan.jobs = [
+                job_plan for job_plan in system_plan.jobs if job_plan.kind != "playlist_update_job"
+            ]
+        with span("runner.budget"):
+            self._run_budget = self._plan_budget(self._run_playlists)
+        if self._run_budget is not None:
+            plan.budget = self._budget_summary(self._run_budget)
+        selections = {
+            playlist.get("name"): self._selected_roms(playlist, self._run_budget)
+            for playlist in self._run_playlists
+        }
+        global_jobs = []
+        for job_plan in plan.global_jobs:
+            if job_plan.replan:
+                job = getattr(self.job_registry, job_plan.kind)(
+                    self.default, self.playlists, self.transport
+                )
+                if isinstance(job, JobBase):
+                    job.rom_selections = selections
+                with span("runner.replan"):
+                    job_plan = self._job_plan(job, job_plan.kind)
+            global_jobs.append(job_plan)
+        plan.global_jobs = global_jobs
 
+    def plan(self, cfg: SyncRunConfig, *, system_name=None):
+        started = time.monotonic()
+        sync_plan = SyncPlan(
+            options={
+                "do_sync_playlists": cfg.do_sync_playlists,
+                "do_sync_bios": cfg.do_sync_bios,
+                "do_sync_favorites": cfg.do_sync_favorites,
+                "do_sync_thumbnails": cfg.do_sync_thumbnails,
+                "do_sync_roms": cfg.do_sync_roms,
+                "do_update_playlists": cfg.do_update_playlists,
+            },
+            system_name=system_name,
+        )
+        global_kinds = []
+        if cfg.do_sync_bios:
+            global_kinds.append("bios_sync")
+        if cfg.do_sync_favorites:
+            global_kinds.append("favorites_sync")
         if cfg.do_sync_thumbnails:
-            jobs.append(
-                self.job_registry.thumbnails_sync(self.default, self.playlists, self.transport)
-            )
+            global_kinds.append("thumbnails_sync")
 
-        system_jobs = []
+        system_kinds = []
         if cfg.do_update_playlists:
-            system_jobs.append(self.job_registry.playlist_update_job(self.default, self.transport))
-
+            system_kinds.append("playlist_update_job")
         if cfg.do_sync_playlists:
-            system_jobs.append(self.job_registry.playlist_sync_job(self.default, self.transport))
-
+            system_kinds.append("playlist_sync_job")
         if cfg.do_sync_roms:
-            system_jobs.append(self.job_registry.rom_sync_job(self.default, self.transport))
+            system_kinds.append("rom_sync_job")
+        system_jobs = [
+            (kind, getattr(self.job_registry, kind)(self.default, self.transport))
+            for kind in system_kinds
+        ]
 
         playlists = self.playlists
         if system_name:
             playlists = [p for p in playlists if p.get("name") == system_name]
+        playlists = [p for p in playlists if not p.get("disabled", False)]
+        budget = None
+        selections = {}
+        selective = any(getattr(job, "selective", False) for _, job in system_jobs) or (
+            cfg.do_sync_thumbnails and self.default.get("thumbnails_referenced_only", False)
+        )
+        if selective:
+            with span("runner.budget"):
+                budget = self._plan_budget(playlists)
+            selections = {p.get("name"): self._selected_roms(p, budget) for p in playlists}
+        if budget is not None:
+            sync_plan.budget = self._budget_summary(budget)
+
+        for kind in global_kinds:
+            job = getattr(self.job_registry, kind)(self.default, self.playlists, self.transport)
+            if isinstance(job, JobBase):
+                job.rom_selections = selections
+            job_plan = self._job_plan(job, kind)
+            # The referenced thumbnails are looked up from the playlists the update rewrites.
+            job_plan.replan = (
+                kind == "thumbnails_sync"
+                and "playlist_update_job" in system_kinds
+                and bool(self.default.get("thumbnails_referenced_only", False))
+            )
+            sync_plan.global_jobs.append(job_plan)
 
-        systems = {}
-        for _, playlist in enumerate(playlists):
-            name = Path(playlist.get("name")).stem
-            if not playlist.get("disabled", False):
-                system_transfer_bytes = 0
-                for job in system_jobs:
+        if system_jobs:
+            for playlist in playlists:
+                name = Path(playlist.get("name")).stem
+                system_plan = SystemPlan(name=name, playlist_name=playlist.get("name"))
+                selected = selections.get(playlist.get("name"))
+                for kind, job in system_jobs:
+                    if getattr(job, "selective", False):
+                        job.selected = selected
                     job.setup(playlist)
-                    system_transfer_bytes += getattr(job, "transfer_bytes", 0)
-                systems[name] = {
-                    "name": name,
-                    "playlist": playlist,
-                    "transfer_bytes": system_transfer_bytes,
-                }
+                    job_plan = self._job_plan(job, kind, name)
+                    # The update rewrites the playlist and adds m3u files to the ROM folder, so
+                    # the jobs after it are planned again once it has run.
+                    job_plan.replan = (
+                        "playlist_update_job" in system_kinds and kind != "playlist_update_job"
+                    )
+                    system_plan.jobs.append(job_plan)
+                sync_plan.systems.append(system_plan)
 
-        total_transfer_bytes = sum(getattr(job, "transfer_bytes", 0) for job in jobs) + sum(
-            system["transfer_bytes"] for system in systems.values()
+        sync_plan.planning_seconds = time.monotonic() - started
+        logger.debug(
+            "runner: planned %s global jobs and %s systems in %.2fs (%s)",
+            len(sync_plan.global_jobs),
+            len(sync_plan.systems),
+            sync_plan.planning_seconds,
+            format_transfer_size(sync_plan.transfer_bytes),
         )
+        return sync_plan
 
-        overall_total = len(jobs) + (len(systems) if system_jobs else 0)
-        supports_per_file_progress = getattr(
-            getattr(self.transport, "capabilities", None), "per_file_callback", True
+    def target_plan(self, plan: SyncPlan):
+        # Turns a plan made for another target into one for this runner's target. Selections
+        # and converted files are taken over; each job is compared with this target again.
+        started = time.monotonic()
+        playlists_by_name = {p.get("name"): p for p in self.playlists}
+        target = replace(plan, global_jobs=[], systems=[])
+        for job_plan in plan.global_jobs:
+            job = self._global_job(job_plan)
+            if isinstance(job, JobBase):
+                job.inventory_cache = self.inventory_cache
+                job_plan = job.plan_for_target(job_plan)
+            target.global_jobs.append(job_plan)
+        for system_plan in plan.systems:
+            playlist = playlists_by_name.get(system_plan.playlist_name)
+            jobs = []
+            for job_plan in system_plan.jobs:
+                job = getattr(self.job_registry, job_plan.kind)(self.default, self.transport)
+                if isinstance(job, JobBase) and playlist is not None:
+                    job.inventory_cache = self.inventory_cache
+                    job.playlist = playlist
+                    job_plan = job.plan_for_target(job_plan)
+                jobs.append(job_plan)
+            target.systems.append(replace(system_plan, jobs=jobs))
+        target.planning_seconds = plan.planning_seconds + time.monotonic() - started
+        logger.debug(
+            "runner: planned %s global jobs and %s systems for the target in %.2fs (%s)",
+            len(target.global_jobs),
+            len(target.systems),
+            target.planning_seconds,
+            format_transfer_size(target.transfer_bytes),
         )
+        return target
 
-        self.reporter.start(
-            overall_total=overall_total, supports_per_file_progress=supports_per_file_progress
-        )
-        self._emit(
-            EventType.RUN_STARTED,
-            total=overall_total,
-            bytes_estimated=total_transfer_bytes,
-            data={
-                "supports_per_file_progress": supports_per_file_progress,
-                "dry_run": cfg.dry_run,
-            },
+    def _budget_summary(self, budget):
+        return {
+            "budget": budget.budget,
+            "used": budget.used,
+            "files": budget.file_count,
+            "skipped_entries": budget.skipped_entries,
+            "skipped_bytes": budget.skipped_bytes,
+        }
+
+    def _primary_rom_root(self):
+        # RomSyncJob sends from the first source root, so only its files can be picked.
+        src_roms = self.default.get("src_roms")
+        roots = src_roms if isinstance(src_roms, list) else [src_roms]
+        return Path(roots[0]) if roots and roots[0] else None
+
+    def _plan_budget(self, playlists):
+        rom_root = self._primary_rom_root()
+        if budget_bytes(self.default) is None or rom_root is None:
+            return None
+        return plan_budget(self.default, playlists, rom_root)
+
+    def _selected_roms(self, playlist, budget):
+        if budget is not None:
+            return budget.paths(playlist["name"])
+        referenced_only = playlist.get(
+            "roms_referenced_only", self.default.get("roms_referenced_only", False)
         )
+        rom_root = self._primary_rom_root()
+        if not referenced_only or rom_root is None:
+            return None
+        with span("runner.referenced_roms"):
+            return referenced_paths(self.default, playlist, rom_root)
+
+    def _parallel_setting(self, key):
         try:
-            self._raise_if_cancelled(cancel_token)
-            for idx, job in enumerate(jobs):
+            return max(1, int(self.default.get(key, 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    def _transfer_slot(self, job):
+        if self.transfer_slots is None or not getattr(job, "uses_transport", True):
+            return nullcontext()
+        return self.transfer_slots.slot()
+
+    def _run_systems(
+        self, cfg, plan, playlists_by_name, reporter, supports_per_file_progress, cancel_token
+    ):
+        systems = plan.systems
+        workers = min(self._parallel_setting("parallel_systems"), len(systems))
+        if workers <= 1:
+            for idx, system_plan in enumerate(systems):
                 self._raise_if_cancelled(cancel_token)
-                top_descr = f"[bold #AAAAAA]({idx} out of {len(jobs)} jobs done)"
-                self.reporter.update_overall(description=top_descr)
-                self._emit(EventType.OVERALL_UPDATED, message=top_descr)
-                job_size = format_transfer_size(getattr(job, "transfer_bytes", 0))
+                top_descr = f"[bold #AAAAAA]({idx} out of {len(systems)} systems synced)"
+                reporter.update_overall(description=top_descr)
+                self._emit(EventType.OVERALL_UPDATED, message=top_descr, system=system_plan.name)
+                self._run_system(
+                    cfg,
+                    system_plan,
+                    playlists_by_name[system_plan.playlist_name],
+                    reporter,
+                    supports_per_file_progress,
+                    cancel_token,
+                )
+            return
+
+        # Systems run on their own threads, so a failure in one of them has to stop the
+        # others without being reported as a user cancel.
+        lane_token = LinkedCancelToken(cancel_token)
+        if not isinstance(reporter, SerializedReporter):
+            reporter = SerializedReporter(reporter)
+        owns_slots = self.transfer_slots is None
+        if owns_slots:
+            self.transfer_slots = TransferSlots(self._parallel_setting("parallel_transfers"))
+        logger.debug(
+            "runner: running %s systems with %s workers and %s transfer slots",
+            len(systems),
+            workers,
+            self.transfer_slots.capacity,
+        )
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="sync-system"
+        )
+        futures = {
+            executor.submit(
+                self._run_system,
+                cfg,
+                system_plan,
+                playlists_by_name[system_plan.playlist_name],
+                reporter,
+                supports_per_file_progress,
+                lane_token,
+            ): system_plan
+            for system_plan in systems
+        }
+        try:
+            for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                future.result()
+                top_descr = f"[bold #AAAAAA]({done} out of {len(systems)} systems synced)"
+                reporter.update_overall(description=top_descr)
                 self._emit(
-                    EventType.JOB_STARTED,
-                    job=job.name,
-                    bytes_estimated=getattr(job, "transfer_bytes", 0),
+                    EventType.OVERALL_UPDATED, message=top_descr, system=futures[future].name
                 )
-                current_task_id = self.reporter.add_current_task(f"Run job {job.name} ({job_size})")
-                system_steps_task_id = self.reporter.add_system_steps(name=job.name, total=2)
-                self.reporter.advance_system_steps(system_steps_task_id, advance=1)
-                self.reporter.begin_transport_file_progress(
-                    job.size if supports_per_file_progress else 1
+        except BaseException as exc:
+            lane_token.cancel(str(exc) or "Stopping workers...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            if owns_slots:
+                self.transfer_slots = None
+
+    def _report_phase_done(self, reporter, count, what, total_transfer_bytes):
+        message = f"{count} {what} processed ({format_transfer_size(total_transfer_bytes)}), done!"
+        reporter.update_overall(description=f"[bold green]{message}")
+        self._emit(EventType.OVERALL_UPDATED, message=message)
+
+    def _run_lane(self, name, fn, *args):
+        started = time.monotonic()
+        try:
+            fn(*args)
+        finally:
+            self.lane_seconds[name] = round(time.monotonic() - started, 3)
+            logger.debug("runner: lane %s took %.2fs", name, self.lane_seconds[name])
+
+    def _run_lanes(
+        self, cfg, jobs, plan, playlists_by_name, supports_per_file_progress, cancel_token
+    ):
+        # Each independent global job gets a lane next to the systems lane. Jobs that read
+        # the systems' results (favorites) run at the end of the systems lane.
+        lane_token = LinkedCancelToken(cancel_token)
+        reporter = SerializedReporter(self.reporter)
+        independent = [
+            (job, job_plan) for job, job_plan in jobs if not getattr(job, "after_systems", False)
+        ]
+        dependent = [
+            (job, job_plan) for job, job_plan in jobs if getattr(job, "after_systems", False)
+        ]
+
+        def systems_lane():
+            if plan.systems:
+                self._run_systems(
+                    cfg,
+                    plan,
+                    playlists_by_name,
+                    reporter,
+                    supports_per_file_progress,
+                    lane_token,
                 )
-                self._emit(EventType.TRANSFER_STARTED, job=job.name, total=job.size)
-                try:
-                    cancel_check = cancel_token.is_cancelled
-                    if supports_per_file_progress:
-
-                        def callback(job_name=job.name):
-                            self._raise_if_cancelled(cancel_token)
-                            self.reporter.advance_transport_file_progress(step=1)
-                            self._emit(EventType.TRANSFER_ADVANCED, job=job_name, advance=1)
-                    else:
-                        callback = None
-                    job.do(callback=callback, cancel_check=cancel_check)
-                    self._raise_if_cancelled(cancel_token)
-                    if not supports_per_file_progress:
-                        self.reporter.advance_transport_file_progress(step=1)
-                        self._emit(EventType.TRANSFER_ADVANCED, job=job.name, advance=1)
-                    self.reporter.complete_transport_file_progress()
-                    self._emit(EventType.TRANSFER_FINISHED, job=job.name)
-                except TransportError as exc:
-                    interrupted = isinstance(exc.__cause__, KeyboardInterrupt) or (
-                        "interrupted by user" in str(exc).lower()
-                    )
-                    if interrupted:
-                        raise SyncAbortError("Stopping workers...") from exc
-                    raise SyncAbortError(f"Transfer aborted: {exc}") from exc
-                finally:
-                    self.reporter.end_transport_file_progress()
-                if cfg.dry_run:
-                    time.sleep(0.2)
-                self.reporter.advance_system_steps(system_steps_task_id, advance=1)
-                self.reporter.hide_system_steps(system_steps_task_id)
-                self.reporter.stop_current_task(
-                    current_task_id, description=f"[bold green]{job.name} synced ({job_size})"
+                self._report_phase_done(reporter, len(plan.systems), "systems", plan.transfer_bytes)
+            for job, job_plan in dependent:
+                self._run_global_job(
+                    cfg, job, job_plan, reporter, supports_per_file_progress, lane_token
                 )
-                self._emit(
-                    EventType.JOB_FINISHED,
-                    job=job.name,
-                    bytes_estimated=getattr(job, "transfer_bytes", 0),
-                )
-                self.reporter.update_overall(advance=1)
-                self._emit(EventType.OVERALL_UPDATED, advance=1)
 
-            self.reporter.update_overall(
-                description=(
-                    f"[bold green]{len(jobs)} jobs processed "
-                    f"({format_transfer_size(total_transfer_bytes)}), done!"
+        self.transfer_slots = TransferSlots(self._parallel_setting("parallel_transfers"))
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(independent) + 1, thread_name_prefix="sync-lane"
+        )
+        futures = [
+            executor.submit(
+                self._run_lane,
+                job.name,
+                self._run_global_job,
+                cfg,
+                job,
+                job_plan,
+                reporter,
+                supports_per_file_progress,
+                lane_token,
+            )
+            for job, job_plan in independent
+        ]
+        futures.append(executor.submit(self._run_lane, "Systems", systems_lane))
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        except BaseException as exc:
+            lane_token.cancel(str(exc) or "Stopping workers...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            self.transfer_slots = None
+        self._report_phase_done(reporter, len(jobs), "jobs", plan.transfer_bytes)
+
+    def _dag_nodes(
+        self, cfg, jobs, plan, playlists_by_name, reporter, supports_per_file_progress, token
+    ):
+        nodes = []
+        global_nodes = []
+        inputs = {}
+        outputs = {}
+        system_outputs = {}
+        for system_plan in plan.systems:
+            steps = [job_plan for job_plan in system_plan.jobs if self._job_pending(job_plan)]
+            playlist = playlists_by_name[system_plan.playlist_name]
+            task_ids = {}
+            begin_key = f"{system_plan.name}/begin"
+
+            def begin(system_plan=system_plan, task_ids=task_ids):
+                self._raise_if_cancelled(token)
+                task_ids["ids"] = self._begin_system(
+                    system_plan, reporter, supports_per_file_progress
                 )
+
+            nodes.append(JobNode(key=begin_key, run=begin))
+            step_keys = []
+            for job_plan in steps:
+                key = f"{system_plan.name}/{job_plan.kind}"
+
+                def step(
+                    system_plan=system_plan, job_plan=job_plan, playlist=playlist, ids=task_ids
+                ):
+                    self._run_system_step(
+                        cfg,
+                        system_plan,
+                        job_plan,
+                        playlist,
+                        reporter,
+                        supports_per_file_progress,
+                        token,
+                        ids["ids"][1],
+                    )
+
+                nodes.append(JobNode(key=key, run=step, needs=(begin_key,)))
+                inputs[key] = [
+                    f"{system_plan.name}:{name}" for name in self.job_registry.inputs(job_plan.kind)
+                ]
+                outputs[key] = [
+                    f"{system_plan.name}:{name}"
+                    for name in self.job_registry.outputs(job_plan.kind)
+                ]
+                for name in self.job_registry.outputs(job_plan.kind):
+                    system_outputs.setdefault(name, []).append(key)
+                step_keys.append(key)
+
+            def finish(system_plan=system_plan, task_ids=task_ids):
+                self._finish_system(cfg, system_plan, reporter, task_ids["ids"])
+
+            nodes.append(
+                JobNode(key=f"{system_plan.name}/finish", run=finish, needs=tuple(step_keys))
             )
-            self._emit(
-                EventType.OVERALL_UPDATED,
-                message=(
-                    f"{len(jobs)} jobs processed ({format_transfer_size(total_transfer_bytes)}), done!"
+
+        for job, job_plan in jobs:
+            needs = [
+                key
+                for name in self.job_registry.inputs(job_plan.kind)
+                for key in system_outputs.get(name, [])
+            ]
+            node = JobNode(
+                key=job_plan.kind,
+                run=lambda job=job, job_plan=job_plan: self._run_global_job(
+                    cfg, job, job_plan, reporter, supports_per_file_progress, token
                 ),
+                needs=tuple(needs),
             )
+            global_nodes.append(node)
+            inputs[node.key] = list(self.job_registry.inputs(job_plan.kind))
+            outputs[node.key] = list(self.job_registry.outputs(job_plan.kind))
+        # Global jobs are declared first so that a single worker starts them first.
+        return resolve_dependencies(global_nodes + nodes, inputs, outputs)
 
-            if cfg.do_update_playlists or cfg.do_sync_playlists or cfg.do_sync_roms:
-                for idx, key in enumerate(systems.keys()):
-                    self._raise_if_cancelled(cancel_token)
-                    name = systems[key]["name"]
-                    playlist = systems[key]["playlist"]
-                    top_descr = f"[bold #AAAAAA]({idx} out of {len(systems)} systems synced)"
-                    self.reporter.update_overall(description=top_descr)
-                    self._emit(EventType.OVERALL_UPDATED, message=top_descr, system=name)
-                    system_transfer_size = format_transfer_size(systems[key]["transfer_bytes"])
-                    self._emit(
-                        EventType.SYSTEM_STARTED,
-                        system=name,
-                        bytes_estimated=systems[key]["transfer_bytes"],
-                    )
-                    current_task_id = self.reporter.add_current_task(
-                        f"Syncing system {name} ({system_transfer_size})"
-                    )
+    def _run_dag(
+        self, cfg, jobs, plan, playlists_by_name, supports_per_file_progress, cancel_token
+    ):
+        # Any job whose inputs are ready runs on the worker pool, so the scan of the next
+        # system overlaps the uploads of the previous one. Transfers still share the slots.
+        dag_token = LinkedCancelToken(cancel_token)
+        reporter = SerializedReporter(self.reporter)
+        nodes = self._dag_nodes(
+            cfg, jobs, plan, playlists_by_name, reporter, supports_per_file_progress, dag_token
+        )
+        self.transfer_slots = TransferSlots(self._parallel_setting("parallel_transfers"))
+        try:
+            result = DagExecutor(
+                nodes, workers=self._parallel_setting("job_workers"), cancel=dag_token.cancel
+            ).run()
+        finally:
+            self.transfer_slots = None
+        self.critical_path = [
+            (node.key, round(node.seconds, 3))
+            for node in result.critical_path()
+            if not node.key.endswith(("/begin", "/finish"))
+        ]
+        logger.debug("runner: critical path %s", self.critical_path)
+        self._report_phase_done(
+            reporter, len(jobs) + len(plan.systems), "jobs", plan.transfer_bytes
+        )
 
-                    system_jobs_size = 0
-                    for job in system_jobs:
-                        job.setup(playlist)
-                        system_jobs_size += job.size
-
-                    if supports_per_file_progress:
-                        system_steps_total = system_jobs_size
-                    else:
-                        system_steps_total = len(system_jobs)
-                    system_steps_task_id = self.reporter.add_system_steps(
-                        name=name, total=system_steps_total
-                    )
-                    for job in system_jobs:
+    def _journal_key(self, job_plan):
+        if job_plan.system:
+            return f"{job_plan.system}/{job_plan.kind}"
+        return job_plan.kind
+
+    def _job_pending(self, job_plan):
+        if not job_plan.has_work():
+            return False
+        if self.resume_state is None:
+            return True
+        return not self.resume_state.job_done(
+            self._journal_key(job_plan), plan_fingerprint(job_plan)
+        )
+
+    def _space_root(self, dst):
+        # Each configured destination may live on its own filesystem, e.g. ROMs on an SD card.
+        roots = [
+            Path(value)
+            for key, value in self.default.items()
+            if key.startswith("dest_") and isinstance(value, str) and value
+        ]
+        matches = [root for root in roots if Path(dst).is_relative_to(root)]
+        return max(matches, key=lambda root: len(root.parts)) if matches else Path(dst)
+
+    def _check_free_space(self, cfg, plan):
+        mode = str(self.default.get("free_space_check", "refuse")).strip().lower()
+        free_space = getattr(self.transport, "free_space", None)
+        if mode == "off" or not callable(free_space):
+            return None
+        job_plans = [
+            job_plan for job_plan in plan.all_jobs() if job_plan.dst and self._job_pending(job_plan)
+        ]
+        # Inexact plans count the whole source, not what is missing on the target.
+        inexact = [job_plan.job for job_plan in job_plans if not job_plan.exact]
+        if inexact:
+            logger.debug("runner: free space check skips inexact plans: %s", inexact)
+        by_root = {}
+        for job_plan in job_plans:
+            if job_plan.exact:
+                by_root.setdefault(self._space_root(job_plan.dst), []).append(job_plan)
+        # Destinations that report the same free space are taken as one filesystem.
+        volumes = {}
+        for root, root_plans in by_root.items():
+            with span("runner.free_space"):
+                available = free_space(root)
+            if not isinstance(available, int):
+                logger.debug("runner: free space of %s is unknown, skipping the check", root)
+                continue
+            volume = volumes.setdefault(available, {"paths": [], "plans": []})
+            volume["paths"].append(root)
+            volume["plans"].extend(root_plans)
+        if not volumes:
+            return None
+
+        reserve = int(self.default.get("free_space_reserve_mb", DEFAULT_FREE_SPACE_RESERVE_MB))
+        checks = []
+        for available, volume in volumes.items():
+            usable = max(available - reserve * 1024**2, 0)
+            needed = sum(job_plan.net_bytes() for job_plan in volume["plans"])
+            target = volume["paths"][0]
+            logger.debug(
+                "runner: free space at %s is %s, the plan needs %s",
+                ", ".join(str(path) for path in volume["paths"]),
+                format_transfer_size(available),
+                format_transfer_size(needed),
+            )
+            checks.append((usable - needed, available, usable, needed, target, volume["plans"]))
+        _, available, usable, needed, target, volume_plans = min(checks, key=lambda c: c[0])
+        volume_ids = {id(job_plan) for job_plan in volume_plans}
+        fits, too_large = systems_that_fit(
+            plan,
+            usable,
+            include=lambda job_plan: id(job_plan) in volume_ids and self._job_pending(job_plan),
+        )
+        info = {
+            "path": str(target),
+            "available": available,
+            "needed": needed,
+            "fits": fits,
+            "too_large": too_large,
+            "message": None,
+        }
+        if needed <= usable:
+            return info
+        message = (
+            f"Not enough free space on the target: the sync needs {format_transfer_size(needed)}, "
+            f"{format_transfer_size(available)} are free at {target}"
+        )
+        if reserve:
+            message += f" ({reserve} MB kept in reserve)"
+        message += "."
+        if plan.systems:
+            message += (
+                f" Systems that fit: {', '.join(fits) or 'none'}."
+                f" Not enough room for: {', '.join(too_large)}."
+            )
+        info["message"] = message
+        if mode == "refuse" and not cfg.dry_run:
+            raise SyncAbortError(
+                f"{message} Sync fewer systems with --name, free up space on the device or "
+                'set free_space_check = "warn".'
+            )
+        logger.warning(message)
+        return info
+
+    def _attach_journal(self, job, job_plan):
+        if self.journal is None or not isinstance(job, JobBase):
+            return
+        key = self._journal_key(job_plan)
+        done_files = self.resume_state.done_files(key) if self.resume_state else {}
+        job.journal = JournalScope(self.journal, key, done_files)
+
+    def _flush_transport_caches(self):
+        # Block signatures are kept in memory during a job and written once it ends.
+        delta = getattr(self.transport, "delta", None)
+        if isinstance(delta, DeltaSync):
+            delta.flush()
+
+    def _journal_job_done(self, job_plan):
+        if self.journal is not None:
+            self.journal.record_job(self._journal_key(job_plan), plan_fingerprint(job_plan))
+
+    def _byte_meter(self, reporter, job, task_id, file_progress, system=None):
+        parent = self._system_meters.get(system, self.run_meter)
+
+        def listener(meter):
+            snapshot = meter.snapshot()
+            reporter.update_throughput(
+                task_id=task_id,
+                job=snapshot if file_progress else None,
+                system=parent.snapshot() if system is not None else snapshot,
+                overall=self.run_meter.snapshot() if self.run_meter is not None else None,
+            )
+            self._emit(
+                EventType.TRANSFER_BYTES,
+                system=system,
+                job=job.name,
+                bytes_estimated=snapshot["total"],
+                data={
+                    "bytes": snapshot["done"],
+                    "rate": round(snapshot["rate"], 1),
+                    "eta": None if snapshot["eta"] is None else round(snapshot["eta"], 1),
+                },
+            )
+
+        def on_file(path, size, seconds):
+            self._emit(
+                EventType.FILE_TRANSFERRED,
+                system=system,
+                job=job.name,
+                data={"path": path, "bytes": size, "seconds": round(seconds, 4)},
+            )
+
+        def on_retry(reason):
+            self._emit(EventType.TRANSFER_RETRIED, system=system, job=job.name, message=reason)
+
+        meter = ByteMeter(total=getattr(job, "transfer_bytes", 0), parent=parent, listener=listener)
+        meter.on_file = on_file
+        meter.on_retry = on_retry
+        return meter
+
+    def _run_global_job(
+        self, cfg, job, job_plan, reporter, supports_per_file_progress, cancel_token
+    ):
+        self._raise_if_cancelled(cancel_token)
+        if not self._job_pending(job_plan):
+            logger.debug("runner: job %s is up to date, skipping", job.name)
+            self._emit(EventType.JOB_FINISHED, job=job.name, bytes_estimated=0)
+            reporter.update_overall(advance=1)
+            self._emit(EventType.OVERALL_UPDATED, advance=1)
+            return
+        job_size = format_transfer_size(getattr(job, "transfer_bytes", 0))
+        self._emit(
+            EventType.JOB_STARTED,
+            job=job.name,
+            bytes_estimated=getattr(job, "transfer_bytes", 0),
+        )
+        current_task_id = reporter.add_current_task(f"Run job {job.name} ({job_size})")
+        system_steps_task_id = reporter.add_system_steps(name=job.name, total=2)
+        reporter.advance_system_steps(system_steps_task_id, advance=1)
+        file_progress = self.transfer_slots is None or getattr(job, "uses_transport", True)
+        self._attach_journal(job, job_plan)
+        with self._transfer_slot(job):
+            self._raise_if_cancelled(cancel_token)
+            if file_progress:
+                reporter.begin_transport_file_progress(
+                    job.size if supports_per_file_progress else 1
+                )
+            self._emit(EventType.TRANSFER_STARTED, job=job.name, total=job.size)
+            try:
+                cancel_check = cancel_token.is_cancelled
+                if supports_per_file_progress:
+
+                    def callback(job_name=job.name):
                         self._raise_if_cancelled(cancel_token)
-                        step_size = format_transfer_size(getattr(job, "transfer_bytes", 0))
-                        self._emit(
-                            EventType.STEP_STARTED,
-                            system=name,
-                            job=job.name,
-                            step=job.name,
-                            bytes_estimated=getattr(job, "transfer_bytes", 0),
-                        )
-                        step_task_id = self.reporter.add_step_task(
-                            action=f"{job.name} ({step_size})", name=name
-                        )
-                        if cfg.do_debug:
-                            time.sleep(1)
+                        if file_progress:
+                            reporter.advance_transport_file_progress(step=1)
+                        self._emit(EventType.TRANSFER_ADVANCED, job=job_name, advance=1)
+                else:
+                    callback = None
+                meter = self._byte_meter(reporter, job, system_steps_task_id, file_progress)
+                with metering(meter), span(f"job.{job.name}"), profile_phase(job.name):
+                    job.do(callback=callback, cancel_check=cancel_check)
+                if meter.done:
+                    meter.flush()
+                self._raise_if_cancelled(cancel_token)
+                if not supports_per_file_progress:
+                    if file_progress:
+                        reporter.advance_transport_file_progress(step=1)
+                    self._emit(EventType.TRANSFER_ADVANCED, job=job.name, advance=1)
+                if file_progress:
+                    reporter.complete_transport_file_progress()
+                self._emit(EventType.TRANSFER_FINISHED, job=job.name)
+            except TransportError as exc:
+                interrupted = isinstance(exc.__cause__, KeyboardInterrupt) or (
+                    "interrupted by user" in str(exc).lower()
+                )
+                if interrupted:
+                    raise SyncAbortError("Stopping workers...") from exc
+                raise SyncAbortError(f"Transfer aborted: {exc}") from exc
+            finally:
+                self._flush_transport_caches()
+                if file_progress:
+                    reporter.end_transport_file_progress()
+        if cfg.dry_run:
+            time.sleep(0.2)
+        self._journal_job_done(job_plan)
+        reporter.advance_system_steps(system_steps_task_id, advance=1)
+        reporter.hide_system_steps(system_steps_task_id)
+        reporter.stop_current_task(
+            current_task_id, description=f"[bold green]{job.name} synced ({job_size})"
+        )
+        self._emit(
+            EventType.JOB_FINISHED,
+            job=job.name,
+            bytes_estimated=getattr(job, "transfer_bytes", 0),
+        )
+        reporter.update_overall(advance=1)
+        self._emit(EventType.OVERALL_UPDATED, advance=1)
 
-                        job.setup(playlist)
-                        self.reporter.begin_transport_file_progress(
-                            job.size if supports_per_file_progress else 1
-                        )
-                        self._emit(
-                            EventType.TRANSFER_STARTED,
-                            system=name,
-                            job=job.name,
-                            total=job.size,
-                        )
-                        try:
-                            cancel_check = cancel_token.is_cancelled
-                            if supports_per_file_progress:
-
-                                def callback(
-                                    system_steps_task_id=system_steps_task_id,
-                                    system_name=name,
-                                    job_name=job.name,
-                                ):
-                                    self._raise_if_cancelled(cancel_token)
-                                    self.reporter.advance_system_steps(
-                                        system_steps_task_id, advance=1
-                                    )
-                                    self.reporter.advance_transport_file_progress(step=1)
-                                    self._emit(
-                                        EventType.TRANSFER_ADVANCED,
-                                        system=system_name,
-                                        job=job_name,
-                                        advance=1,
-                                    )
-                            else:
-                                callback = None
-                            job.do(callback=callback, cancel_check=cancel_check)
-                            self._raise_if_cancelled(cancel_token)
-                            if not supports_per_file_progress:
-                                self.reporter.advance_system_steps(system_steps_task_id, advance=1)
-                                self.reporter.advance_transport_file_progress(step=1)
-                                self._emit(
-                                    EventType.TRANSFER_ADVANCED,
-                                    system=name,
-                                    job=job.name,
-                                    advance=1,
-                                )
-                            self.reporter.complete_transport_file_progress()
-                            self._emit(EventType.TRANSFER_FINISHED, system=name, job=job.name)
-                        except TransportError as exc:
-                            interrupted = isinstance(exc.__cause__, KeyboardInterrupt) or (
-                                "interrupted by user" in str(exc).lower()
-                            )
-                            if interrupted:
-                                raise SyncAbortError("Stopping workers...") from exc
-                            raise SyncAbortError(f"Transfer aborted: {exc}") from exc
-                        finally:
-                            self.reporter.end_transport_file_progress()
-
-                        self.reporter.finish_step_task(step_task_id)
+    def _begin_system(self, system_plan, reporter, supports_per_file_progress):
+        name = system_plan.name
+        system_transfer_size = format_transfer_size(system_plan.transfer_bytes)
+        self._emit(
+            EventType.SYSTEM_STARTED,
+            system=name,
+            bytes_estimated=system_plan.transfer_bytes,
+        )
+        current_task_id = reporter.add_current_task(
+            f"Syncing system {name} ({system_transfer_size})"
+        )
+
+        pending = [job_plan for job_plan in system_plan.jobs if self._job_pending(job_plan)]
+        if supports_per_file_progress:
+            system_steps_total = sum(job_plan.file_count for job_plan in pending)
+        else:
+            system_steps_total = len(pending)
+        system_steps_task_id = reporter.add_system_steps(name=name, total=system_steps_total)
+        self._system_meters[name] = ByteMeter(
+            total=system_plan.transfer_bytes, parent=self.run_meter
+        )
+        return current_task_id, system_steps_task_id
+
+    def _finish_system(self, cfg, system_plan, reporter, task_ids):
+        name = system_plan.name
+        current_task_id, system_steps_task_id = task_ids
+        if cfg.dry_run:
+            time.sleep(0.2)
+        reporter.hide_system_steps(system_steps_task_id)
+        reporter.stop_current_task(
+            current_task_id,
+            description=(
+                f"[bold green]{name} synced "
+                f"({format_transfer_size(system_plan.transfer_bytes)})"
+            ),
+        )
+        self._emit(
+            EventType.SYSTEM_FINISHED,
+            system=name,
+            bytes_estimated=system_plan.transfer_bytes,
+        )
+        reporter.update_overall(advance=1)
+        self._emit(EventType.OVERALL_UPDATED, advance=1, system=name)
+
+    def _run_system_step(
+        self,
+        cfg,
+        system_plan,
+        job_plan,
+        playlist,
+        reporter,
+        supports_per_file_progress,
+        cancel_token,
+        system_steps_task_id,
+    ):
+        self._raise_if_cancelled(cancel_token)
+        name = system_plan.name
+        job = getattr(self.job_registry, job_plan.kind)(self.default, self.transport)
+        # The journal keeps the fingerprint of the plan the run started with.
+        journal_plan = job_plan
+        if job_plan.replan and not cfg.dry_run:
+            job_plan = self._replan_system_job(job, system_plan, job_plan, playlist)
+            if not job_plan.has_work():
+                logger.debug("runner: %s %s is up to date, skipping", name, job_plan.job)
+                self._journal_job_done(journal_plan)
+                return
+        self._prepare_system_job(job, job_plan, playlist)
+        self._attach_journal(job, job_plan)
+        step_size = format_transfer_size(getattr(job, "transfer_bytes", 0))
+        self._emit(
+            EventType.STEP_STARTED,
+            system=name,
+            job=job.name,
+            step=job.name,
+            bytes_estimated=getattr(job, "transfer_bytes", 0),
+        )
+        step_task_id = reporter.add_step_task(action=f"{job.name} ({step_size})", name=name)
+        if cfg.do_debug:
+            time.sleep(1)
+
+        # With concurrent systems only jobs holding a transfer slot drive the file bar.
+        file_progress = self.transfer_slots is None or getattr(job, "uses_transport", True)
+        with self._transfer_slot(job):
+            self._raise_if_cancelled(cancel_token)
+            if file_progress:
+                reporter.begin_transport_file_progress(
+                    job.size if supports_per_file_progress else 1
+                )
+            self._emit(
+                EventType.TRANSFER_STARTED,
+                system=name,
+                job=job.name,
+                total=job.size,
+            )
+            try:
+                cancel_check = cancel_token.is_cancelled
+                if supports_per_file_progress:
+
+                    def callback(
+                        system_steps_task_id=system_steps_task_id,
+                        system_name=name,
+                        job_name=job.name,
+                        file_progress=file_progress,
+                    ):
+                        self._raise_if_cancelled(cancel_token)
+                        reporter.advance_system_steps(system_steps_task_id, advance=1)
+                        if file_progress:
+                            reporter.advance_transport_file_progress(step=1)
                         self._emit(
-                            EventType.STEP_FINISHED, system=name, job=job.name, step=job.name
+                            EventType.TRANSFER_ADVANCED,
+                            system=system_name,
+                            job=job_name,
+                            advance=1,
                         )
-
-                    if cfg.dry_run:
-                        time.sleep(0.2)
-                    self.reporter.hide_system_steps(system_steps_task_id)
-                    self.reporter.stop_current_task(
-                        current_task_id,
-                        description=f"[bold green]{name} synced ({system_transfer_size})",
-                    )
+                else:
+                    callback = None
+                meter = self._byte_meter(
+                    reporter, job, system_steps_task_id, file_progress, system=name
+                )
+                with (
+                    metering(meter),
+                    span(f"job.{job.name}"),
+                    profile_phase(f"{name}/{job.name}"),
+                ):
+                    job.do(callback=callback, cancel_check=cancel_check)
+                if meter.done:
+                    meter.flush()
+                self._raise_if_cancelled(cancel_token)
+                if not supports_per_file_progress:
+                    reporter.advance_system_steps(system_steps_task_id, advance=1)
+                    if file_progress:
+                        reporter.advance_transport_file_progress(step=1)
                     self._emit(
-                        EventType.SYSTEM_FINISHED,
+                        EventType.TRANSFER_ADVANCED,
                         system=name,
-                        bytes_estimated=systems[key]["transfer_bytes"],
+                        job=job.name,
+                        advance=1,
                     )
-                    self.reporter.update_overall(advance=1)
-                    self._emit(EventType.OVERALL_UPDATED, advance=1, system=name)
+                if file_progress:
+                    reporter.complete_transport_file_progress()
+                self._emit(EventType.TRANSFER_FINISHED, system=name, job=job.name)
+            except TransportError as exc:
+                interrupted = isinstance(exc.__cause__, KeyboardInterrupt) or (
+                    "interrupted by user" in str(exc).lower()
+                )
+                if interrupted:
+                    raise SyncAbortError("Stopping workers...") from exc
+                raise SyncAbortError(f"Transfer aborted: {exc}") from exc
+            finally:
+                self._flush_transport_caches()
+                if file_progress:
+                    reporter.end_transport_file_progress()
 
-                self.reporter.update_overall(
-                    description=(
-                        f"[bold green]{len(systems)} systems processed "
-                        f"({format_transfer_size(total_transfer_bytes)}), done!"
-                    )
+        self._journal_job_done(journal_plan)
+        reporter.finish_step_task(step_task_id)
+        self._emit(EventType.STEP_FINISHED, system=name, job=job.name, step=job.name)
+
+    def _run_system(
+        self, cfg, system_plan, playlist, reporter, supports_per_file_progress, cancel_token
+    ):
+        self._raise_if_cancelled(cancel_token)
+        task_ids = self._begin_system(system_plan, reporter, supports_per_file_progress)
+        for job_plan in system_plan.jobs:
+            self._raise_if_cancelled(cancel_token)
+            if not self._job_pending(job_plan):
+                logger.debug(
+                    "runner: %s %s is up to date, skipping", system_plan.name, job_plan.job
                 )
-                self._emit(
-                    EventType.OVERALL_UPDATED,
-                    message=(
-                        f"{len(systems)} systems processed ({format_transfer_size(total_transfer_bytes)}), done!"
-                    ),
+                continue
+            self._run_system_step(
+                cfg,
+                system_plan,
+                job_plan,
+                playlist,
+                reporter,
+                supports_per_file_progress,
+                cancel_token,
+                task_ids[1],
+            )
+        self._finish_system(cfg, system_plan, reporter, task_ids)
+
+    def run(
+        self,
+        cfg: SyncRunConfig,
+        *,
+        system_name=None,
+        cancel_token=None,
+        plan=None,
+        resume=None,
+    ):
+        # A caller running several runners at once collects their timings itself.
+        timings = None
+        if cfg.do_timings and active_timings() is None:
+            timings = start_timings()
+        try:
+            with profile_phase("run"):
+                return self._run(
+                    cfg,
+                    system_name=system_name,
+                    cancel_token=cancel_token,
+                    plan=plan,
+                    resume=resume,
+                    timings=timings,
+                )
+        finally:
+            if timings is not None:
+                stop_timings()
+
+    def _run(self, cfg, *, system_name, cancel_token, plan, resume, timings):
+        cancel_token = cancel_token or CancelToken()
+        content_index = self._setup_content_index()
+        self.resume_state = resume
+        if resume is not None:
+            # The interrupted run continues under its own id with the plan it recorded.
+            self.run_id = resume.run_id
+            plan = plan or resume.plan
+        if plan is None:
+            with span("runner.plan"), profile_phase("plan"):
+                plan = self.plan(cfg, system_name=system_name)
+        space = self._check_free_space(cfg, plan)
+        execution_started = time.monotonic()
+        self.lane_seconds = {}
+        self.critical_path = []
+        self.run_meter = ByteMeter(total=plan.transfer_bytes)
+        self._system_meters = {}
+
+        playlists_by_name = {p.get("name"): p for p in self.playlists}
+        for system_plan in plan.systems:
+            if system_plan.playlist_name not in playlists_by_name:
+                raise SyncAbortError(
+                    f"Playlist '{system_plan.playlist_name}' from the sync plan is not configured."
                 )
+        self._run_playlists = [
+            playlists_by_name[system_plan.playlist_name] for system_plan in plan.systems
+        ]
+        self._run_budget = None
+        updates_first = self._reads_all_playlists(cfg, plan)
+        updates = self._pending_updates(plan) if updates_first else []
+
+        total_transfer_bytes = plan.transfer_bytes
+        overall_total = len(plan.global_jobs) + len(plan.systems) + len(updates)
+        supports_per_file_progress = getattr(
+            getattr(self.transport, "capabilities", None), "per_file_callback", True
+        )
+
+        self.reporter.start(
+            overall_total=overall_total, supports_per_file_progress=supports_per_file_progress
+        )
+        self._emit(
+            EventType.RUN_STARTED,
+            total=overall_total,
+            bytes_estimated=total_transfer_bytes,
+            data={
+                "supports_per_file_progress": supports_per_file_progress,
+                "dry_run": cfg.dry_run,
+                "planning_seconds": round(plan.planning_seconds, 3),
+            },
+        )
+        self.journal = None if cfg.dry_run else RunJournal.from_config(self.default)
+        if self.journal is not None:
+            self.journal.start(self.run_id, plan, resumed=resume is not None)
+        try:
+            self._raise_if_cancelled(cancel_token)
+            if updates_first:
+                self._run_updates_first(
+                    cfg,
+                    plan,
+                    updates,
+                    playlists_by_name,
+                    supports_per_file_progress,
+                    cancel_token,
+                )
+            jobs = [(self._global_job(job_plan), job_plan) for job_plan in plan.global_jobs]
+            if self._parallel_setting("job_workers") > 1:
+                self._run_dag(
+                    cfg, jobs, plan, playlists_by_name, supports_per_file_progress, cancel_token
+                )
+            elif jobs and self.default.get("parallel_global_jobs", False):
+                self._run_lanes(
+                    cfg, jobs, plan, playlists_by_name, supports_per_file_progress, cancel_token
+                )
+            else:
+                for idx, (job, job_plan) in enumerate(jobs):
+                    self._raise_if_cancelled(cancel_token)
+                    top_descr = f"[bold #AAAAAA]({idx} out of {len(jobs)} jobs done)"
+                    self.reporter.update_overall(description=top_descr)
+                    self._emit(EventType.OVERALL_UPDATED, message=top_descr)
+                    self._run_global_job(
+                        cfg, job, job_plan, self.reporter, supports_per_file_progress, cancel_token
+                    )
+                self._report_phase_done(self.reporter, len(jobs), "jobs", total_transfer_bytes)
+                if plan.systems:
+                    self._run_systems(
+                        cfg,
+                        plan,
+                        playlists_by_name,
+                        self.reporter,
+                        supports_per_file_progress,
+                        cancel_token,
+                    )
+                    self._report_phase_done(
+                        self.reporter, len(plan.systems), "systems", total_transfer_bytes
+                    )
             self.reporter.hide_transport_tasks()
             self._emit(EventType.RUN_FINISHED, bytes_estimated=total_transfer_bytes)
+            if self.journal is not None:
+                self.journal.finish()
         except SyncAbortError as exc:
             if cancel_token.is_cancelled() or "cancel" in str(exc).lower():
                 self._emit(EventType.RUN_CANCELLED, message=str(exc), error=str(exc))
@@ -434,15 +1341,115 @@ class SyncRunner:
             self._emit(EventType.RUN_CANCELLED, message="Stopping workers...", error=str(exc))
             raise SyncAbortError("Stopping workers...") from exc
         finally:
+            if self.journal is not None:
+                self.journal.close()
             self.reporter.finish()
+            self._flush_events()
+        execution_seconds = time.monotonic() - execution_started
+        # Jobs planned again after the playlist update report what they sent.
+        total_transfer_bytes = plan.transfer_bytes
 
         if cfg.dry_run:
             summary = (
-                f"Dry-run estimate: {format_transfer_size(total_transfer_bytes)} would be copied."
+                f"{plan.format_diff()}\n"
+                f"Dry-run estimate: {format_transfer_size(total_transfer_bytes)} "
+                f"in {plan.file_count} files would be copied."
             )
+            if plan.delete_count:
+                summary += f" {plan.delete_count} files would be deleted."
+            if space is not None and space["message"] is None:
+                summary += f" {format_transfer_size(space['available'])} free on the target."
         else:
             summary = f"Estimated transfer volume: {format_transfer_size(total_transfer_bytes)}."
+        if plan.budget is not None:
+            summary += (
+                f" Storage budget: {plan.budget['files']} files "
+                f"({format_transfer_size(plan.budget['used'])} of "
+                f"{format_transfer_size(plan.budget['budget'])}),"
+                f" {plan.budget['skipped_entries']} playlist entries left out."
+            )
+        summary += (
+            f" Planning took {plan.planning_seconds:.2f}s, execution {execution_seconds:.2f}s."
+        )
+        summary_data = {
+            "planning_seconds": round(plan.planning_seconds, 3),
+            "execution_seconds": round(execution_seconds, 3),
+            "files": plan.file_count,
+            "systems": {
+                system_plan.name: {
+                    "files": system_plan.file_count,
+                    "bytes": system_plan.transfer_bytes,
+                }
+                for system_plan in plan.systems
+            },
+        }
+        if plan.budget is not None:
+            summary_data["budget"] = plan.budget
+        if space is not None:
+            summary_data["free_space"] = space
+            if space["message"]:
+                summary += f" {space['message']}"
+        if resume is not None:
+            summary_data["resumed"] = True
+        if self.lane_seconds:
+            summary_data["lanes"] = dict(self.lane_seconds)
+        if self.critical_path:
+            summary += " Critical path: " + " -> ".join(
+                f"{key} ({seconds:.2f}s)" for key, seconds in self.critical_path
+            )
+            summary += "."
+            summary_data["critical_path"] = [
+                {"job": key, "seconds": seconds} for key, seconds in self.critical_path
+            ]
+        if content_index is not None and content_index.duplicate_count:
+            summary += (
+                f" Deduplicated {content_index.duplicate_count} files "
+                f"({format_transfer_size(content_index.bytes_saved)} saved)."
+            )
+            summary_data["dedup_files"] = content_index.duplicate_count
+            summary_data["dedup_bytes_saved"] = content_index.bytes_saved
+        upload_stats = getattr(self.transport, "upload_stats", None)
+        if isinstance(upload_stats, UploadStats):
+            utilisation = upload_stats.summary()
+            for worker, entry in utilisation.items():
+                logger.debug(
+                    "runner: upload worker=%s files=%s bytes=%s busy=%.2fs utilisation=%.0f%%",
+                    worker,
+                    entry["files"],
+                    entry["bytes"],
+                    entry["busy_seconds"],
+                    entry["utilisation"] * 100,
+                )
+            if utilisation:
+                summary_data["upload_workers"] = utilisation
+        delta = getattr(self.transport, "delta", None)
+        if isinstance(delta, DeltaSync) and delta.bytes_skipped:
+            summary += f" Delta transfer skipped {format_transfer_size(delta.bytes_skipped)}."
+            summary_data["delta_bytes_skipped"] = delta.bytes_skipped
+        transform = TransformStats()
+        for job_plan in plan.all_jobs():
+            if job_plan.transform:
+                transform.add(job_plan.transform)
+        if transform.files or transform.cached:
+            summary += (
+                f" Converted {transform.files} files in {transform.seconds:.2f}s"
+                f" ({transform.cached} from the cache):"
+                f" {format_transfer_size(transform.source_bytes)} became"
+                f" {format_transfer_size(transform.output_bytes)}."
+            )
+            summary_data["transform"] = transform.to_dict()
+        if timings is not None:
+            summary_data["timings"] = timings.to_dict()
+            table = timings.format_table()
+            if table:
+                summary += "\n" + table
         self.reporter.emit_summary(summary)
-        self._emit(EventType.SUMMARY_EMITTED, message=summary, bytes_estimated=total_transfer_bytes)
+        self._emit(
+            EventType.SUMMARY_EMITTED,
+            message=summary,
+            bytes_estimated=total_transfer_bytes,
+            data=summary_data,
+        )
+        self._flush_events()
 
         return total_transfer_bytes
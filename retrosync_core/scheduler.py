@@ -0,0 +1,108 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger()
+
+DEFAULT_SMALL_FILE_SIZE = 1024 * 1024
+DEFAULT_SMALL_INTERLEAVE = 4
+
+
+def plan_upload_order(
+    files,
+    size_of,
+    small_file_size=DEFAULT_SMALL_FILE_SIZE,
+    small_interleave=DEFAULT_SMALL_INTERLEAVE,
+):
+    ranked = sorted(files, key=size_of, reverse=True)
+    large = [item for item in ranked if size_of(item) >= small_file_size]
+    small = [item for item in ranked if size_of(item) < small_file_size]
+    if not large or not small or small_interleave <= 0:
+        return ranked
+
+    # Half of the small files keep the progress moving between large uploads, the
+    # other half stays at the tail where it fills the gaps left by the last large files.
+    interleaved_budget = len(small) // 2
+    tail = small[interleaved_budget:]
+    interleaved = small[:interleaved_budget]
+    order = []
+    for item in large:
+        order.append(item)
+        take = min(small_interleave, len(interleaved))
+        order.extend(interleaved[:take])
+        interleaved = interleaved[take:]
+    order.extend(interleaved)
+    order.extend(tail)
+    return order
+
+
+class TransferSlots:
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._waiting = []
+        self._counter = itertools.count()
+
+    @contextmanager
+    def slot(self, order=None):
+        # Waiters are served by their position in the planned order, so the order from
+        # plan_upload_order holds across concurrent batches; without one, first come first served.
+        ticket = (next(self._counter) if order is None else order, next(self._counter))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while self._in_use >= self.capacity or self._waiting[0] != ticket:
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._in_use += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify_all()
+
+
+class UploadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._first_start = None
+        self._last_finish = None
+
+    @contextmanager
+    def track(self, size):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            finished = time.monotonic()
+            worker = threading.current_thread().name
+            with self._lock:
+                entry = self._workers.setdefault(worker, {"files": 0, "bytes": 0, "busy": 0.0})
+                entry["files"] += 1
+                entry["bytes"] += size
+                entry["busy"] += finished - started
+                if self._first_start is None or started < self._first_start:
+                    self._first_start = started
+                if self._last_finish is None or finished > self._last_finish:
+                    self._last_finish = finished
+
+    def summary(self):
+        with self._lock:
+            if self._first_start is None:
+                return {}
+            wall = max(self._last_finish - self._first_start, 1e-9)
+            return {
+                worker: {
+                    "files": entry["files"],
+                    "bytes": entry["bytes"],
+                    "busy_seconds": round(entry["busy"], 3),
+                    "utilisation": round(min(entry["busy"] / wall, 1.0), 3),
+                }
+                for worker, entry in sorted(self._workers.items())
+            }
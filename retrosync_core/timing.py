@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import nullcontext
+
+_active = None
+_null_span = nullcontext()
+
+
+class TimingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                self._spans[name] = [1, seconds, seconds]
+                return
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": count,
+                    "seconds": round(total, 4),
+                    "max_seconds": round(longest, 4),
+                }
+                for name, (count, total, longest) in sorted(self._spans.items())
+            }
+
+    def format_table(self):
+        spans = sorted(self.to_dict().items(), key=lambda item: item[1]["seconds"], reverse=True)
+        if not spans:
+            return ""
+        lines = [f"{'Phase':<36} {'calls':>8} {'total':>10} {'avg':>10} {'max':>10}"]
+        for name, entry in spans:
+            avg = entry["seconds"] / entry["count"]
+            lines.append(
+                f"{name:<36} {entry['count']:>8} {entry['seconds']:>9.3f}s "
+                f"{avg:>9.4f}s {entry['max_seconds']:>9.4f}s"
+            )
+        return "\n".join(lines)
+
+
+class _Span:
+    __slots__ = ("stats", "name", "started")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def record(name, seconds):
+    stats = _active
+    if stats is not None:
+        stats.add(name, seconds)
+
+
+def span(name):
+    # Without an active collection this returns a shared no-op context manager.
+    stats = _active
+    if stats is None:
+        return _null_span
+    return _Span(stats, name)
+
+
+def active_timings():
+    return _active
+
+
+def start_timings():
+    global _active
+    if _active is None:
+        _active = TimingStats()
+    return _active
+
+
+def stop_timings():
+    global _active
+    stats = _active
+    _active = None
+    return stats
@@ -0,0 +1,266 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+
+from .inventory import file_digest
+from .paths import default_cache_dir
+from .transports import TransportError
+
+logger = logging.getLogger()
+
+TRANSFORM_VERSION = 1
+DEFAULT_THUMBNAIL_FORMAT = "png"
+THUMBNAIL_FORMATS = ("png", "png8")
+# Raw cartridge dumps, which the cores of these systems also load from a zip.
+REPACK_EXTENSIONS = (
+    ".32x",
+    ".a26",
+    ".gb",
+    ".gba",
+    ".gbc",
+    ".gen",
+    ".gg",
+    ".lnx",
+    ".md",
+    ".n64",
+    ".nes",
+    ".ngc",
+    ".ngp",
+    ".pce",
+    ".sfc",
+    ".smc",
+    ".sms",
+    ".v64",
+    ".ws",
+    ".wsc",
+    ".z64",
+)
+REPACK_LEVEL = 9
+
+
+@dataclass
+class TransformStats:
+    files: int = 0
+    cached: int = 0
+    seconds: float = 0.0
+    source_bytes: int = 0
+    output_bytes: int = 0
+
+    def add(self, other):
+        self.files += other.get("files", 0)
+        self.cached += other.get("cached", 0)
+        self.seconds += other.get("seconds", 0.0)
+        self.source_bytes += other.get("source_bytes", 0)
+        self.output_bytes += other.get("output_bytes", 0)
+
+    def to_dict(self):
+        data = asdict(self)
+        data["seconds"] = round(self.seconds, 3)
+        return data
+
+
+def _tmp_name(path: Path, suffix):
+    # Several targets may fill the same cache from their own threads.
+    return path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.{suffix}")
+
+
+def _run_transform(task):
+    transform, src, dst, params = task
+    tmp = _tmp_name(dst, "tmp")
+    transform(src, tmp, params)
+    os.replace(tmp, dst)
+    return dst
+
+
+def _link(src: Path, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_name(dst, "link")
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class TransformCache:
+    # Outputs are stored once per source digest and settings under objects/, and linked into
+    # tree/ under their relative path, so that tree/ can be synced like the source folder.
+    def __init__(self, root: Path, name, params):
+        key = json.dumps(
+            {"name": name, "params": params, "version": TRANSFORM_VERSION}, sort_keys=True
+        )
+        digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+        self.root = Path(root) / "transforms" / f"{name}-{digest}"
+        self.tree = self.root / "tree"
+        self.objects = self.root / "objects"
+        self.index_path = self.root / "index.json"
+        self.params = params
+
+    @classmethod
+    def from_config(cls, default, name, params):
+        cache_dir = Path(default.get("cache_dir") or default_cache_dir())
+        return cls(cache_dir, name, params)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = _tmp_name(self.index_path, "tmp")
+        with open(tmp_path, "w") as fd:
+            json.dump(index, fd)
+        os.replace(tmp_path, self.index_path)
+
+    def _digest(self, index, src: Path, rel):
+        stat = src.stat()
+        entry = index.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["digest"]
+        digest = file_digest(src)
+        index[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+        return digest
+
+    def apply(self, src_root: Path, rel_paths, transform, rename=None, workers=None, by_name=False):
+        started = time.monotonic()
+        stats = TransformStats()
+        index = self._load_index()
+        outputs = {}
+        pending = {}
+        for rel in rel_paths:
+            src = Path(src_root) / rel
+            out_rel = rename(rel) if rename else rel
+            try:
+                digest = self._digest(index, src, rel)
+            except OSError as exc:
+                logger.debug("TransformCache::apply: cannot read %s: %s", src, exc)
+                continue
+            if by_name:
+                # The output holds the file name, like the entry of a zip.
+                digest = hashlib.sha1(f"{digest}/{src.name}".encode()).hexdigest()
+            obj = self.objects / digest[:2] / f"{digest}{Path(out_rel).suffix}"
+            if obj.exists() or obj in pending:
+                stats.cached += 1
+            else:
+                pending[obj] = src
+            outputs[out_rel] = (src, obj)
+
+        if pending:
+            for obj in pending:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+            tasks = [(transform, src, obj, self.params) for obj, src in pending.items()]
+            workers = min(workers or os.cpu_count() or 1, len(tasks))
+            try:
+                if workers > 1:
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                        list(pool.map(_run_transform, tasks))
+                else:
+                    for task in tasks:
+                        _run_transform(task)
+            except OSError as exc:
+                raise TransportError(f"Cannot transform {self.root.name}: {exc}") from exc
+            stats.files = len(tasks)
+
+        inventory = {}
+        for out_rel, (src, obj) in outputs.items():
+            dst = self.tree / out_rel
+            if not dst.exists() or not os.path.samefile(dst, obj):
+                _link(obj, dst)
+            stat = dst.stat()
+            inventory[out_rel] = (stat.st_size, int(stat.st_mtime))
+            stats.source_bytes += src.stat().st_size
+            stats.output_bytes += stat.st_size
+        self._save_index(index)
+        stats.seconds = time.monotonic() - started
+        logger.debug(
+            "TransformCache::apply: %s transformed=%s cached=%s bytes=%s->%s in %.2fs",
+            self.root.name,
+            stats.files,
+            stats.cached,
+            stats.source_bytes,
+            stats.output_bytes,
+            stats.seconds,
+        )
+        return dict(sorted(inventory.items())), stats
+
+
+def thumbnail_params(default):
+    max_size = default.get("thumbnail_max_size")
+    if not max_size:
+        return None
+    return {
+        "max_size": int(max_size),
+        "format": str(default.get("thumbnail_format", DEFAULT_THUMBNAIL_FORMAT)).lower(),
+    }
+
+
+def downscale_image(src: Path, dst: Path, params):
+    try:
+        from PIL import Image
+    except ImportError as exc:
+        raise TransportError(
+            "thumbnail_max_size needs Pillow, install it with 'pip install pillow'."
+        ) from exc
+    try:
+        with Image.open(src) as image:
+            image.thumbnail((params["max_size"], params["max_size"]), Image.Resampling.LANCZOS)
+            if params["format"] == "png8":
+                image = image.convert("RGBA").quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+            image.save(dst, format="PNG", optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # A broken or unusual image is sent as it is rather than stopping the sync.
+        logger.debug("downscale_image: cannot convert %s, keeping the original (%s)", src, exc)
+        shutil.copyfile(src, dst)
+        return
+    # RetroArch looks thumbnails up by their .png name, so the container stays PNG; an image
+    # that was already small is kept as it is.
+    if dst.stat().st_size >= src.stat().st_size:
+        shutil.copyfile(src, dst)
+
+
+def repack_params(default, playlist):
+    enabled = playlist.get("repack_zip")
+    if enabled is None:
+        enabled = default.get("repack_zip", False)
+    if not enabled:
+        return None
+    return {"format": "zip", "level": REPACK_LEVEL, "folder": playlist.get("src_folder")}
+
+
+def repack_names(src_dir: Path, rel_paths):
+    # Maps the raw cartridges among rel_paths to the zip they are sent as. A file is kept as it
+    # is when another file of its folder has the same name, as both would end up in one zip.
+    stems = {}
+    repacked = {}
+    for rel in rel_paths:
+        path = PurePosixPath(rel)
+        if path.suffix.lower() not in REPACK_EXTENSIONS:
+            continue
+        if path.parent not in stems:
+            try:
+                names = os.listdir(Path(src_dir) / path.parent)
+            except OSError:
+                names = []
+            stems[path.parent] = Counter(Path(name).stem for name in names)
+        if stems[path.parent][path.stem] == 1:
+            repacked[rel] = path.with_suffix(".zip").as_posix()
+    return repacked
+
+
+def zip_rom(src: Path, dst: Path, params):
+    with zipfile.ZipFile(
+        dst, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=params["level"]
+    ) as archive:
+        archive.write(src, arcname=src.name)
@@ -1,25 +1,69 @@
 import base64
 import concurrent.futures
+import email.utils
 import fnmatch
 import logging
+import os
 import platform
+import posixpath
+import re
 import select
+import shlex
 import shutil
+import stat
 import subprocess
+import tempfile
 import threading
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
 from dataclasses import dataclass
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 import paramiko
+from lxml import etree
 
+from .delta import DeltaSync, read_range
+from .inventory import source_inventory
+from .manifest import walk_remote_tree
 from .paths import normalize_webdav_remote_path
+from .progress import (
+    ProgressReader,
+    RsyncProgressParser,
+    current_meter,
+    metering,
+    report_bytes,
+    report_file,
+    report_retry,
+)
+from .plan import (
+    ACTION_ADD,
+    ACTION_DELETE,
+    ACTION_UPDATE,
+    DEFAULT_MIRROR_MAX_DELETE_PERCENT,
+    diff_inventory,
+    plan_from_changes,
+    relative_plan_paths,
+)
+from .scheduler import (
+    DEFAULT_SMALL_FILE_SIZE,
+    DEFAULT_SMALL_INTERLEAVE,
+    TransferSlots,
+    UploadStats,
+    plan_upload_order,
+)
+from .timing import span
 
 logger = logging.getLogger()
 
+SFTP_DELETE_CHANNELS = 4
+REMOTE_RM_BATCH = 100
+QUOTA_PROPFIND = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<D:propfind xmlns:D="DAV:"><D:prop><D:quota-available-bytes/></D:prop></D:propfind>'
+)
+
 GLOBAL_EXCLUDE_PATTERNS = [
     ".DS_Store",
     "._*",
@@ -47,6 +91,9 @@ class TransportCapabilities:
     atomic_upload: bool = False
     parallel_upload: bool = False
     server_side_mkdir_cacheable: bool = False
+    server_side_copy: bool = False
+    mirror_delete: bool = False
+    remote_delete: bool = False
 
 
 def get_transport_mode(default):
@@ -87,6 +134,180 @@ class TransportFactory:
 
 class TransportBase:
     capabilities = TransportCapabilities()
+    content_index = None
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        raise NotImplementedError
+
+    def remote_copy_command(self, origin: Path, dest_filename: Path):
+        src = shlex.quote(str(origin))
+        dst = shlex.quote(str(dest_filename))
+        if str(self.default.get("dedup_link", "reflink")).strip().lower() == "hardlink":
+            return f"ln -f {src} {dst}"
+        return f"cp --reflink=auto -f {src} {dst}"
+
+    def dedup_origin(self, src_filename: Path, dest_filename: Path):
+        if self.content_index is None or self.dry_run:
+            return None
+        return self.content_index.register(src_filename, dest_filename)
+
+    def confirm_transfer(self, dest_filename: Path):
+        if self.content_index is not None:
+            self.content_index.confirm(dest_filename)
+
+    def dedup_partition(self, files):
+        # The uploads finish before the duplicates are copied from them.
+        if self.content_index is None or self.dry_run:
+            return files, []
+        uploads = []
+        duplicates = []
+        pending = set()
+        for src_filename, dest_filename in files:
+            origin = self.content_index.register(src_filename, dest_filename, pending=pending)
+            if origin is None:
+                uploads.append((src_filename, dest_filename))
+                pending.add(dest_filename)
+            else:
+                duplicates.append((src_filename, origin, dest_filename))
+        return uploads, duplicates
+
+    def materialize_duplicate(self, src_filename: Path, origin: Path, dest_filename: Path):
+        started = time.monotonic()
+        try:
+            self.remote_copy(origin, dest_filename)
+            logger.debug(
+                "%s::materialize_duplicate: %s -> %s", type(self).__name__, origin, dest_filename
+            )
+        except (NotImplementedError, RuntimeError, TransportError, OSError) as exc:
+            logger.debug(
+                "%s::materialize_duplicate: server-side copy failed, uploading %s (%s)",
+                type(self).__name__,
+                src_filename,
+                exc,
+            )
+            self.copy_file(src_filename, dest_filename)
+            self.confirm_transfer(dest_filename)
+            return
+        self.content_index.record_copy(src_filename)
+        self.confirm_transfer(dest_filename)
+        report_file(src_filename, 0, time.monotonic() - started)
+
+    def materialize_duplicates(self, duplicates, callback=None, cancel_check=None):
+        for src_filename, origin, dest_filename in duplicates:
+            if cancel_check and cancel_check():
+                raise TransportError("Transfer interrupted by user.")
+            self.materialize_duplicate(src_filename, origin, dest_filename)
+            if callback:
+                callback()
+
+    def remote_manifest(self, dest_path: Path):
+        return None
+
+    def free_space(self, dest_path: Path):
+        return None
+
+    def mirror_enabled(self):
+        if self.capabilities.mirror_delete:
+            return True
+        return self.capabilities.remote_delete and bool(self.default.get("mirror", False))
+
+    def plan_changes(self, job_plan, src_path: Path, dest_path: Path, inventory):
+        return self.plan_from_listing(job_plan, dest_path, inventory)
+
+    def plan_from_listing(self, job_plan, dest_path: Path, inventory):
+        return diff_inventory(
+            job_plan,
+            inventory,
+            self.remote_manifest(dest_path),
+            is_stale=self.is_stale,
+            mirror=self.mirror_enabled(),
+        )
+
+    def check_delete_cap(self, job_plan):
+        limit = float(
+            self.default.get("mirror_max_delete_percent", DEFAULT_MIRROR_MAX_DELETE_PERCENT)
+        )
+        percent = job_plan.delete_percent()
+        if percent > limit:
+            raise TransportError(
+                f"Mirror would delete {job_plan.count(ACTION_DELETE)} of "
+                f"{job_plan.remote_files} files in {job_plan.dst} ({percent:.0f}%), more than "
+                f"mirror_max_delete_percent = {limit:g}. Check the source folder or raise the limit."
+            )
+
+    def deletes_planned(self, job_plan):
+        return self.capabilities.remote_delete
+
+    def delete_planned(self, dest_path: Path, job_plan, cancel_check=None):
+        if not job_plan.delete_roots or not self.deletes_planned(job_plan):
+            return
+        self.check_delete_cap(job_plan)
+        if self.dry_run:
+            logger.debug(
+                "%s::delete_planned: dry-run %s deletions in %s",
+                type(self).__name__,
+                len(job_plan.delete_roots),
+                dest_path,
+            )
+            return
+        deleted_files = {entry.path for entry in job_plan.delete_entries()}
+        files = [root for root in job_plan.delete_roots if root in deleted_files]
+        folders = [root for root in job_plan.delete_roots if root not in deleted_files]
+        logger.debug(
+            "%s::delete_planned: %s files and %s folders in %s",
+            type(self).__name__,
+            len(files),
+            len(folders),
+            dest_path,
+        )
+        with span("transport.delete"):
+            self.delete_paths(dest_path, files, folders, cancel_check=cancel_check)
+
+    def is_stale(self, size, mtime, remote):
+        remote_size, remote_mtime = remote
+        if remote_size != size:
+            return True
+        return remote_mtime is not None and mtime > remote_mtime
+
+    def copy_file_list(
+        self, src_path: Path, dest_path: Path, rel_paths, callback=None, cancel_check=None
+    ):
+        parents = {dest_path}
+        for rel in rel_paths:
+            for idx in range(1, len(rel.parts)):
+                parents.add(dest_path.joinpath(*rel.parts[:idx]))
+        for parent in sorted(parents, key=lambda p: len(p.parts)):
+            if cancel_check and cancel_check():
+                raise TransportError("Transfer interrupted by user.")
+            self.ensure_dir_exists(parent)
+        total = len(rel_paths)
+        for idx, rel in enumerate(rel_paths, start=1):
+            if cancel_check and cancel_check():
+                raise TransportError("Transfer interrupted by user.")
+            src_filename = src_path / rel
+            dest_filename = dest_path / rel
+            logger.debug(
+                "%s::copy_file_list: [%s/%s] %s", type(self).__name__, idx, total, rel.as_posix()
+            )
+            origin = self.dedup_origin(src_filename, dest_filename)
+            if origin is not None:
+                self.materialize_duplicate(src_filename, origin, dest_filename)
+            else:
+                self.copy_file(src_filename, dest_filename, cancel_check=cancel_check)
+                self.confirm_transfer(dest_filename)
+            if callback:
+                callback()
+
+    def sync_planned(
+        self, src_path: Path, dest_path: Path, job_plan, callback=None, cancel_check=None
+    ):
+        self.copy_file_list(
+            src_path,
+            dest_path,
+            relative_plan_paths(job_plan),
+            callback=callback,
+            cancel_check=cancel_check,
+        )
 
     def is_excluded_path(self, path: Path):
         for part in path.parts:
@@ -145,6 +366,8 @@ class TransportUnixBase(TransportBase):
         atomic_upload=False,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
+        mirror_delete=True,
     )
 
     @staticmethod
@@ -183,7 +406,12 @@ class TransportUnixBase(TransportBase):
         logger.debug(f"execute: cmd={cmd}")
         if self.dry_run:
             return
+        with span("transport.execute"):
+            self._execute(cmd, cancel_check)
+
+    def _execute(self, cmd, cancel_check=None):
         p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        progress = RsyncProgressParser()
         poll = select.poll()
         if p.stdout:
             poll.register(p.stdout, select.POLLIN | select.POLLHUP)  # pyright: ignore
@@ -206,6 +434,7 @@ class TransportUnixBase(TransportBase):
                     if p.stdout and rfd == p.stdout.fileno():  # pyright: ignore
                         line = p.stdout.readline()  # pyright: ignore
                         logger.debug("execute: stdout=%s", line)
+                        report_bytes(progress.feed(line.decode(errors="replace")))
                     if p.stderr and rfd == p.stderr.fileno():  # pyright: ignore
                         line = p.stderr.readline()  # pyright: ignore
                         logger.debug("execute: stderr=%s", line)
@@ -226,13 +455,137 @@ class TransportUnixBase(TransportBase):
         args = "--outbuf=L --progress --verbose --human-readable --recursive --size-only --delete "
         for item in GLOBAL_EXCLUDE_PATTERNS:
             args += f'--exclude="{item}" '
-        if whitelist:
-            args += '--include="*/" '
-            for item in whitelist:
-                args += f'--include="*{item}" '
-            args += '--exclude="*" '
+        uploads, duplicates = self.rsync_duplicates(src_path, dest_path, whitelist, recursive)
+        with tempfile.NamedTemporaryFile("w", suffix=".exclude") as exclude_file:
+            if duplicates:
+                for src_filename, _, _ in duplicates:
+                    rel = src_filename.relative_to(src_path).as_posix()
+                    exclude_file.write(f"/{rsync_escape(rel)}\n")
+                exclude_file.flush()
+                args += f'--exclude-from="{exclude_file.name}" '
+            if whitelist:
+                args += '--include="*/" '
+                for item in whitelist:
+                    args += f'--include="*{item}" '
+                args += '--exclude="*" '
+            cmd = f'{self.command_prefix()} rsync {args} "{src_path}/" {self.build_dest(dest_path)}'
+            self.execute(cmd, cancel_check=cancel_check)
+        for _, dest_filename in uploads:
+            self.confirm_transfer(dest_filename)
+        self.materialize_duplicates(duplicates, cancel_check=cancel_check)
+
+    def copy_file_list(
+        self, src_path: Path, dest_path: Path, rel_paths, callback=None, cancel_check=None
+    ):
+        # One rsync run sends the whole list; --files-from creates the folders on the way.
+        if not rel_paths:
+            return
+        self.ensure_dir_exists(dest_path)
+        uploads, duplicates = self.dedup_partition(
+            [(src_path / rel, dest_path / rel) for rel in rel_paths]
+        )
+        if uploads:
+            args = "--outbuf=L --progress --verbose --human-readable --size-only --from0 "
+            with tempfile.NamedTemporaryFile("w", suffix=".files") as files_from:
+                for src_filename, _ in uploads:
+                    files_from.write(f"{src_filename.relative_to(src_path).as_posix()}\0")
+                files_from.flush()
+                args += f'--files-from="{files_from.name}" '
+                cmd = (
+                    f'{self.command_prefix()} rsync {args} "{src_path}/" '
+                    f"{self.build_dest(dest_path)}"
+                )
+                self.execute(cmd, cancel_check=cancel_check)
+            for _, dest_filename in uploads:
+                self.confirm_transfer(dest_filename)
+        self.materialize_duplicates(duplicates, cancel_check=cancel_check)
+        if callback:
+            for _ in rel_paths:
+                callback()
+
+    def deletes_planned(self, job_plan):
+        # A whole folder is mirrored by --delete while rsync copies it. Files that dropped out
+        # of a selection are not part of that run, so they are deleted beforehand.
+        return job_plan.selected is not None
+
+    def delete_paths(self, dest_path: Path, files, folders, cancel_check=None):
+        # Every listed path is missing from the empty source, so rsync deletes it.
+        args = "--recursive --no-implied-dirs --delete-missing-args --force --from0 "
+        with (
+            tempfile.TemporaryDirectory() as empty,
+            tempfile.NamedTemporaryFile("w", suffix=".files") as files_from,
+        ):
+            for rel in folders + files:
+                files_from.write(f"{rel}\0")
+            files_from.flush()
+            args += f'--files-from="{files_from.name}" '
+            cmd = f'{self.command_prefix()} rsync {args} "{empty}/" {self.build_dest(dest_path)}'
+            self.execute(cmd, cancel_check=cancel_check)
+
+    def is_stale(self, size, mtime, remote):
+        # rsync runs with --size-only, so the plan has to agree with it.
+        return remote[0] != size
+
+    def capture(self, cmd):
+        logger.debug(f"capture: cmd={cmd}")
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise TransportError(f"Command failed ({result.returncode}): {result.stderr.strip()}")
+        return result.stdout
+
+    def itemize_changes(self, src_path: Path, dest_path: Path):
+        args = "--dry-run --itemize-changes --recursive --size-only --delete "
+        for item in GLOBAL_EXCLUDE_PATTERNS:
+            args += f'--exclude="{item}" '
         cmd = f'{self.command_prefix()} rsync {args} "{src_path}/" {self.build_dest(dest_path)}'
-        self.execute(cmd, cancel_check=cancel_check)
+        return parse_itemized_changes(self.capture(cmd))
+
+    def plan_changes(self, job_plan, src_path: Path, dest_path: Path, inventory):
+        try:
+            changes = self.itemize_changes(src_path, dest_path)
+        except TransportError as exc:
+            logger.debug(f"TransportUnixBase::plan_changes: itemize failed for {dest_path}: {exc}")
+            return super().plan_changes(job_plan, src_path, dest_path, inventory)
+        return plan_from_changes(job_plan, inventory, changes)
+
+    def sync_planned(
+        self, src_path: Path, dest_path: Path, job_plan, callback=None, cancel_check=None
+    ):
+        # rsync already transfers only the delta and applies the planned deletions.
+        self.copy_files(
+            src_path,
+            dest_path,
+            whitelist=[],
+            recursive=True,
+            callback=callback,
+            cancel_check=cancel_check,
+        )
+
+    def rsync_duplicates(self, src_path: Path, dest_path: Path, whitelist: list, recursive):
+        if self.content_index is None or self.dry_run:
+            return [], []
+        # Only files rsync would send are copied on the server; the others are up to date.
+        try:
+            changed = {
+                path
+                for path, action in self.itemize_changes(src_path, dest_path)
+                if action != ACTION_DELETE
+            }
+        except TransportError as exc:
+            logger.debug(f"TransportUnixBase::rsync_duplicates: itemize failed: {exc}")
+            return [], []
+        generator = src_path.rglob("*") if recursive else src_path.glob("*")
+        files = []
+        for src_filename in sorted(generator):
+            if not src_filename.is_file():
+                continue
+            rel = src_filename.relative_to(src_path)
+            if self.is_excluded_path(rel) or rel.as_posix() not in changed:
+                continue
+            if whitelist and src_filename.suffix not in whitelist:
+                continue
+            files.append((src_filename, dest_path / rel))
+        return self.dedup_partition(files)
 
 
 class TransportFileSystemUnix(TransportUnixBase):
@@ -250,7 +603,20 @@ class TransportFileSystemUnix(TransportUnixBase):
         if cancel_check and cancel_check():
             raise TransportError("Transfer interrupted by user.")
         if not self.dry_run:
+            started = time.monotonic()
             shutil.copy(src_filename, dest_filename)
+            file_size = src_filename.stat().st_size
+            report_bytes(file_size)
+            report_file(src_filename, file_size, time.monotonic() - started)
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        link_local_duplicate(origin, dest_filename)
+
+    def remote_manifest(self, dest_path: Path):
+        return source_inventory(dest_path, exclude=self.is_excluded_path)
+
+    def free_space(self, dest_path: Path):
+        return local_free_space(dest_path)
 
 
 class TransportSSHUnix(TransportUnixBase):
@@ -271,14 +637,134 @@ class TransportSSHUnix(TransportUnixBase):
         if cancel_check and cancel_check():
             raise TransportError("Transfer interrupted by user.")
         cmd = f'{self.command_prefix()} scp "{src_filename}" {self.build_dest(dest_filename)}'
+        started = time.monotonic()
         self.execute(cmd, cancel_check=cancel_check)
+        if not self.dry_run:
+            file_size = src_filename.stat().st_size
+            report_bytes(file_size)
+            report_file(src_filename, file_size, time.monotonic() - started)
 
     def ensure_dir_exists(self, path_directory: Path):
         hostname = self.default.get("hostname")
         username = self.default.get("username")
         cmd = f"{self.command_prefix()} ssh {username}@{hostname} \"mkdir '{path_directory}'\""
+        with span("transport.mkdir"):
+            self.execute(cmd)
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        hostname = self.default.get("hostname")
+        username = self.default.get("username")
+        remote_cmd = shlex.quote(self.remote_copy_command(origin, dest_filename))
+        cmd = f"{self.command_prefix()} ssh {username}@{hostname} {remote_cmd}"
         self.execute(cmd)
 
+    def remote_manifest(self, dest_path: Path):
+        hostname = self.default.get("hostname")
+        username = self.default.get("username")
+        remote_cmd = shlex.quote(find_files_command(dest_path))
+        cmd = f"{self.command_prefix()} ssh {username}@{hostname} {remote_cmd}"
+        try:
+            manifest = parse_find_files(self.capture(cmd))
+        except TransportError as exc:
+            logger.debug(f"TransportSSHUnix::remote_manifest: listing {dest_path} failed: {exc}")
+            return None
+        return {
+            rel: value
+            for rel, value in manifest.items()
+            if not self.is_excluded_path(PurePosixPath(rel))
+        }
+
+    def free_space(self, dest_path: Path):
+        hostname = self.default.get("hostname")
+        username = self.default.get("username")
+        remote_cmd = shlex.quote(df_command(dest_path))
+        cmd = f"{self.command_prefix()} ssh {username}@{hostname} {remote_cmd}"
+        try:
+            return parse_df_available(self.capture(cmd))
+        except TransportError as exc:
+            logger.debug(f"TransportSSHUnix::free_space: df failed for {dest_path}: {exc}")
+            return None
+
+
+def parse_itemized_changes(output):
+    changes = []
+    for line in output.splitlines():
+        if line.startswith("*deleting"):
+            path = line[len("*deleting") :].strip()
+            if path and not path.endswith("/"):
+                changes.append((path, ACTION_DELETE))
+            continue
+        flags, _, path = line.partition(" ")
+        # Itemized lines look like ">f+++++++++ name" or ">f.st...... name".
+        if len(flags) < 3 or flags[1] != "f" or flags[0] not in "<>ch" or not path:
+            continue
+        action = ACTION_ADD if set(flags[2:]) == {"+"} else ACTION_UPDATE
+        changes.append((path, action))
+    return changes
+
+
+def rsync_escape(pattern):
+    return re.sub(r"([*?\[\]\\])", r"\\\1", pattern)
+
+
+def local_free_space(path: Path):
+    # The target folder may not exist before the first sync.
+    path = Path(path)
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return None
+
+
+def df_command(path):
+    return (
+        f"p={shlex.quote(str(path))}; "
+        'while [ ! -e "$p" ]; do p=$(dirname "$p"); done; df -Pk "$p"'
+    )
+
+
+def find_files_command(path):
+    # GNU find; a missing folder is an empty target.
+    quoted = shlex.quote(str(path))
+    return f"[ -d {quoted} ] || exit 0; find {quoted} -type f -printf '%s %T@ %P\\0'"
+
+
+def parse_find_files(output):
+    manifest = {}
+    for record in output.split("\0"):
+        size, mtime, rel = (record.split(" ", 2) + ["", ""])[:3]
+        if not rel or not size.isdigit():
+            continue
+        try:
+            manifest[rel] = (int(size), int(float(mtime)))
+        except ValueError:
+            continue
+    return dict(sorted(manifest.items()))
+
+
+def parse_df_available(output):
+    lines = [line for line in output.strip().splitlines() if line.strip()]
+    if len(lines) < 2:
+        return None
+    fields = lines[-1].split()
+    if len(fields) < 4 or not fields[3].isdigit():
+        return None
+    return int(fields[3]) * 1024
+
+
+def link_local_duplicate(origin: Path, dest_filename: Path):
+    dest_filename.parent.mkdir(parents=True, exist_ok=True)
+    if dest_filename.exists() or dest_filename.is_symlink():
+        if dest_filename.samefile(origin):
+            return
+        dest_filename.unlink()
+    try:
+        os.link(origin, dest_filename)
+    except OSError:
+        shutil.copy2(origin, dest_filename)
+
 
 class TransportWindowsBase(TransportBase):
     @staticmethod
@@ -298,6 +784,8 @@ class TransportWebDAV(TransportBase):
         atomic_upload=False,
         parallel_upload=True,
         server_side_mkdir_cacheable=True,
+        server_side_copy=True,
+        remote_delete=True,
     )
 
     def __init__(self, default, dry_run):
@@ -317,6 +805,12 @@ class TransportWebDAV(TransportBase):
             )
         except (TypeError, ValueError):
             self.max_workers = self.DEFAULT_MAX_WORKERS
+        self.delta = DeltaSync.from_config(self.default, self.base_url)
+        self.transfer_slots = TransferSlots(self.max_workers)
+        self.upload_stats = UploadStats()
+        self._partial_put = bool(self.default.get("webdav_partial_put", True))
+        self._partial_put_lock = threading.Lock()
+        self._partial_put_probed = False
         logger.debug(
             "TransportWebDAV::__ctor__: dry_run=%s host=%s username=%s max_workers=%s",
             self.dry_run,
@@ -361,13 +855,18 @@ class TransportWebDAV(TransportBase):
     def _remote_path(self, path_value: Path):
         return normalize_webdav_remote_path(path_value)
 
-    def _request_once(self, method, path, body=None, headers=None, ok_codes=(200, 201, 204, 207)):
+    def _request_once(
+        self, method, path, body=None, headers=None, ok_codes=(200, 201, 204, 207), read_body=False
+    ):
         request_headers = dict(headers or {})
         encoded_path = urllib.parse.quote(path, safe="/")
         url = f"{self.base_url}{encoded_path}"
         request = urllib.request.Request(url, data=body, headers=request_headers, method=method)
         logger.debug("TransportWebDAV::_request: method=%s path=%s", method, path)
-        with self._get_thread_opener().open(request, timeout=30) as response:
+        with (
+            span(f"webdav.{method}"),
+            self._get_thread_opener().open(request, timeout=30) as response,
+        ):
             if response.status not in ok_codes:
                 raise RuntimeError(f"WebDAV {method} {path} failed with HTTP {response.status}")
             logger.debug(
@@ -376,8 +875,12 @@ class TransportWebDAV(TransportBase):
                 path,
                 response.status,
             )
+            if read_body:
+                return response.read()
 
-    def _request(self, method, path, body=None, headers=None, ok_codes=(200, 201, 204, 207)):
+    def _request(
+        self, method, path, body=None, headers=None, ok_codes=(200, 201, 204, 207), read_body=False
+    ):
         def rewind_body():
             if body is None or not hasattr(body, "seek"):
                 return
@@ -388,11 +891,12 @@ class TransportWebDAV(TransportBase):
 
         try:
             rewind_body()
-            self._request_once(method, path, body=body, headers=headers, ok_codes=ok_codes)
-            return
+            return self._request_once(
+                method, path, body=body, headers=headers, ok_codes=ok_codes, read_body=read_body
+            )
         except urllib.error.HTTPError as exc:
             if exc.code in ok_codes:
-                return
+                return None
             if exc.code == 401 and self._auth_header:
                 retry_headers = dict(headers or {})
                 retry_headers["Authorization"] = self._auth_header
@@ -401,15 +905,20 @@ class TransportWebDAV(TransportBase):
                     method,
                     path,
                 )
+                report_retry(f"HTTP 401 on {method}")
                 try:
                     rewind_body()
-                    self._request_once(
-                        method, path, body=body, headers=retry_headers, ok_codes=ok_codes
+                    return self._request_once(
+                        method,
+                        path,
+                        body=body,
+                        headers=retry_headers,
+                        ok_codes=ok_codes,
+                        read_body=read_body,
                     )
-                    return
                 except urllib.error.HTTPError as retry_exc:
                     if retry_exc.code in ok_codes:
-                        return
+                        return None
                     raise RuntimeError(
                         f"WebDAV {method} {path} failed with HTTP 401 (Unauthorized). "
                         "Check [webdav] username/password and target path permissions."
@@ -450,6 +959,191 @@ class TransportWebDAV(TransportBase):
                 return False
             raise
 
+    def _href_to_remote(self, href):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(href).path)
+        base_path = urllib.parse.urlsplit(self.base_url).path.rstrip("/")
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path) :]
+        return "/" + path.strip("/")
+
+    def _propfind(self, path, depth="1"):
+        body = self._request(
+            "PROPFIND", path, headers={"Depth": depth}, ok_codes=(200, 207), read_body=True
+        )
+        entries = []
+        if not body:
+            return entries
+        root = etree.fromstring(body)
+        for response in root.iter("{DAV:}response"):
+            href = response.findtext("{DAV:}href")
+            if not href:
+                continue
+            size = None
+            mtime = None
+            is_dir = False
+            for prop in response.iter("{DAV:}prop"):
+                if prop.find("{DAV:}resourcetype/{DAV:}collection") is not None:
+                    is_dir = True
+                length = prop.findtext("{DAV:}getcontentlength")
+                if length and length.strip().isdigit():
+                    size = int(length)
+                modified = prop.findtext("{DAV:}getlastmodified")
+                if modified:
+                    try:
+                        mtime = int(email.utils.parsedate_to_datetime(modified.strip()).timestamp())
+                    except (TypeError, ValueError):
+                        mtime = None
+            entries.append(
+                {
+                    "path": self._href_to_remote(href),
+                    "size": size,
+                    "mtime": mtime,
+                    "is_dir": is_dir,
+                }
+            )
+        return entries
+
+    def _list_dir(self, remote):
+        try:
+            entries = self._propfind(remote, depth="1")
+        except RuntimeError as exc:
+            if "HTTP 404" in str(exc):
+                raise FileNotFoundError(remote) from exc
+            raise
+        remote = "/" + remote.strip("/")
+        files = {}
+        dirs = []
+        for entry in entries:
+            if entry["path"] == remote:
+                continue
+            name = posixpath.basename(entry["path"])
+            if entry["is_dir"]:
+                dirs.append(name)
+            else:
+                files[name] = (entry["size"] or 0, entry["mtime"])
+        return files, dirs
+
+    def is_stale(self, size, mtime, remote):
+        # Without a modification time a same-size edit cannot be told apart, so it is sent.
+        if remote[1] is None:
+            return True
+        return super().is_stale(size, mtime, remote)
+
+    def remote_manifest(self, dest_path: Path):
+        remote = self._remote_path(dest_path)
+        try:
+            return walk_remote_tree(remote, self._list_dir, exclude=self.is_excluded_path)
+        except (RuntimeError, OSError, etree.XMLSyntaxError) as exc:
+            logger.debug("TransportWebDAV::remote_manifest: listing %s failed (%s)", remote, exc)
+            return None
+
+    def free_space(self, dest_path: Path):
+        # RFC 4331 quota, read from the closest existing collection.
+        remote = self._remote_path(dest_path)
+        while True:
+            try:
+                body = self._request(
+                    "PROPFIND",
+                    remote,
+                    body=QUOTA_PROPFIND,
+                    headers={"Depth": "0", "Content-Type": 'application/xml; charset="utf-8"'},
+                    ok_codes=(200, 207),
+                    read_body=True,
+                )
+                break
+            except RuntimeError as exc:
+                if "HTTP 404" in str(exc) and remote != "/":
+                    remote = posixpath.dirname(remote)
+                    continue
+                logger.debug("TransportWebDAV::free_space: quota of %s failed (%s)", remote, exc)
+                return None
+            except TransportError:
+                return None
+        try:
+            root = etree.fromstring(body) if body else None
+        except etree.XMLSyntaxError:
+            return None
+        value = None if root is None else root.findtext(".//{DAV:}quota-available-bytes")
+        if value is None or not value.strip().isdigit():
+            return None
+        return int(value)
+
+    def _remote_size(self, path):
+        try:
+            entries = self._propfind(path, depth="0")
+        except RuntimeError as exc:
+            if "HTTP 404" in str(exc):
+                return None
+            raise
+        for entry in entries:
+            if not entry["is_dir"]:
+                return entry["size"]
+        return None
+
+    def _probe_partial_put(self, remote_dir):
+        # Servers that ignore Content-Range replace the whole file with the range body.
+        probe = posixpath.join(remote_dir, ".retrosync-range-probe")
+        headers = {"Content-Type": "application/octet-stream"}
+        try:
+            self._request("PUT", probe, body=b"0000", headers=headers)
+            self._request(
+                "PUT", probe, body=b"11", headers={**headers, "Content-Range": "bytes 1-2/4"}
+            )
+            supported = self._request("GET", probe, read_body=True) == b"0110"
+        except RuntimeError as exc:
+            logger.debug("TransportWebDAV::_probe_partial_put: probe failed (%s)", exc)
+            supported = False
+        try:
+            self._request("DELETE", probe, ok_codes=(200, 204, 404))
+        except RuntimeError as exc:
+            logger.debug("TransportWebDAV::_probe_partial_put: cleanup failed (%s)", exc)
+        logger.debug("TransportWebDAV::_probe_partial_put: supported=%s", supported)
+        return supported
+
+    def _partial_put_supported(self, remote):
+        with self._partial_put_lock:
+            if self._partial_put and not self._partial_put_probed:
+                self._partial_put_probed = True
+                self._partial_put = self._probe_partial_put(posixpath.dirname(remote))
+            return self._partial_put
+
+    def _delta_upload(self, src_filename: Path, remote, file_size, cancel_check=None):
+        remote_size = self._remote_size(remote)
+        ranges, blocks = self.delta.plan(remote, src_filename, remote_size=remote_size)
+        if ranges is None or remote_size is None or file_size < remote_size:
+            return None, blocks
+        try:
+            for offset, length in ranges:
+                if cancel_check and cancel_check():
+                    raise TransportError("Transfer interrupted by user.")
+                self._request(
+                    "PUT",
+                    remote,
+                    body=read_range(src_filename, offset, length),
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Range": f"bytes {offset}-{offset + length - 1}/{file_size}",
+                    },
+                )
+            if ranges and self._remote_size(remote) != file_size:
+                raise RuntimeError(f"WebDAV {remote} has unexpected size after ranged PUT")
+        except RuntimeError as exc:
+            logger.debug(
+                "TransportWebDAV::_delta_upload: ranged PUT unsupported, disabling (%s)", exc
+            )
+            self._partial_put = False
+            self.delta.forget(remote)
+            return None, blocks
+        sent = sum(length for _, length in ranges)
+        logger.debug(
+            "TransportWebDAV::_delta_upload: patched %s ranges=%s bytes=%s",
+            remote,
+            len(ranges),
+            sent,
+        )
+        self.delta.commit(remote, src_filename, blocks, ranges)
+        return sent, blocks
+
     def ensure_dir_exists(self, path_directory: Path):
         if self.dry_run:
             return
@@ -473,6 +1167,40 @@ class TransportWebDAV(TransportBase):
             with self._dir_lock:
                 self._known_dirs.add(current)
 
+    def _delete(self, remote, cancel_check=None):
+        if cancel_check and cancel_check():
+            raise TransportError("Transfer interrupted by user.")
+        self._request("DELETE", remote, ok_codes=(200, 204, 404))
+        with self._dir_lock:
+            self._known_dirs = {
+                known
+                for known in self._known_dirs
+                if known != remote and not known.startswith(f"{remote}/")
+            }
+
+    def delete_paths(self, dest_path: Path, files, folders, cancel_check=None):
+        # A DELETE on a folder removes everything below it in one request.
+        remotes = [self._remote_path(dest_path / rel) for rel in folders + files]
+        workers = min(self.max_workers, len(remotes))
+        if workers <= 1:
+            for remote in remotes:
+                self._delete(remote, cancel_check)
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="webdav-delete"
+        ) as executor:
+            for _ in executor.map(lambda remote: self._delete(remote, cancel_check), remotes):
+                pass
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        destination = urllib.parse.quote(self._remote_path(dest_filename), safe="/")
+        self._request(
+            "COPY",
+            self._remote_path(origin),
+            headers={"Destination": f"{self.base_url}{destination}", "Overwrite": "T"},
+            ok_codes=(201, 204),
+        )
+
     def copy_file(
         self, src_filename: Path, dest_filename: Path, *, ensure_parent=True, cancel_check=None
     ):
@@ -494,13 +1222,29 @@ class TransportWebDAV(TransportBase):
             file_size,
         )
         started = time.monotonic()
+        blocks = None
+        if (
+            self.delta is not None
+            and self.delta.applies_to(file_size)
+            and self._partial_put_supported(remote)
+        ):
+            sent, blocks = self._delta_upload(src_filename, remote, file_size, cancel_check)
+            if sent is not None:
+                report_bytes(sent)
+                report_file(src_filename, sent, time.monotonic() - started)
+                return
+        meter = current_meter()
         with open(src_filename, "rb") as fd:
             if cancel_check and cancel_check():
                 raise TransportError("Transfer interrupted by user.")
+            body = fd if meter is None else ProgressReader(fd, meter)
             self._request(
-                "PUT", remote, body=fd, headers={"Content-Type": "application/octet-stream"}
+                "PUT", remote, body=body, headers={"Content-Type": "application/octet-stream"}
             )
+        if blocks is not None:
+            self.delta.commit(remote, src_filename, blocks)
         elapsed = time.monotonic() - started
+        report_file(src_filename, file_size, elapsed)
         logger.debug(
             "TransportWebDAV::copy_file: upload done src=%s dest=%s bytes=%s elapsed=%.2fs",
             src_filename,
@@ -540,8 +1284,24 @@ class TransportWebDAV(TransportBase):
                 continue
             files.append((src_filename, dest_path / rel))
 
-        total = len(files)
-        if total == 0:
+        self.upload_tree(files, callback=callback, cancel_check=cancel_check)
+
+    def copy_file_list(
+        self, src_path: Path, dest_path: Path, rel_paths, callback=None, cancel_check=None
+    ):
+        if self.dry_run:
+            logger.debug(
+                "TransportWebDAV::copy_file_list: dry-run %s files %s -> %s",
+                len(rel_paths),
+                src_path,
+                dest_path,
+            )
+            return
+        files = [(src_path / rel, dest_path / rel) for rel in rel_paths]
+        self.upload_tree(files, callback=callback, cancel_check=cancel_check)
+
+    def upload_tree(self, files, callback=None, cancel_check=None):
+        if not files:
             return
 
         unique_parents = sorted({dest.parent for _, dest in files}, key=lambda p: len(p.parts))
@@ -550,6 +1310,47 @@ class TransportWebDAV(TransportBase):
                 raise TransportError("Transfer interrupted by user.")
             self.ensure_dir_exists(parent)
 
+        files, duplicates = self.dedup_partition(files)
+        self.upload_files(files, callback=callback, cancel_check=cancel_check)
+        self.materialize_duplicates(duplicates, callback=callback, cancel_check=cancel_check)
+
+    def _file_size(self, src_filename: Path):
+        try:
+            return src_filename.stat().st_size
+        except OSError:
+            return 0
+
+    def _upload_scheduled(
+        self, src_filename: Path, dest_filename: Path, size, order=None, cancel_check=None
+    ):
+        with self.transfer_slots.slot(order), self.upload_stats.track(size):
+            self.copy_file(
+                src_filename, dest_filename, ensure_parent=False, cancel_check=cancel_check
+            )
+        self.confirm_transfer(dest_filename)
+
+    def upload_files(self, files, callback=None, cancel_check=None):
+        total = len(files)
+        if total == 0:
+            return
+
+        sizes = {src_filename: self._file_size(src_filename) for src_filename, _ in files}
+        files = plan_upload_order(
+            files,
+            lambda item: sizes[item[0]],
+            small_file_size=int(
+                self.default.get("upload_small_file_size", DEFAULT_SMALL_FILE_SIZE)
+            ),
+            small_interleave=int(
+                self.default.get("upload_small_interleave", DEFAULT_SMALL_INTERLEAVE)
+            ),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "TransportWebDAV::upload_files: order %s",
+                ", ".join(f"{src.name}({sizes[src]})" for src, _ in files),
+            )
+
         if self.max_workers <= 1 or total == 1:
             for idx, (src_filename, dest_filename) in enumerate(files, start=1):
                 if cancel_check and cancel_check():
@@ -561,11 +1362,8 @@ class TransportWebDAV(TransportBase):
                     src_filename,
                     dest_filename,
                 )
-                self.copy_file(
-                    src_filename,
-                    dest_filename,
-                    ensure_parent=False,
-                    cancel_check=cancel_check,
+                self._upload_scheduled(
+                    src_filename, dest_filename, sizes[src_filename], cancel_check=cancel_check
                 )
                 if callback:
                     callback()
@@ -577,14 +1375,26 @@ class TransportWebDAV(TransportBase):
             total,
         )
 
+        # Worker threads do not inherit the caller's byte meter.
+        meter = current_meter()
+
+        positions = {src_filename: idx for idx, (src_filename, _) in enumerate(files)}
+
         def upload_one(src_filename, dest_filename):
             if cancel_check and cancel_check():
                 raise TransportError("Transfer interrupted by user.")
-            self.copy_file(
-                src_filename, dest_filename, ensure_parent=False, cancel_check=cancel_check
-            )
+            with metering(meter):
+                self._upload_scheduled(
+                    src_filename,
+                    dest_filename,
+                    sizes[src_filename],
+                    order=positions[src_filename],
+                    cancel_check=cancel_check,
+                )
 
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="webdav-upload"
+        )
         interrupted = False
         future_to_index = {}
         try:
@@ -629,6 +1439,7 @@ class TransportFileSystemWindows(TransportWindowsBase):
         atomic_upload=True,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
     )
 
     def __init__(self, default, dry_run):
@@ -649,7 +1460,11 @@ class TransportFileSystemWindows(TransportWindowsBase):
             raise TransportError("Transfer interrupted by user.")
         self.ensure_dir_exists(dest_filename.parent)
         if not self.dry_run:
+            started = time.monotonic()
             shutil.copy(src_filename, dest_filename)
+            file_size = src_filename.stat().st_size
+            report_bytes(file_size)
+            report_file(src_filename, file_size, time.monotonic() - started)
 
     def copy_files(
         self,
@@ -686,8 +1501,35 @@ class TransportFileSystemWindows(TransportWindowsBase):
                     continue
                 if callback:
                     callback()
-                if not self.dry_run:
+                if self.is_up_to_date(s, d):
+                    logger.debug(f"TransportFileSystemWindows::copy_files: up to date {s}")
+                    continue
+                origin = self.dedup_origin(s, d)
+                if origin is not None:
+                    self.materialize_duplicate(s, origin, d)
+                elif not self.dry_run:
                     shutil.copy2(s, d)
+                    self.confirm_transfer(d)
+
+    def is_up_to_date(self, src_filename: Path, dest_filename: Path):
+        # copy2 keeps the modification time, so an unchanged copy has the same size and mtime.
+        try:
+            src_stat = src_filename.stat()
+            dest_stat = dest_filename.stat()
+        except OSError:
+            return False
+        return not self.is_stale(
+            src_stat.st_size, int(src_stat.st_mtime), (dest_stat.st_size, int(dest_stat.st_mtime))
+        )
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        link_local_duplicate(origin, dest_filename)
+
+    def remote_manifest(self, dest_path: Path):
+        return source_inventory(dest_path, exclude=self.is_excluded_path)
+
+    def free_space(self, dest_path: Path):
+        return local_free_space(dest_path)
 
 
 class TransportSSHWindows(TransportWindowsBase):
@@ -698,6 +1540,8 @@ class TransportSSHWindows(TransportWindowsBase):
         atomic_upload=False,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
+        remote_delete=True,
     )
 
     def __init__(self, default, dry_run):
@@ -707,21 +1551,26 @@ class TransportSSHWindows(TransportWindowsBase):
         self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.sftp = None
         self.connected = False
+        namespace = f"sftp://{self.default.get('username')}@{self.default.get('hostname')}"
+        self.delta = DeltaSync.from_config(self.default, namespace)
         logger.debug(f"TransportSSHWindows::__ctor__: dry_run={self.dry_run}")
 
-    def connect(self):
-        if self.dry_run:
+    def connect(self, listing=False):
+        # Dry runs still connect to read the remote listing, but never to write.
+        if self.dry_run and not listing:
             return
         if self.connected:
             return
         logger.debug("TransportSSHWindows::connect start")
-        self.ssh.connect(
-            self.default.get("hostname"),
-            username=self.default.get("username"),
-            password=self.default.get("password"),
-        )
-        logger.debug("TransportSSHWindows::connect connected")
-        self.sftp = self.ssh.open_sftp()
+        with span("transport.connect"):
+            self.ssh.connect(
+                self.default.get("hostname"),
+                port=int(self.default.get("port") or 22),
+                username=self.default.get("username"),
+                password=self.default.get("password"),
+            )
+            logger.debug("TransportSSHWindows::connect connected")
+            self.sftp = self.ssh.open_sftp()
         logger.debug("TransportSSHWindows::connect sftp opened")
         self.connected = True
 
@@ -742,16 +1591,181 @@ class TransportSSHWindows(TransportWindowsBase):
                 int(src_file_attr.st_mtime) > int(dest_file_attr.st_mtime)  # type: ignore
                 or src_file_attr.st_size != dest_file_attr.st_size
             ):
-                self.sftp.put(str(src_filename), str(dest_filename))
+                self.put_file(src_filename, dest_filename, remote_size=dest_file_attr.st_size)
                 logger.debug(
                     f"TransportSSHWindows::copy_file: newer {src_filename} to {dest_filename}"
                 )
         except FileNotFoundError:
-            self.sftp.put(str(src_filename), str(dest_filename))
+            self.put_file(src_filename, dest_filename)
             logger.debug(
                 f"TransportSSHWindows::copy_file: created {src_filename} to {dest_filename}"
             )
 
+    def put_file(self, src_filename: Path, dest_filename: Path, origin=None, remote_size=None):
+        if origin is not None:
+            self.materialize_duplicate(src_filename, origin, dest_filename)
+            return
+        blocks = None
+        remote = str(dest_filename)
+        started = time.monotonic()
+        file_size = src_filename.stat().st_size
+        if self.delta is not None and self.delta.applies_to(file_size):
+            ranges, blocks = self.delta.plan(remote, src_filename, remote_size=remote_size)
+            if ranges is not None and remote_size is not None:
+                if self._write_ranges(src_filename, dest_filename, ranges, remote_size):
+                    self.delta.commit(remote, src_filename, blocks, ranges)
+                    sent = sum(length for _, length in ranges)
+                    report_bytes(sent)
+                    report_file(src_filename, sent, time.monotonic() - started)
+                    self.confirm_transfer(dest_filename)
+                    return
+        sent = 0
+
+        def progress(transferred, _total):
+            nonlocal sent
+            report_bytes(transferred - sent)
+            sent = transferred
+
+        self.sftp.put(str(src_filename), remote, callback=progress)
+        if blocks is not None:
+            self.delta.commit(remote, src_filename, blocks)
+        report_file(src_filename, file_size, time.monotonic() - started)
+        self.confirm_transfer(dest_filename)
+
+    def _write_ranges(self, src_filename: Path, dest_filename: Path, ranges, remote_size):
+        file_size = src_filename.stat().st_size
+        try:
+            with self.sftp.open(str(dest_filename), "r+") as remote_file:
+                for offset, length in ranges:
+                    remote_file.seek(offset)
+                    remote_file.write(read_range(src_filename, offset, length))
+                if file_size < remote_size:
+                    remote_file.truncate(file_size)
+        except OSError as exc:
+            logger.debug(
+                f"TransportSSHWindows::_write_ranges: patch failed for {dest_filename}: {exc}"
+            )
+            self.delta.forget(str(dest_filename))
+            return False
+        logger.debug(
+            f"TransportSSHWindows::_write_ranges: patched {dest_filename} ranges={len(ranges)}"
+        )
+        return True
+
+    def remote_copy(self, origin: Path, dest_filename: Path):
+        self.connect()
+        _, stdout, stderr = self.ssh.exec_command(self.remote_copy_command(origin, dest_filename))
+        status = stdout.channel.recv_exit_status()
+        if status != 0:
+            raise TransportError(
+                f"Remote copy {origin} -> {dest_filename} failed: {stderr.read().decode().strip()}"
+            )
+
+    def _remove_files(self, sftp, remotes, cancel_check=None):
+        for remote in remotes:
+            if cancel_check and cancel_check():
+                raise TransportError("Transfer interrupted by user.")
+            try:
+                sftp.remove(remote)
+            except FileNotFoundError:
+                continue
+
+    def _remove_files_parallel(self, remotes, cancel_check=None):
+        # SFTP has no batch delete, so the removals are spread over a few extra channels.
+        workers = min(SFTP_DELETE_CHANNELS, len(remotes))
+        if workers <= 1:
+            self._remove_files(self.sftp, remotes, cancel_check)
+            return
+
+        def remove_batch(batch):
+            sftp = self.ssh.open_sftp()
+            try:
+                self._remove_files(sftp, batch, cancel_check)
+            finally:
+                sftp.close()
+
+        batches = [remotes[idx::workers] for idx in range(workers)]
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="sftp-delete"
+        ) as executor:
+            for _ in executor.map(remove_batch, batches):
+                pass
+
+    def _remove_tree(self, remote, cancel_check=None):
+        try:
+            entries = self.sftp.listdir_attr(remote)
+        except FileNotFoundError:
+            return
+        files = []
+        for attr in entries:
+            path = posixpath.join(remote, attr.filename)
+            if stat.S_ISDIR(attr.st_mode or 0):
+                self._remove_tree(path, cancel_check)
+            else:
+                files.append(path)
+        self._remove_files_parallel(files, cancel_check)
+        self.sftp.rmdir(remote)
+
+    def _remove_folders(self, remotes, cancel_check=None):
+        # One `rm -rf` per batch of folders; servers without a shell get an SFTP walk.
+        for idx in range(0, len(remotes), REMOTE_RM_BATCH):
+            if cancel_check and cancel_check():
+                raise TransportError("Transfer interrupted by user.")
+            batch = remotes[idx : idx + REMOTE_RM_BATCH]
+            try:
+                _, stdout, _ = self.ssh.exec_command(
+                    "rm -rf -- " + " ".join(shlex.quote(remote) for remote in batch)
+                )
+                if stdout.channel.recv_exit_status() == 0:
+                    continue
+            except paramiko.SSHException as exc:
+                logger.debug(f"TransportSSHWindows::_remove_folders: exec failed: {exc}")
+            for remote in batch:
+                self._remove_tree(remote, cancel_check)
+
+    def delete_paths(self, dest_path: Path, files, folders, cancel_check=None):
+        self.connect()
+        self._remove_folders([str(dest_path / rel) for rel in folders], cancel_check)
+        self._remove_files_parallel([str(dest_path / rel) for rel in files], cancel_check)
+
+    def _list_dir(self, remote):
+        files = {}
+        dirs = []
+        for attr in self.sftp.listdir_attr(remote):
+            if stat.S_ISDIR(attr.st_mode or 0):
+                dirs.append(attr.filename)
+            else:
+                files[attr.filename] = (attr.st_size, int(attr.st_mtime))
+        return files, dirs
+
+    def remote_manifest(self, dest_path: Path):
+        try:
+            self.connect(listing=True)
+            return walk_remote_tree(str(dest_path), self._list_dir, exclude=self.is_excluded_path)
+        except (OSError, paramiko.SSHException) as exc:
+            logger.debug(f"TransportSSHWindows::remote_manifest: listing {dest_path} failed: {exc}")
+            return None
+
+    def free_space(self, dest_path: Path):
+        try:
+            self.connect(listing=True)
+            _, stdout, _ = self.ssh.exec_command(df_command(dest_path))
+            output = stdout.read().decode(errors="replace")
+            if stdout.channel.recv_exit_status() != 0:
+                return None
+        except (OSError, paramiko.SSHException) as exc:
+            logger.debug(f"TransportSSHWindows::free_space: df failed for {dest_path}: {exc}")
+            return None
+        return parse_df_available(output)
+
+    def copy_file_list(
+        self, src_path: Path, dest_path: Path, rel_paths, callback=None, cancel_check=None
+    ):
+        self.connect()
+        super().copy_file_list(
+            src_path, dest_path, rel_paths, callback=callback, cancel_check=cancel_check
+        )
+
     def ensure_dir_exists(self, dest_directory: Path):
         logger.debug(f"TransportSSHWindows::ensure_dir_exists: check {dest_directory}")
         if self.dry_run:
@@ -759,9 +1773,11 @@ class TransportSSHWindows(TransportWindowsBase):
             return
 
         try:
-            self.sftp.stat(str(dest_directory))
+            with span("sftp.stat"):
+                self.sftp.stat(str(dest_directory))
         except FileNotFoundError:
-            self.sftp.mkdir(str(dest_directory))
+            with span("transport.mkdir"):
+                self.sftp.mkdir(str(dest_directory))
             logger.debug(f"TransportSSHWindows::ensure_dir_exists: created {dest_directory}")
 
     def copy_files(
@@ -829,12 +1845,19 @@ class TransportSSHWindows(TransportWindowsBase):
                         int(src_file_attr.st_mtime) > int(dest_file_attr.st_mtime)
                         or src_file_attr.st_size != dest_file_attr.st_size
                     ):
-                        self.sftp.put(str(src_filename), str(dest_filename))
+                        self.put_file(
+                            src_filename,
+                            dest_filename,
+                            self.dedup_origin(src_filename, dest_filename),
+                            remote_size=dest_file_attr.st_size,
+                        )
                         logger.debug(
                             f"TransportSSHWindows::copy_files: newer/size {src_filename} to {dest_filename}"
                         )
                 except FileNotFoundError:
-                    self.sftp.put(str(src_filename), str(dest_filename))
+                    self.put_file(
+                        src_filename, dest_filename, self.dedup_origin(src_filename, dest_filename)
+                    )
                     logger.debug(
                         f"TransportSSHWindows::copy_files: create {src_filename} to {dest_filename}"
                     )
@@ -24,6 +24,7 @@ system_steps_progress = Progress(
     TextColumn("[bold blue]Progress for system {task.fields[name]}: {task.percentage:.0f}%"),
     BarColumn(),
     TextColumn("({task.completed} of {task.total} steps done)"),
+    TextColumn("{task.fields[throughput]}"),
 )
 
 transport_status_progress = Progress(
@@ -36,9 +37,15 @@ transport_file_progress = Progress(
     TextColumn("[bold green]File Upload"),
     BarColumn(),
     TextColumn("{task.completed}/{task.total}"),
+    TextColumn("{task.fields[throughput]}"),
 )
 
-overall_progress = Progress(TimeElapsedColumn(), BarColumn(), TextColumn("{task.description}"))
+overall_progress = Progress(
+    TimeElapsedColumn(),
+    BarColumn(),
+    TextColumn("{task.description}"),
+    TextColumn("{task.fields[throughput]}"),
+)
 
 progress_group = Group(
     Panel(
@@ -61,7 +68,9 @@ def init_live_tasks():
     global transport_status_task_id
     global transport_file_task_id
     transport_status_task_id = transport_status_progress.add_task("", msg="", visible=False)
-    transport_file_task_id = transport_file_progress.add_task("", total=0, visible=False)
+    transport_file_task_id = transport_file_progress.add_task(
+        "", total=0, visible=False, throughput=""
+    )
 
 
 def set_transport_status(message):
@@ -75,7 +84,11 @@ def begin_transport_file_progress(total):
     if transport_file_task_id is None:
         return
     transport_file_progress.update(
-        transport_file_task_id, total=max(0, total), completed=0, visible=bool(total)
+        transport_file_task_id,
+        total=max(0, total),
+        completed=0,
+        visible=bool(total),
+        throughput="",
     )
 
 
@@ -85,6 +98,12 @@ def advance_transport_file_progress(step=1):
     transport_file_progress.update(transport_file_task_id, advance=step)
 
 
+def update_transport_throughput(text):
+    if transport_file_task_id is None:
+        return
+    transport_file_progress.update(transport_file_task_id, throughput=text)
+
+
 def end_transport_file_progress():
     if transport_file_task_id is None:
         return
@@ -0,0 +1,21 @@
+import pytest
+from sftp_server import SFTPServer
+from webdav_server import WebDAVServer
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    # Runs write their resume journal to the cache directory.
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def webdav_server(tmp_path):
+    with WebDAVServer(tmp_path / "webdav") as server:
+        yield server
+
+
+@pytest.fixture
+def sftp_server(tmp_path):
+    with SFTPServer(tmp_path / "sftp") as server:
+        yield server
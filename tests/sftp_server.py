@@ -0,0 +1,341 @@
+import os
+import queue
+import socket
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import paramiko
+
+_host_key = None
+_host_key_lock = threading.Lock()
+
+
+def host_key():
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+
+class DelayedSocket:
+    # Delivers what the client sent after `latency` seconds and at most `bandwidth` bytes per
+    # second. Replies go out at once, so one request costs one round trip of `latency`, and
+    # pipelined requests overlap like they do over a real link.
+    def __init__(self, sock, latency, bandwidth):
+        self._sock = sock
+        self._latency = latency
+        self._bandwidth = bandwidth
+        self._timeout = None
+        self._next_free = time.monotonic()
+        self._queue = queue.Queue()
+        self._buffer = b""
+        self._closed = False
+        threading.Thread(target=self._pump, name="sftp-link", daemon=True).start()
+
+    def _pump(self):
+        while True:
+            try:
+                data = self._sock.recv(64 * 1024)
+            except OSError:
+                data = b""
+            now = time.monotonic()
+            arrival = now
+            if self._bandwidth:
+                arrival = max(now, self._next_free) + len(data) / self._bandwidth
+                self._next_free = arrival
+            self._queue.put((arrival + self._latency, data))
+            if not data:
+                return
+
+    def recv(self, size):
+        if not self._buffer:
+            if self._closed:
+                return b""
+            try:
+                deliver_at, data = self._queue.get(timeout=self._timeout)
+            except queue.Empty:
+                raise TimeoutError("timed out") from None
+            delay = deliver_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if not data:
+                self._closed = True
+                return b""
+            self._buffer = data
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def send(self, data):
+        return self._sock.send(data)
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def getpeername(self):
+        return self._sock.getpeername()
+
+    def close(self):
+        self._sock.close()
+
+
+class CountingHandle(paramiko.SFTPHandle):
+    def __init__(self, fake, flags=0):
+        super().__init__(flags)
+        self.fake = fake
+
+    def close(self):
+        self.fake.count("close")
+        super().close()
+
+    def read(self, offset, length):
+        self.fake.count("read")
+        return super().read(offset, length)
+
+    def write(self, offset, data):
+        self.fake.count("write")
+        self.fake.count("bytes_received", len(data))
+        return super().write(offset, data)
+
+    def stat(self):
+        self.fake.count("fstat")
+        fobj = getattr(self, "readfile", None) or getattr(self, "writefile", None)
+        return paramiko.SFTPAttributes.from_stat(os.fstat(fobj.fileno()))
+
+    def chattr(self, attr):
+        self.fake.count("fsetstat")
+        path = getattr(self, "path", None)
+        if path is not None:
+            apply_attributes(path, attr)
+        return paramiko.SFTP_OK
+
+
+def apply_attributes(path, attr):
+    if attr.st_size is not None:
+        os.truncate(path, attr.st_size)
+    if attr.st_atime is not None and attr.st_mtime is not None:
+        os.utime(path, (attr.st_atime, attr.st_mtime))
+
+
+def sftp_errors(fn):
+    def wrapper(self, *args):
+        self.fake.count(fn.__name__)
+        try:
+            return fn(self, *args)
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+
+    return wrapper
+
+
+class LocalSFTPInterface(paramiko.SFTPServerInterface):
+    def __init__(self, server, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.fake = server.fake
+
+    def session_started(self):
+        self.fake.session_started()
+
+    def session_ended(self):
+        self.fake.session_finished()
+
+    def _local(self, path):
+        parts = [part for part in path.split("/") if part and part not in (".", "..")]
+        return self.fake.root.joinpath(*parts)
+
+    def canonicalize(self, path):
+        self.fake.count("canonicalize")
+        return "/" + "/".join(part for part in path.split("/") if part and part != ".")
+
+    @sftp_errors
+    def list_folder(self, path):
+        local = self._local(path)
+        entries = []
+        for entry in sorted(local.iterdir()):
+            attr = paramiko.SFTPAttributes.from_stat(entry.stat())
+            attr.filename = entry.name
+            entries.append(attr)
+        return entries
+
+    @sftp_errors
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(self._local(path).stat())
+
+    @sftp_errors
+    def lstat(self, path):
+        return paramiko.SFTPAttributes.from_stat(self._local(path).lstat())
+
+    @sftp_errors
+    def open(self, path, flags, attr):
+        local = self._local(path)
+        fd = os.open(local, flags | getattr(os, "O_BINARY", 0), 0o644)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = CountingHandle(self.fake, flags)
+        handle.path = local
+        fobj = os.fdopen(fd, mode)
+        if mode != "wb" and mode != "ab":
+            handle.readfile = fobj
+        if mode != "rb":
+            handle.writefile = fobj
+        if attr is not None and (attr.st_mtime is not None or attr.st_size is not None):
+            apply_attributes(local, attr)
+        return handle
+
+    @sftp_errors
+    def remove(self, path):
+        self._local(path).unlink()
+        return paramiko.SFTP_OK
+
+    @sftp_errors
+    def rename(self, oldpath, newpath):
+        target = self._local(newpath)
+        if target.exists():
+            return paramiko.SFTP_FAILURE
+        self._local(oldpath).rename(target)
+        return paramiko.SFTP_OK
+
+    @sftp_errors
+    def posix_rename(self, oldpath, newpath):
+        self._local(oldpath).replace(self._local(newpath))
+        return paramiko.SFTP_OK
+
+    @sftp_errors
+    def mkdir(self, path, attr):
+        self._local(path).mkdir()
+        return paramiko.SFTP_OK
+
+    @sftp_errors
+    def rmdir(self, path):
+        self._local(path).rmdir()
+        return paramiko.SFTP_OK
+
+    @sftp_errors
+    def chattr(self, path, attr):
+        apply_attributes(self._local(path), attr)
+        return paramiko.SFTP_OK
+
+
+class PasswordServer(paramiko.ServerInterface):
+    def __init__(self, fake):
+        self.fake = fake
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (self.fake.username, self.fake.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class SFTPServer:
+    def __init__(self, root, *, username="deck", password="deck", latency=0.0, bandwidth=None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.username = username
+        self.password = password
+        # Round trip in seconds and bytes per second from the client; None is unthrottled.
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.ops = Counter()
+        self.sessions = 0
+        self.active_sessions = 0
+        self.peak_sessions = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._transports = []
+
+    @property
+    def port(self):
+        return self._listener.getsockname()[1]
+
+    def client_config(self, **settings):
+        return {
+            "transport": "ssh",
+            "hostname": "127.0.0.1",
+            "port": self.port,
+            "username": self.username,
+            "password": self.password,
+            **settings,
+        }
+
+    def start(self):
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self._listener.settimeout(0.05)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._accept, name="sftp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._listener is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._listener.close()
+        with self._lock:
+            transports = list(self._transports)
+        for transport in transports:
+            transport.close()
+        self._listener = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._listener.accept()
+            except TimeoutError:
+                continue
+            except OSError:
+                return
+            conn.settimeout(None)
+            transport = paramiko.Transport(DelayedSocket(conn, self.latency, self.bandwidth))
+            transport.add_server_key(host_key())
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, LocalSFTPInterface)
+            server = PasswordServer(self)
+            with self._lock:
+                self._transports.append(transport)
+            transport.start_server(server=server)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.ops[name] += amount
+
+    def session_started(self):
+        with self._lock:
+            self.sessions += 1
+            self.active_sessions += 1
+            self.peak_sessions = max(self.peak_sessions, self.active_sessions)
+
+    def session_finished(self):
+        with self._lock:
+            self.active_sessions -= 1
+
+    def requests(self):
+        with self._lock:
+            return sum(count for name, count in self.ops.items() if name != "bytes_received")
+
+    def reset_stats(self):
+        with self._lock:
+            self.ops = Counter()
+            self.sessions = 0
+            self.peak_sessions = self.active_sessions
@@ -0,0 +1,74 @@
+from retrosync_core.analyze import format_diff, format_report, load_runs
+from retrosync_core.events import EventType, JsonlEventSink, SyncEvent
+
+
+def _write_run(path, run_id, start, upload_seconds, retries=0):
+    sink = JsonlEventSink(path, buffer_records=4)
+
+    def emit(event_type, ts, **kwargs):
+        sink.emit(SyncEvent(event_type=event_type, run_id=run_id, ts=start + ts, **kwargs))
+
+    emit(EventType.RUN_STARTED, 0)
+    emit(EventType.SYSTEM_STARTED, 0, system="psx")
+    emit(EventType.STEP_STARTED, 0, system="psx", job="Roms", step="Roms")
+    for _ in range(retries):
+        emit(EventType.TRANSFER_RETRIED, 1, system="psx", job="Roms", message="HTTP 401 on PUT")
+    emit(
+        EventType.FILE_TRANSFERRED,
+        upload_seconds,
+        system="psx",
+        job="Roms",
+        data={"path": "/roms/psx/big.chd", "bytes": 8 * 1024**2, "seconds": upload_seconds},
+    )
+    emit(
+        EventType.FILE_TRANSFERRED,
+        upload_seconds + 1,
+        system="psx",
+        job="Roms",
+        data={"path": "/roms/psx/small.cue", "bytes": 2 * 1024**2, "seconds": 1.0},
+    )
+    emit(EventType.STEP_FINISHED, upload_seconds + 1, system="psx", job="Roms", step="Roms")
+    emit(EventType.SYSTEM_FINISHED, upload_seconds + 1, system="psx")
+    emit(EventType.RUN_FINISHED, upload_seconds + 2)
+    sink.close()
+
+
+def test_load_runs_reports_wall_time_rate_and_slowest_files(tmp_path):
+    path = tmp_path / "events.jsonl"
+    _write_run(path, "run-a", 1000.0, 4.0, retries=2)
+
+    (run,) = load_runs([path])
+
+    assert run.outcome == "finished"
+    assert run.seconds == 6.0
+    assert run.systems["psx"].seconds == 5.0
+    assert run.systems["psx"].bytes == 10 * 1024**2
+    assert run.jobs["psx/Roms"].files == 2
+    assert run.jobs["psx/Roms"].rate == 2 * 1024**2
+    assert run.retries == 2
+    report = format_report(run, top=1)
+    assert "2 retries" in report
+    assert "/roms/psx/big.chd" in report
+    assert "/roms/psx/small.cue" not in report
+
+
+def test_diff_compares_the_last_two_runs(tmp_path):
+    path = tmp_path / "events.jsonl"
+    _write_run(path, "run-a", 1000.0, 8.0)
+    _write_run(path, "run-b", 2000.0, 3.0)
+
+    runs = load_runs([path])
+
+    assert [run.run_id for run in runs] == ["run-a", "run-b"]
+    diff = format_diff(runs[0], runs[1])
+    assert "time 10.00s -> 5.00s (-50.0%)" in diff
+    assert "psx/Roms" in diff
+
+
+def test_load_runs_skips_torn_last_line(tmp_path):
+    path = tmp_path / "events.jsonl"
+    _write_run(path, "run-a", 1000.0, 2.0)
+    with open(path, "a") as fd:
+        fd.write('{"event_type": "run_sta')
+
+    assert len(load_runs([path])) == 1
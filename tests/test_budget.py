@@ -0,0 +1,335 @@
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from retrosync_core.budget import BudgetCandidate, plan_budget, select_within_budget
+from retrosync_core.transports import TransportFileSystemWindows
+from retrosync_core.runner import SyncRunConfig, SyncRunner
+
+KB = 1024
+
+
+def _candidate(playlist, path, size, priority=0, favorite=False):
+    return BudgetCandidate(
+        playlist=playlist,
+        path=path,
+        files=(path,),
+        size=size,
+        priority=priority,
+        favorite=favorite,
+    )
+
+
+def test_select_within_budget_orders_favorites_priority_and_size():
+    candidates = [
+        _candidate("psx.lpl", "big.chd", 60),
+        _candidate("psx.lpl", "small.chd", 10),
+        _candidate("snes.lpl", "a.zip", 30, priority=5),
+        _candidate("snes.lpl", "b.zip", 50, priority=5),
+        _candidate("gba.lpl", "fav.gba", 40, favorite=True),
+    ]
+
+    selection = select_within_budget(candidates, 100)
+
+    assert selection.selected == {
+        "gba.lpl": ["fav.gba"],
+        "snes.lpl": ["a.zip"],
+        "psx.lpl": ["small.chd"],
+    }
+    assert selection.used == 80
+    assert (selection.skipped_entries, selection.skipped_bytes) == (2, 110)
+
+
+def test_select_within_budget_can_ignore_favorites():
+    candidates = [
+        _candidate("snes.lpl", "a.zip", 30, priority=5),
+        _candidate("gba.lpl", "fav.gba", 80, favorite=True),
+    ]
+
+    selection = select_within_budget(candidates, 100, favorites_first=False)
+
+    assert selection.selected == {"snes.lpl": ["a.zip"]}
+
+
+def _write_playlist(path, rom_dir, names):
+    data = {
+        "version": "1.5",
+        "default_core_path": "/src/cores/snes9x_libretro.dylib",
+        "default_core_name": "Snes9x",
+        "items": [
+            {
+                "path": f"{rom_dir / name}#inner.sfc"
+                if name.endswith(".zip")
+                else str(rom_dir / name),
+                "label": name,
+                "core_path": "DETECT",
+                "core_name": "DETECT",
+                "crc32": "00000000|crc",
+                "db_name": path.name,
+            }
+            for name in names
+        ],
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def budget_library(tmp_path):
+    roms = tmp_path / "roms"
+    playlists = tmp_path / "playlists"
+    config = tmp_path / "config"
+    playlists.mkdir()
+    config.mkdir()
+    sizes = {
+        "snes": {"a.zip": 10 * KB, "b.zip": 40 * KB, "c.zip": 20 * KB},
+        "gba": {"x.gba": 30 * KB, "y.gba": 5 * KB},
+    }
+    for system, files in sizes.items():
+        (roms / system).mkdir(parents=True)
+        for name, size in files.items():
+            (roms / system / name).write_bytes(b"r" * size)
+        _write_playlist(playlists / f"{system}.lpl", roms / system, files)
+    # Not in any playlist, so never considered.
+    (roms / "snes" / "unlisted.zip").write_bytes(b"u" * KB)
+    (config / "content_favorites.lpl").write_text(
+        json.dumps({"version": "1.5", "items": [{"path": str(roms / "gba" / "x.gba")}]}),
+        encoding="utf-8",
+    )
+    default = {
+        "src_roms": [str(roms)],
+        "src_playlists": str(playlists),
+        "src_config": str(config),
+        "src_cores": "/src/cores",
+        "src_cores_suffix": ".dylib",
+        "target_roms": "/target/roms",
+        "target_cores": "/target/cores",
+        "target_cores_suffix": ".so",
+        "dest_roms": str(tmp_path / "dest" / "roms"),
+        "dest_playlists": str(tmp_path / "dest" / "playlists"),
+        "budget_mb": 60 * KB / 1024**2,
+        "free_space_check": "off",
+    }
+    playlists = [
+        {"name": "snes.lpl", "src_folder": "snes", "dest_folder": "snes", "priority": 1},
+        {"name": "gba.lpl", "src_folder": "gba", "dest_folder": "gba"},
+    ]
+    return default, playlists, tmp_path
+
+
+def test_plan_budget_reads_playlists_and_favorites(budget_library):
+    default, playlists, tmp_path = budget_library
+
+    selection = plan_budget(default, playlists, tmp_path / "roms")
+
+    # x.gba is a favorite (30K), then snes by priority: a.zip (10K), c.zip (20K).
+    assert selection.selected == {"gba.lpl": ["x.gba"], "snes.lpl": ["a.zip", "c.zip"]}
+    assert selection.used == 60 * KB
+
+
+def test_runner_syncs_only_the_roms_within_budget(budget_library):
+    default, playlists, tmp_path = budget_library
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    reporter = Mock()
+    runner = SyncRunner(
+        default=default, playlists=playlists, transport=transport, reporter=reporter
+    )
+    cfg = SyncRunConfig(
+        do_sync_playlists=True,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=True,
+        do_update_playlists=False,
+    )
+
+    with patch.object(transport, "guess_file_count", side_effect=AssertionError("scanned")):
+        runner.run(cfg)
+
+    dest = tmp_path / "dest"
+    assert sorted(p.name for p in (dest / "roms").rglob("*") if p.is_file()) == [
+        "a.zip",
+        "c.zip",
+        "x.gba",
+    ]
+    snes = json.loads((dest / "playlists" / "snes.lpl").read_text(encoding="utf-8"))
+    assert [item["path"] for item in snes["items"]] == [
+        "/target/roms/snes/a.zip",
+        "/target/roms/snes/c.zip",
+    ]
+    gba = json.loads((dest / "playlists" / "gba.lpl").read_text(encoding="utf-8"))
+    assert [item["label"] for item in gba["items"]] == ["x.gba"]
+    (message,), _ = reporter.emit_summary.call_args
+    assert "Storage budget: 3 files" in message
+    assert "2 playlist entries left out" in message
+
+
+def test_runner_syncs_only_referenced_roms(budget_library):
+    default, playlists, tmp_path = budget_library
+    default = dict(default, budget_mb=None, roms_referenced_only=True)
+    roms = tmp_path / "roms" / "gba"
+    (roms / "y.gba").unlink()
+    (roms / "Multi.m3u").write_text("Multi (Disk 1).adf\nMulti (Disk 2).adf\n")
+    (roms / "Multi (Disk 1).adf").write_bytes(b"1" * KB)
+    (roms / "Multi (Disk 2).adf").write_bytes(b"2" * KB)
+    (roms / "Unused (HD).zip").write_bytes(b"h" * KB)
+    _write_playlist(tmp_path / "playlists" / "gba.lpl", roms, ["x.gba", "y.gba", "Multi.m3u"])
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=playlists, transport=transport, reporter=Mock())
+    cfg = SyncRunConfig(
+        do_sync_playlists=True,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=True,
+        do_update_playlists=False,
+    )
+
+    runner.run(cfg)
+
+    dest = tmp_path / "dest"
+    assert sorted(p.name for p in (dest / "roms" / "gba").iterdir()) == [
+        "Multi (Disk 1).adf",
+        "Multi (Disk 2).adf",
+        "Multi.m3u",
+        "x.gba",
+    ]
+    assert not (dest / "roms" / "snes" / "unlisted.zip").exists()
+    gba = json.loads((dest / "playlists" / "gba.lpl").read_text(encoding="utf-8"))
+    assert [item["label"] for item in gba["items"]] == ["x.gba", "Multi.m3u"]
+
+
+def test_runner_syncs_only_thumbnails_of_budgeted_entries(budget_library):
+    default, playlists, tmp_path = budget_library
+    thumbnails = tmp_path / "thumbnails"
+    for system, names in {"snes": ["a", "b", "c"], "gba": ["x", "y"], "n64": ["z"]}.items():
+        for folder in ("Named_Boxarts", "Named_Snaps"):
+            (thumbnails / system / folder).mkdir(parents=True)
+            for name in names:
+                (thumbnails / system / folder / f"{name}.png").write_bytes(b"png")
+    # The label of a.zip only matches its thumbnail through the normalized index.
+    for folder in ("Named_Boxarts", "Named_Snaps"):
+        (thumbnails / "snes" / folder / "a.png").rename(
+            thumbnails / "snes" / folder / "A (USA).png"
+        )
+    snes = json.loads((tmp_path / "playlists" / "snes.lpl").read_text(encoding="utf-8"))
+    for item in snes["items"]:
+        item["label"] = item["label"].removesuffix(".zip")
+    (tmp_path / "playlists" / "snes.lpl").write_text(json.dumps(snes), encoding="utf-8")
+    gba = json.loads((tmp_path / "playlists" / "gba.lpl").read_text(encoding="utf-8"))
+    for item in gba["items"]:
+        item["label"] = item["label"].removesuffix(".gba")
+    (tmp_path / "playlists" / "gba.lpl").write_text(json.dumps(gba), encoding="utf-8")
+    default = dict(
+        default,
+        src_thumbnails=str(thumbnails),
+        dest_thumbnails=str(tmp_path / "dest" / "thumbnails"),
+        thumbnails_referenced_only=True,
+    )
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=playlists, transport=transport, reporter=Mock())
+    cfg = SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=True,
+        do_sync_roms=False,
+        do_update_playlists=False,
+    )
+
+    with patch.object(transport, "guess_file_count", side_effect=AssertionError("scanned")):
+        runner.run(cfg)
+
+    dest = tmp_path / "dest" / "thumbnails"
+    assert sorted(p.relative_to(dest).as_posix() for p in dest.rglob("*.png")) == [
+        "gba/Named_Boxarts/x.png",
+        "gba/Named_Snaps/x.png",
+        "snes/Named_Boxarts/A (USA).png",
+        "snes/Named_Boxarts/c.png",
+        "snes/Named_Snaps/A (USA).png",
+        "snes/Named_Snaps/c.png",
+    ]
+
+
+def _new_library(budget_library, **default):
+    default_config, playlists, tmp_path = budget_library
+    for playlist in playlists:
+        (tmp_path / "playlists" / playlist["name"]).write_text('{"items": []}', encoding="utf-8")
+        playlist.update(src_core_path="core_libretro", src_core_name="Core")
+    default_config = dict(default_config, src_cores_suffix=".so", **default)
+    transport = TransportFileSystemWindows(default_config, dry_run=False)
+    reporter = Mock()
+    runner = SyncRunner(
+        default=default_config, playlists=playlists, transport=transport, reporter=reporter
+    )
+    return runner, reporter, tmp_path / "dest"
+
+
+def _update_cfg(**kwargs):
+    options = {
+        "do_sync_playlists": False,
+        "do_sync_bios": False,
+        "do_sync_favorites": False,
+        "do_sync_thumbnails": False,
+        "do_sync_roms": False,
+        "do_update_playlists": True,
+    }
+    return SyncRunConfig(**dict(options, **kwargs))
+
+
+def _synced_files(folder):
+    return sorted(p.relative_to(folder).as_posix() for p in folder.rglob("*") if p.is_file())
+
+
+def test_runner_selects_referenced_roms_after_the_playlist_update(budget_library):
+    runner, _, dest = _new_library(budget_library, budget_mb=None, roms_referenced_only=True)
+
+    runner.run(_update_cfg(do_sync_roms=True, do_sync_playlists=True))
+
+    assert _synced_files(dest / "roms") == [
+        "gba/x.gba",
+        "gba/y.gba",
+        "snes/a.zip",
+        "snes/b.zip",
+        "snes/c.zip",
+        "snes/unlisted.zip",
+    ]
+    snes = json.loads((dest / "playlists" / "snes.lpl").read_text(encoding="utf-8"))
+    assert len(snes["items"]) == 4
+
+
+def test_runner_fills_the_budget_from_the_updated_playlists(budget_library):
+    runner, reporter, dest = _new_library(budget_library)
+
+    runner.run(_update_cfg(do_sync_roms=True))
+
+    # x.gba is a favorite, then snes by priority until c.zip no longer fits, then y.gba.
+    assert _synced_files(dest / "roms") == [
+        "gba/x.gba",
+        "gba/y.gba",
+        "snes/a.zip",
+        "snes/unlisted.zip",
+    ]
+    (message,), _ = reporter.emit_summary.call_args
+    assert "Storage budget: 4 files" in message
+
+
+def test_runner_looks_up_thumbnails_in_the_updated_playlists(budget_library):
+    thumbnails = budget_library[2] / "thumbnails"
+    for name in ("snes/Named_Boxarts/b.png", "gba/Named_Snaps/y.png", "n64/Named_Snaps/z.png"):
+        (thumbnails / name).parent.mkdir(parents=True, exist_ok=True)
+        (thumbnails / name).write_bytes(b"png")
+    runner, _, dest = _new_library(
+        budget_library,
+        budget_mb=None,
+        src_thumbnails=str(thumbnails),
+        dest_thumbnails=str(budget_library[2] / "dest" / "thumbnails"),
+        thumbnails_referenced_only=True,
+    )
+
+    runner.run(_update_cfg(do_sync_thumbnails=True))
+
+    assert _synced_files(dest / "thumbnails") == [
+        "gba/Named_Snaps/y.png",
+        "snes/Named_Boxarts/b.png",
+    ]
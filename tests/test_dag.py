@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from retrosync_core.dag import (
+    DagExecutor,
+    DagResult,
+    JobNode,
+    order_nodes,
+    resolve_dependencies,
+)
+
+
+def _nodes(calls, **needs):
+    return [
+        JobNode(key=key, run=lambda key=key: calls.append(key), needs=tuple(deps))
+        for key, deps in needs.items()
+    ]
+
+
+def test_resolve_dependencies_links_producers_to_consumers():
+    nodes = _nodes([], update=(), sync=(), roms=())
+
+    resolve_dependencies(
+        nodes,
+        inputs={"sync": ["A:local_playlist"]},
+        outputs={"update": ["A:local_playlist"], "roms": ["A:roms"]},
+    )
+
+    assert [node.needs for node in nodes] == [(), ("update",), ()]
+
+
+def test_order_nodes_rejects_cycles_and_unknown_jobs():
+    with pytest.raises(ValueError, match="cycle"):
+        order_nodes(_nodes([], a=("b",), b=("a",)))
+    with pytest.raises(ValueError, match="unknown job 'missing'"):
+        order_nodes(_nodes([], a=("missing",)))
+
+
+def test_single_worker_keeps_declaration_order():
+    calls = []
+
+    DagExecutor(_nodes(calls, a=(), b=("a",), c=(), d=("c",)), workers=1).run()
+
+    assert calls == ["a", "c", "b", "d"]
+
+
+def test_ready_jobs_run_concurrently():
+    barrier = threading.Barrier(2)
+    nodes = [
+        JobNode(key="upload A", run=lambda: barrier.wait(timeout=5)),
+        JobNode(key="scan B", run=lambda: barrier.wait(timeout=5)),
+    ]
+
+    result = DagExecutor(nodes, workers=2).run()
+
+    assert {node.key for node in result.nodes} == {"upload A", "scan B"}
+
+
+def test_failure_stops_scheduling_dependents():
+    calls = []
+    cancelled = []
+
+    def fail():
+        raise RuntimeError("kaboom")
+
+    nodes = [JobNode(key="a", run=fail)] + _nodes(calls, b=("a",))
+
+    with pytest.raises(RuntimeError, match="kaboom"):
+        DagExecutor(nodes, workers=2, cancel=cancelled.append).run()
+
+    assert calls == []
+    assert cancelled == ["kaboom"]
+
+
+def test_critical_path_follows_longest_chain():
+    nodes = _nodes([], a=(), b=("a",), c=())
+    timings = {"a": (0.0, 1.0), "b": (1.0, 3.0), "c": (0.0, 2.5)}
+    for node in nodes:
+        node.started, node.finished = timings[node.key]
+
+    path = DagResult(nodes=nodes).critical_path()
+
+    assert [node.key for node in path] == ["a", "b"]
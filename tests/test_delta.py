@@ -0,0 +1,192 @@
+import io
+import threading
+from pathlib import Path
+from unittest.mock import ANY, MagicMock, Mock
+
+from retrosync_core.delta import (
+    BlockSignatureCache,
+    DeltaSync,
+    block_digests,
+    changed_ranges,
+)
+from retrosync_core.progress import ByteMeter, metering
+from retrosync_core.transports import TransportSSHWindows, TransportWebDAV
+
+BLOCK = 4
+
+
+def _delta(tmp_path, namespace="test"):
+    return DeltaSync(
+        BlockSignatureCache(tmp_path / "cache" / "sig.json"),
+        namespace=namespace,
+        block_size=BLOCK,
+        min_size=0,
+    )
+
+
+def test_changed_ranges_coalesces_adjacent_blocks():
+    old = ["a", "b", "c", "d"]
+    new = ["a", "x", "y", "d", "e"]
+    assert changed_ranges(old, new, BLOCK, 18) == [(4, 8), (16, 2)]
+
+
+def test_changed_ranges_splits_at_max_length():
+    assert changed_ranges([], ["a", "b", "c"], BLOCK, 12, max_length=8) == [(0, 8), (8, 4)]
+
+
+def test_block_signature_cache_persists(tmp_path):
+    cache = BlockSignatureCache(tmp_path / "sig.json")
+    cache.put("k", 8, BLOCK, ["a", "b"])
+    assert BlockSignatureCache(tmp_path / "sig.json").get("k") is None
+
+    cache.flush()
+    assert BlockSignatureCache(tmp_path / "sig.json").get("k")["blocks"] == ["a", "b"]
+
+
+def test_fan_out_targets_keep_separate_signature_caches(tmp_path):
+    deltas = [
+        DeltaSync.from_config(
+            {"delta_transfer": True, "cache_dir": str(tmp_path), "target": name}, name
+        )
+        for name in ("deck", "ipad")
+    ]
+    for delta in deltas:
+        delta.cache.put(delta.key("/roms/game.iso"), 8, BLOCK, ["a", "b"])
+
+    threads = [threading.Thread(target=delta.flush) for delta in deltas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    for name in ("deck", "ipad"):
+        cache = BlockSignatureCache(tmp_path / f"block-signatures-{name}.json")
+        assert cache.get(f"{name}:/roms/game.iso")["size"] == 8
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_delta_plan_without_signature_returns_no_ranges(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbcccc")
+    ranges, blocks = _delta(tmp_path).plan("/roms/game.iso", src)
+    assert ranges is None
+    assert blocks == block_digests(src, BLOCK)
+
+
+def test_delta_plan_detects_patched_block(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    delta = _delta(tmp_path)
+    delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    src.write_bytes(b"aaaaXXXXccccdddd")
+
+    ranges, _ = delta.plan("/roms/game.iso", src, remote_size=16)
+    assert ranges == [(4, 4)]
+
+
+def test_delta_plan_ignores_signature_when_remote_size_differs(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    delta = _delta(tmp_path)
+    delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    ranges, _ = delta.plan("/roms/game.iso", src, remote_size=12)
+    assert ranges is None
+
+
+def test_sftp_put_file_rewrites_only_changed_ranges(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    transport = TransportSSHWindows({"hostname": "deck", "username": "deck"}, dry_run=False)
+    transport.delta = _delta(tmp_path)
+    transport.delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    src.write_bytes(b"aaaabbbbccccZZZZ")
+
+    remote = io.BytesIO(b"aaaabbbbccccdddd")
+    handle = MagicMock()
+    handle.__enter__.return_value = remote
+    transport.sftp = Mock()
+    transport.sftp.open.return_value = handle
+
+    transport.put_file(src, Path("/roms/game.iso"), remote_size=16)
+
+    transport.sftp.put.assert_not_called()
+    transport.sftp.open.assert_called_once_with("/roms/game.iso", "r+")
+    assert remote.getvalue() == b"aaaabbbbccccZZZZ"
+    assert transport.delta.bytes_skipped == 12
+
+
+def test_sftp_put_file_seeds_signature_on_full_upload(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbb")
+    transport = TransportSSHWindows({"hostname": "deck", "username": "deck"}, dry_run=False)
+    transport.delta = _delta(tmp_path)
+    transport.sftp = Mock()
+
+    transport.put_file(src, Path("/roms/game.iso"))
+
+    transport.sftp.put.assert_called_once_with(str(src), "/roms/game.iso", callback=ANY)
+    assert transport.delta.cache.get(transport.delta.key("/roms/game.iso"))["size"] == 8
+
+
+def test_webdav_copy_file_sends_content_range_put(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    transport = TransportWebDAV({"host": "http://dav.local"}, dry_run=False)
+    transport.delta = _delta(tmp_path)
+    transport.delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    src.write_bytes(b"aaaaXXXXccccdddd")
+    transport._remote_size = Mock(return_value=16)
+    transport._probe_partial_put = Mock(return_value=True)
+    transport._request = Mock()
+
+    meter = ByteMeter()
+
+    with metering(meter):
+        transport.copy_file(src, Path("/roms/game.iso"), ensure_parent=False)
+
+    transport._request.assert_called_once()
+    assert meter.done == 4
+    kwargs = transport._request.call_args.kwargs
+    assert kwargs["body"] == b"XXXX"
+    assert kwargs["headers"]["Content-Range"] == "bytes 4-7/16"
+
+
+def test_webdav_copy_file_falls_back_when_ranged_put_is_rejected(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    transport = TransportWebDAV({"host": "http://dav.local"}, dry_run=False)
+    transport.delta = _delta(tmp_path)
+    transport.delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    src.write_bytes(b"aaaaXXXXccccdddd")
+    transport._remote_size = Mock(return_value=16)
+    transport._probe_partial_put = Mock(return_value=True)
+    transport._request = Mock(side_effect=[RuntimeError("HTTP 501"), None])
+
+    transport.copy_file(src, Path("/roms/game.iso"), ensure_parent=False)
+
+    assert transport._request.call_count == 2
+    assert "Content-Range" not in transport._request.call_args.kwargs["headers"]
+    assert transport._partial_put is False
+
+
+def test_webdav_probes_ranged_put_support_once(tmp_path):
+    src = tmp_path / "game.iso"
+    src.write_bytes(b"aaaabbbbccccdddd")
+    transport = TransportWebDAV({"host": "http://dav.local"}, dry_run=False)
+    transport.delta = _delta(tmp_path)
+    transport.delta.commit("/roms/game.iso", src, block_digests(src, BLOCK))
+    src.write_bytes(b"aaaaXXXXccccdddd")
+    transport._remote_size = Mock(return_value=16)
+    # The server ignores Content-Range and stores only the range body.
+    transport._request = Mock(
+        side_effect=lambda method, path, **kwargs: b"11" if method == "GET" else None
+    )
+
+    transport.copy_file(src, Path("/roms/game.iso"), ensure_parent=False)
+    transport.copy_file(src, Path("/roms/other.iso"), ensure_parent=False)
+
+    methods = [call.args[0] for call in transport._request.call_args_list]
+    assert methods == ["PUT", "PUT", "GET", "DELETE", "PUT", "PUT"]
+    assert transport._request.call_args_list[0].args[1] == "/roms/.retrosync-range-probe"
+    assert "Content-Range" not in transport._request.call_args.kwargs["headers"]
+    assert transport._partial_put is False
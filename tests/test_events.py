@@ -0,0 +1,78 @@
+import threading
+
+from retrosync_core.events import EventBus, EventType, MemoryEventSink, SyncEvent
+
+
+def _event(event_type, **kwargs):
+    return SyncEvent(event_type=event_type, run_id="run", **kwargs)
+
+
+def test_event_bus_coalesces_advance_events_in_order():
+    sink = MemoryEventSink()
+    bus = EventBus(sink, window=60)
+
+    bus.emit(_event(EventType.TRANSFER_STARTED, job="Roms"))
+    for _ in range(100):
+        bus.emit(_event(EventType.TRANSFER_ADVANCED, job="Roms", advance=1))
+    bus.emit(_event(EventType.TRANSFER_BYTES, job="Roms", data={"bytes": 10}))
+    bus.emit(_event(EventType.TRANSFER_BYTES, job="Roms", data={"bytes": 20}))
+    bus.emit(_event(EventType.TRANSFER_FINISHED, job="Roms"))
+    bus.close()
+
+    assert [e.event_type for e in sink.events] == [
+        EventType.TRANSFER_STARTED,
+        EventType.TRANSFER_ADVANCED,
+        EventType.TRANSFER_BYTES,
+        EventType.TRANSFER_FINISHED,
+    ]
+    assert sink.events[1].advance == 100
+    assert sink.events[2].data == {"bytes": 20}
+
+
+def test_event_bus_keeps_jobs_apart_and_flushes_after_window():
+    sink = MemoryEventSink()
+    bus = EventBus(sink, window=0.01)
+
+    bus.emit(_event(EventType.TRANSFER_ADVANCED, system="NES", job="Roms", advance=1))
+    bus.emit(_event(EventType.TRANSFER_ADVANCED, system="SNES", job="Roms", advance=2))
+    bus.flush()
+
+    assert sorted((e.system, e.advance) for e in sink.events) == [("NES", 1), ("SNES", 2)]
+    bus.close()
+
+
+def test_event_bus_does_not_block_the_producer_on_a_slow_sink():
+    release = threading.Event()
+
+    class SlowSink(MemoryEventSink):
+        def emit(self, event):
+            release.wait()
+            super().emit(event)
+
+    sink = SlowSink()
+    bus = EventBus(sink)
+    for _ in range(10):
+        bus.emit(_event(EventType.STEP_STARTED))
+
+    assert sink.events == []
+    release.set()
+    bus.close()
+    assert len(sink.events) == 10
+
+
+def test_event_bus_survives_a_failing_sink_flush():
+    class FullDiskSink(MemoryEventSink):
+        def flush(self):
+            raise OSError(28, "No space left on device")
+
+    sink = FullDiskSink()
+    bus = EventBus(sink)
+    bus.emit(_event(EventType.STEP_STARTED))
+    bus.flush()
+    bus.emit(_event(EventType.STEP_FINISHED))
+    bus.close()
+
+    assert [e.event_type for e in sink.events] == [
+        EventType.STEP_STARTED,
+        EventType.STEP_FINISHED,
+    ]
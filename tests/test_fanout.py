@@ -0,0 +1,130 @@
+import shutil
+from unittest.mock import Mock, patch
+
+import pytest
+
+from retrosync_core.config import resolve_targets
+from retrosync_core.events import EventType, MemoryEventSink
+from retrosync_core.fanout import FanOutRunner, SyncTarget
+from retrosync_core.runner import SyncAbortError, SyncRunConfig, SyncRunner
+from retrosync_core.transports import TransportError, TransportFileSystemWindows
+
+
+def _bios_cfg():
+    return SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=True,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=False,
+        do_update_playlists=False,
+    )
+
+
+@pytest.fixture
+def bios_src(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.bin").write_bytes(b"a" * 10)
+    (src / "sub" / "b.bin").write_bytes(b"b" * 20)
+    return src
+
+
+def _target(name, src, dst):
+    default = {"src_bios": str(src), "dest_bios": str(dst), "target": name}
+    return SyncTarget(
+        name=name, default=default, transport=TransportFileSystemWindows(default, dry_run=False)
+    )
+
+
+def test_resolve_targets_overrides_defaults():
+    config = {
+        "targets": [
+            {"name": "deck", "transport": "SSH", "hostname": "deck.local"},
+            {"name": "ipad", "transport": "webdav", "dest_bios": "~/bios"},
+            {"name": "old", "disabled": True},
+        ]
+    }
+    default = {"transport": "filesystem", "dest_bios": "/bios", "src_roms": []}
+
+    targets = dict(resolve_targets(config, default))
+
+    assert list(targets) == ["deck", "ipad"]
+    assert targets["deck"]["transport"] == "ssh"
+    assert targets["deck"]["hostname"] == "deck.local"
+    assert targets["deck"]["dest_bios"] == "/bios"
+    assert not targets["ipad"]["dest_bios"].startswith("~")
+    assert targets["ipad"]["target"] == "ipad"
+
+
+def test_resolve_targets_rejects_duplicate_names():
+    with pytest.raises(ValueError, match="duplicate target name 'deck'"):
+        resolve_targets({"targets": [{"name": "deck"}, {"name": "deck"}]}, {})
+
+
+def test_fan_out_syncs_every_target_from_one_scan(bios_src, tmp_path):
+    sink = MemoryEventSink()
+    reporter = Mock()
+    runner = FanOutRunner(
+        targets=[
+            _target("deck", bios_src, tmp_path / "deck"),
+            _target("ipad", bios_src, tmp_path / "ipad"),
+        ],
+        playlists=[],
+        reporter=reporter,
+        event_sink=sink,
+    )
+
+    summaries = runner.run(_bios_cfg())
+
+    for name in ("deck", "ipad"):
+        assert (tmp_path / name / "sub" / "b.bin").read_bytes() == b"b" * 20
+    assert set(summaries) == {"deck", "ipad"}
+    assert runner.inventory_cache.hits == 1
+    reporter.start.assert_called_once()
+    assert [c.args[0].split(":")[0] for c in reporter.emit_summary.call_args_list] == [
+        "deck",
+        "ipad",
+    ]
+    finished = [e for e in sink.events if e.event_type == EventType.SUMMARY_EMITTED]
+    assert {e.data["target"] for e in finished} == {"deck", "ipad"}
+
+
+def test_fan_out_failed_target_does_not_stop_the_others(bios_src, tmp_path):
+    broken = _target("deck", bios_src, tmp_path / "deck")
+    broken.transport.copy_file = Mock(side_effect=TransportError("host unreachable"))
+    runner = FanOutRunner(
+        targets=[broken, _target("ipad", bios_src, tmp_path / "ipad")],
+        playlists=[],
+        reporter=Mock(),
+    )
+
+    with pytest.raises(SyncAbortError, match="Sync failed for target\\(s\\): deck"):
+        runner.run(_bios_cfg())
+
+    assert (tmp_path / "ipad" / "a.bin").exists()
+    assert "deck" not in runner.summaries
+
+
+def test_fan_out_plans_once_and_compares_each_target(bios_src, tmp_path):
+    (tmp_path / "deck").mkdir()
+    shutil.copy2(bios_src / "a.bin", tmp_path / "deck" / "a.bin")
+    targets = [
+        _target("deck", bios_src, tmp_path / "deck"),
+        _target("ipad", bios_src, tmp_path / "ipad"),
+    ]
+    sent = {}
+    for target in targets:
+        target.transport.copy_file = Mock(
+            side_effect=lambda src, dst, name=target.name, **kwargs: sent.setdefault(
+                name, []
+            ).append(src.name)
+        )
+    runner = FanOutRunner(targets=targets, playlists=[], reporter=Mock())
+
+    with patch.object(SyncRunner, "plan", autospec=True, side_effect=SyncRunner.plan) as plan:
+        runner.run(_bios_cfg())
+
+    assert plan.call_count == 1
+    assert sent["deck"] == ["b.bin"]
+    assert sorted(sent["ipad"]) == ["a.bin", "b.bin"]
@@ -0,0 +1,159 @@
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from retrosync_core.inventory import ContentIndex, file_digest
+from retrosync_core.plan import ACTION_ADD
+from retrosync_core.transports import (
+    TransportFileSystemUnix,
+    TransportFileSystemWindows,
+    TransportWebDAV,
+)
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_file_digest_matches_for_identical_content(tmp_path):
+    a = _write(tmp_path / "a.bin", b"x" * 1000)
+    b = _write(tmp_path / "b.bin", b"x" * 1000)
+    c = _write(tmp_path / "c.bin", b"y" * 1000)
+    assert file_digest(a) == file_digest(b)
+    assert file_digest(a) != file_digest(c)
+
+
+def test_content_index_reports_duplicate_origin(tmp_path):
+    a = _write(tmp_path / "neogeo" / "neogeo.zip", b"bios" * 100)
+    b = _write(tmp_path / "fbneo" / "neogeo.zip", b"bios" * 100)
+    index = ContentIndex(min_size=0)
+
+    assert index.register(a, Path("/dest/neogeo/neogeo.zip")) is None
+    index.confirm(Path("/dest/neogeo/neogeo.zip"))
+    assert index.register(b, Path("/dest/fbneo/neogeo.zip")) == Path("/dest/neogeo/neogeo.zip")
+    assert index.duplicate_count == 0
+
+    index.record_copy(b)
+    assert index.duplicate_count == 1
+    assert index.bytes_saved == 400
+
+
+def test_content_index_skips_origins_still_in_transfer(tmp_path):
+    a = _write(tmp_path / "a.bin", b"q" * 100)
+    b = _write(tmp_path / "b.bin", b"q" * 100)
+    c = _write(tmp_path / "c.bin", b"q" * 100)
+    index = ContentIndex(min_size=0)
+
+    assert index.register(a, Path("/dest/a.bin")) is None
+    assert index.register(b, Path("/dest/b.bin")) is None
+    assert index.register(c, Path("/dest/c.bin"), pending={Path("/dest/b.bin")}) == Path(
+        "/dest/b.bin"
+    )
+
+    index.confirm(Path("/dest/a.bin"))
+    assert index.register(c, Path("/dest/c.bin")) == Path("/dest/a.bin")
+
+
+def test_content_index_ignores_same_size_different_content(tmp_path):
+    a = _write(tmp_path / "a.bin", b"a" * 100)
+    b = _write(tmp_path / "b.bin", b"b" * 100)
+    index = ContentIndex(min_size=0)
+
+    assert index.register(a, Path("/dest/a.bin")) is None
+    assert index.register(b, Path("/dest/b.bin")) is None
+    assert index.duplicate_count == 0
+
+
+def test_content_index_skips_small_files_and_same_destination(tmp_path):
+    a = _write(tmp_path / "a.bin", b"a" * 10)
+    index = ContentIndex(min_size=100)
+    assert index.register(a, Path("/dest/a.bin")) is None
+    assert index.register(a, Path("/dest/b.bin")) is None
+
+    big = _write(tmp_path / "big.bin", b"a" * 200)
+    assert index.register(big, Path("/dest/big.bin")) is None
+    assert index.register(big, Path("/dest/big.bin")) is None
+    assert index.duplicate_count == 0
+
+
+def test_filesystem_windows_copy_files_hardlinks_duplicates(tmp_path):
+    src = tmp_path / "src"
+    dest = tmp_path / "dest"
+    _write(src / "a" / "bios.bin", b"z" * 200)
+    _write(src / "b" / "bios.bin", b"z" * 200)
+
+    transport = TransportFileSystemWindows({}, dry_run=False)
+    transport.content_index = ContentIndex(min_size=0)
+    transport.copy_files(src, dest, whitelist=[], recursive=True)
+
+    assert (dest / "a" / "bios.bin").read_bytes() == b"z" * 200
+    assert (dest / "b" / "bios.bin").samefile(dest / "a" / "bios.bin")
+    assert transport.content_index.bytes_saved == 200
+
+    transport.content_index = ContentIndex(min_size=0)
+    with patch("retrosync_core.inventory.file_digest") as digest_mock:
+        transport.copy_files(src, dest, whitelist=[], recursive=True)
+
+    digest_mock.assert_not_called()
+    assert transport.content_index.bytes_saved == 0
+
+
+def test_webdav_copy_files_uses_server_side_copy_for_duplicates(tmp_path):
+    src = tmp_path / "src"
+    _write(src / "a.bin", b"q" * 200)
+    _write(src / "b.bin", b"q" * 200)
+    transport = TransportWebDAV({"host": "http://dav.local"}, dry_run=False)
+    transport.content_index = ContentIndex(min_size=0)
+    transport.ensure_dir_exists = Mock()
+    transport.copy_file = Mock()
+    transport._request = Mock()
+    callback = Mock()
+
+    transport.copy_files(src, Path("/Sync"), whitelist=[], recursive=False, callback=callback)
+
+    transport.copy_file.assert_called_once()
+    method, origin = transport._request.call_args.args
+    assert method == "COPY"
+    assert origin == "/Sync/a.bin"
+    assert transport._request.call_args.kwargs["headers"]["Destination"] == (
+        "http://dav.local/Sync/b.bin"
+    )
+    assert callback.call_count == 2
+
+
+def test_webdav_duplicate_falls_back_to_upload_when_copy_fails(tmp_path):
+    src = tmp_path / "src"
+    _write(src / "a.bin", b"q" * 200)
+    _write(src / "b.bin", b"q" * 200)
+    transport = TransportWebDAV({"host": "http://dav.local"}, dry_run=False)
+    transport.content_index = ContentIndex(min_size=0)
+    transport.ensure_dir_exists = Mock()
+    transport.copy_file = Mock()
+    transport._request = Mock(side_effect=RuntimeError("WebDAV COPY failed with HTTP 501"))
+
+    transport.copy_files(src, Path("/Sync"), whitelist=[], recursive=False)
+
+    assert transport.copy_file.call_count == 2
+    assert transport.content_index.bytes_saved == 0
+
+
+def test_rsync_copy_files_only_copies_duplicates_rsync_would_send(tmp_path):
+    src = tmp_path / "src"
+    _write(src / "a" / "bios.bin", b"z" * 200)
+    _write(src / "b" / "bios.bin", b"z" * 200)
+    _write(src / "c" / "bios.bin", b"z" * 200)
+    transport = TransportFileSystemUnix({}, dry_run=False)
+    transport.content_index = ContentIndex(min_size=0)
+    transport.itemize_changes = Mock(
+        return_value=[("a/bios.bin", ACTION_ADD), ("b/bios.bin", ACTION_ADD)]
+    )
+    transport.execute = Mock()
+    transport.remote_copy = Mock()
+
+    transport.copy_files(src, tmp_path / "dest", whitelist=[], recursive=True)
+
+    transport.remote_copy.assert_called_once_with(
+        tmp_path / "dest" / "a" / "bios.bin", tmp_path / "dest" / "b" / "bios.bin"
+    )
+    assert transport.content_index.bytes_saved == 200
@@ -0,0 +1,123 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from retrosync_core.journal import RunJournal, file_fingerprint, plan_fingerprint
+from retrosync_core.plan import JobPlan, SyncPlan
+from retrosync_core.runner import SyncAbortError, SyncRunConfig, SyncRunner
+from retrosync_core.transports import TransportError, TransportFileSystemWindows
+
+
+def _bios_cfg():
+    return SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=True,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=False,
+        do_update_playlists=False,
+    )
+
+
+def _plan():
+    return SyncPlan(options={"do_sync_bios": True}, global_jobs=[JobPlan(job="BIOS")])
+
+
+def test_resume_state_collects_unfinished_run(tmp_path):
+    plan = _plan()
+    journal = RunJournal(tmp_path / "journal.jsonl")
+    journal.start("run-1", plan)
+    journal.record_files("bios_sync", [("a.bin", "10:1")])
+    journal.record_job("thumbnails_sync", "abc")
+    journal.close()
+    with open(tmp_path / "journal.jsonl", "a") as fd:
+        fd.write('{"run": "run-1", "type": "fi')
+
+    state = RunJournal(tmp_path / "journal.jsonl").resume_state()
+
+    assert state.run_id == "run-1"
+    assert state.plan == plan
+    assert state.done_files("bios_sync") == {"a.bin": "10:1"}
+    assert state.job_done("thumbnails_sync", "abc")
+
+
+def test_file_records_are_synced_in_batches(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(path, batch_records=3, batch_seconds=60)
+    journal.start("run-1", _plan())
+
+    journal.record_files("bios_sync", [("a", "1:1"), ("b", "1:1")])
+    assert len(path.read_text().splitlines()) == 1
+
+    journal.record_files("bios_sync", [("c", "1:1")])
+    assert len(path.read_text().splitlines()) == 4
+    journal.close()
+
+
+def test_finished_run_is_compacted(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(path)
+    journal.start("run-1", _plan())
+    journal.record_job("bios_sync", "abc")
+
+    journal.finish()
+
+    assert path.read_text() == ""
+    assert RunJournal(path).resume_state() is None
+
+
+def test_runner_resume_skips_confirmed_files(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.bin").write_bytes(b"a" * 10)
+    (src / "sub" / "b.bin").write_bytes(b"b" * 20)
+    default = {"src_bios": str(src), "dest_bios": str(dst), "cache_dir": str(tmp_path / "cache")}
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=Mock())
+    plan = runner.plan(_bios_cfg())
+    journal = RunJournal.from_config(default)
+    journal.start("interrupted", plan)
+    journal.record_files("bios_sync", [("a.bin", file_fingerprint(src / "a.bin"))])
+    journal.close()
+
+    with patch.object(transport, "copy_file", wraps=transport.copy_file) as copy_mock:
+        runner.run(_bios_cfg(), resume=journal.resume_state())
+
+    assert [call.args[0].name for call in copy_mock.call_args_list] == ["b.bin"]
+    assert runner.run_id == "interrupted"
+    assert RunJournal.from_config(default).resume_state() is None
+
+
+def test_plan_fingerprint_changes_with_entries():
+    assert plan_fingerprint(JobPlan(job="BIOS")) != plan_fingerprint(
+        JobPlan(job="BIOS", exact=True)
+    )
+
+
+def test_interrupted_job_keeps_files_confirmed_in_one_pass(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.mkdir()
+    for name in ["a.bin", "b.bin", "c.bin"]:
+        (src / name).write_bytes(name.encode())
+    default = {"src_bios": str(src), "dest_bios": str(dst), "cache_dir": str(tmp_path / "cache")}
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=Mock())
+    copy_file = transport.copy_file
+
+    def interrupted(src_filename, dest_filename, cancel_check=None):
+        if src_filename.name == "c.bin":
+            raise TransportError("Transfer interrupted by user.")
+        copy_file(src_filename, dest_filename, cancel_check=cancel_check)
+
+    with (
+        patch.object(transport, "copy_file", side_effect=interrupted),
+        patch.object(transport, "sync_planned", wraps=transport.sync_planned) as sync_mock,
+    ):
+        with pytest.raises(SyncAbortError):
+            runner.run(_bios_cfg())
+
+    state = RunJournal.from_config(default).resume_state()
+    assert sync_mock.call_count == 1
+    assert sorted(state.done_files("bios_sync")) == ["a.bin", "b.bin"]
@@ -0,0 +1,91 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+from retrosync_core.manifest import walk_remote_tree
+from retrosync_core.plan import ACTION_ADD, ACTION_DELETE, ACTION_UPDATE, JobPlan
+from retrosync_core.transports import TransportWebDAV, parse_itemized_changes
+
+PROPFIND_ROOT = b"""<?xml version="1.0"?>
+<d:multistatus xmlns:d="DAV:">
+  <d:response><d:href>/dav/roms/</d:href><d:propstat><d:prop>
+    <d:resourcetype><d:collection/></d:resourcetype><d:getetag>"root-1"</d:getetag>
+  </d:prop></d:propstat></d:response>
+  <d:response><d:href>/dav/roms/a.sfc</d:href><d:propstat><d:prop>
+    <d:resourcetype/><d:getcontentlength>10</d:getcontentlength>
+    <d:getlastmodified>Mon, 01 Jan 2024 00:00:00 GMT</d:getlastmodified>
+  </d:prop></d:propstat></d:response>
+  <d:response><d:href>/dav/roms/Disc%20Games/</d:href><d:propstat><d:prop>
+    <d:resourcetype><d:collection/></d:resourcetype><d:getetag>"sub-1"</d:getetag>
+  </d:prop></d:propstat></d:response>
+</d:multistatus>"""
+
+PROPFIND_SUB = b"""<?xml version="1.0"?>
+<d:multistatus xmlns:d="DAV:">
+  <d:response><d:href>/dav/roms/Disc%20Games/</d:href><d:propstat><d:prop>
+    <d:resourcetype><d:collection/></d:resourcetype><d:getetag>"sub-1"</d:getetag>
+  </d:prop></d:propstat></d:response>
+  <d:response><d:href>/dav/roms/Disc%20Games/b.cue</d:href><d:propstat><d:prop>
+    <d:resourcetype/><d:getcontentlength>20</d:getcontentlength>
+    <d:getlastmodified>Mon, 01 Jan 2024 00:00:00 GMT</d:getlastmodified>
+  </d:prop></d:propstat></d:response>
+</d:multistatus>"""
+
+
+def test_parse_itemized_changes():
+    output = "\n".join(
+        [
+            "cd+++++++++ sub/",
+            ">f+++++++++ sub/new game.sfc",
+            ">f.st...... changed.sfc",
+            ".f...p..... attrs-only.sfc",
+            "*deleting   old.sfc",
+            "*deleting   olddir/",
+        ]
+    )
+
+    assert parse_itemized_changes(output) == [
+        ("sub/new game.sfc", ACTION_ADD),
+        ("changed.sfc", ACTION_UPDATE),
+        ("old.sfc", ACTION_DELETE),
+    ]
+
+
+def test_walk_remote_tree_lists_every_directory():
+    listings = {
+        "/roms": ({"a.sfc": (10, 1)}, ["sub", "skip"]),
+        "/roms/sub": ({"b.cue": (20, 2)}, []),
+    }
+    list_dir = Mock(side_effect=lambda path: listings[path])
+
+    manifest = walk_remote_tree("/roms", list_dir, exclude=lambda rel: rel.name == "skip")
+
+    assert manifest == {"a.sfc": (10, 1), "sub/b.cue": (20, 2)}
+    assert list_dir.call_count == 2
+
+
+def test_walk_remote_tree_missing_root_is_empty():
+    list_dir = Mock(side_effect=FileNotFoundError)
+
+    assert walk_remote_tree("/missing", list_dir) == {}
+
+
+def test_webdav_remote_manifest_plans_delta(tmp_path):
+    transport = TransportWebDAV(
+        {"host": "http://dav.local/dav", "cache_dir": str(tmp_path)}, dry_run=True
+    )
+    bodies = {"/roms": PROPFIND_ROOT, "/roms/Disc Games": PROPFIND_SUB}
+    transport._request = Mock(side_effect=lambda method, path, **_kwargs: bodies[path])
+
+    job_plan = transport.plan_changes(
+        JobPlan(job="Sync ROMs"),
+        Path("/src"),
+        Path("/roms"),
+        {"a.sfc": (10, 1), "Disc Games/b.cue": (21, 1), "c.sfc": (5, 1)},
+    )
+
+    assert job_plan.exact is True
+    assert {(entry.path, entry.action) for entry in job_plan.entries} == {
+        ("Disc Games/b.cue", ACTION_UPDATE),
+        ("c.sfc", ACTION_ADD),
+    }
+    assert job_plan.transfer_bytes == 26
@@ -0,0 +1,314 @@
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from retrosync_core.jobs import BiosSync
+from retrosync_core.plan import (
+    ACTION_ADD,
+    ACTION_DELETE,
+    ACTION_UPDATE,
+    JobPlan,
+    PlanEntry,
+    SyncPlan,
+    SystemPlan,
+    diff_inventory,
+    systems_that_fit,
+)
+from retrosync_core.runner import SyncAbortError, SyncRunConfig, SyncRunner
+from retrosync_core.transports import TransportFileSystemWindows
+
+
+def _size_stale(size, _mtime, remote):
+    return remote[0] != size
+
+
+def _bios_cfg(dry_run=False):
+    return SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=True,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=False,
+        do_update_playlists=False,
+        dry_run=dry_run,
+    )
+
+
+@pytest.fixture
+def bios_tree(tmp_path):
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.bin").write_bytes(b"a" * 10)
+    (src / "sub" / "b.bin").write_bytes(b"b" * 20)
+    dst.mkdir()
+    (dst / "a.bin").write_bytes(b"a" * 10)
+    return {"src_bios": str(src), "dest_bios": str(dst)}, src, dst
+
+
+def test_diff_inventory_classifies_entries():
+    inventory = {"a": (10, 1), "b": (20, 1), "c": (30, 1)}
+    manifest = {"a": (10, 1), "b": (5, 1), "old": (7, None)}
+
+    job_plan = diff_inventory(
+        JobPlan(job="BIOS"), inventory, manifest, is_stale=_size_stale, mirror=True
+    )
+
+    actions = {entry.path: entry.action for entry in job_plan.entries}
+    assert actions == {"b": ACTION_UPDATE, "c": ACTION_ADD, "old": ACTION_DELETE}
+    assert job_plan.exact is True
+    assert job_plan.file_count == 2
+    assert job_plan.transfer_bytes == 50
+
+
+def test_diff_inventory_collapses_deleted_folders():
+    inventory = {"keep/a.bin": (1, 1), "mixed/b.bin": (1, 1)}
+    manifest = {
+        "keep/a.bin": (1, 1),
+        "mixed/b.bin": (1, 1),
+        "mixed/old.bin": (1, 1),
+        "gone/x.bin": (1, 1),
+        "gone/deep/y.bin": (1, 1),
+        "mixed/gone/z.bin": (1, 1),
+    }
+
+    job_plan = diff_inventory(
+        JobPlan(job="ROMs"), inventory, manifest, is_stale=_size_stale, mirror=True
+    )
+
+    assert job_plan.delete_roots == ["gone", "mixed/gone", "mixed/old.bin"]
+    assert job_plan.count(ACTION_DELETE) == 4
+    assert job_plan.remote_files == 6
+    assert job_plan.delete_percent() == pytest.approx(400 / 6)
+
+
+def test_diff_inventory_without_manifest_is_not_exact():
+    job_plan = diff_inventory(
+        JobPlan(job="BIOS"), {"a": (10, 1)}, None, is_stale=_size_stale, mirror=True
+    )
+
+    assert job_plan.exact is False
+    assert job_plan.has_work() is True
+    assert [entry.action for entry in job_plan.entries] == [ACTION_ADD]
+
+
+def test_sync_plan_round_trip(tmp_path):
+    plan = SyncPlan(
+        options={"do_sync_roms": True},
+        global_jobs=[JobPlan(job="BIOS", kind="bios_sync", exact=True)],
+        systems=[
+            SystemPlan(
+                name="SNES",
+                playlist_name="SNES.lpl",
+                jobs=[
+                    JobPlan(
+                        job="Sync ROMs",
+                        kind="rom_sync_job",
+                        system="SNES",
+                        entries=[PlanEntry(path="a.sfc", action=ACTION_ADD, size=3)],
+                        transfer_bytes=3,
+                    )
+                ],
+            )
+        ],
+    )
+    path = tmp_path / "plan.json"
+    plan.save(path)
+
+    loaded = SyncPlan.load(path)
+
+    assert loaded == plan
+    assert loaded.transfer_bytes == 3
+
+
+def test_sync_plan_load_rejects_unknown_version(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text('{"version": 99}')
+
+    with pytest.raises(ValueError, match="Unsupported sync plan version"):
+        SyncPlan.load(path)
+
+
+def test_format_diff_truncates_long_job_lists():
+    entries = [PlanEntry(path=f"f{idx}", action=ACTION_ADD, size=1) for idx in range(5)]
+    plan = SyncPlan(options={}, global_jobs=[JobPlan(job="BIOS", exact=True, entries=entries)])
+
+    diff = plan.format_diff(entries_per_job=2)
+
+    assert "BIOS: 5 to add, 0 to update, 0 to delete" in diff
+    assert "+ f1" in diff
+    assert "+ f2" not in diff
+    assert "... 3 more" in diff
+
+
+def test_runner_plan_diffs_against_destination(bios_tree):
+    default, _, _ = bios_tree
+    runner = SyncRunner(
+        default=default,
+        playlists=[],
+        transport=TransportFileSystemWindows(default, dry_run=False),
+        reporter=Mock(),
+    )
+
+    plan = runner.plan(_bios_cfg())
+
+    (job_plan,) = plan.global_jobs
+    assert job_plan.kind == "bios_sync"
+    assert job_plan.exact is True
+    assert [(entry.path, entry.action) for entry in job_plan.entries] == [("sub/b.bin", ACTION_ADD)]
+    assert plan.transfer_bytes == 20
+
+
+def test_runner_replays_plan_without_rescanning(bios_tree, tmp_path):
+    default, _, dst = bios_tree
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=Mock())
+    plan_path = tmp_path / "plan.json"
+    runner.plan(_bios_cfg()).save(plan_path)
+
+    with patch.object(BiosSync, "setup") as setup_mock:
+        runner.run(_bios_cfg(), plan=SyncPlan.load(plan_path))
+
+    setup_mock.assert_not_called()
+    assert (dst / "sub" / "b.bin").read_bytes() == b"b" * 20
+    assert runner.plan(_bios_cfg()).global_jobs[0].entries == []
+
+
+def test_runner_refuses_a_plan_that_does_not_fit(bios_tree):
+    default, _, dst = bios_tree
+    default = dict(default, free_space_reserve_mb=0)
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=Mock())
+
+    with patch.object(transport, "free_space", return_value=10):
+        with pytest.raises(SyncAbortError, match="needs 0.00 MB, 0.00 MB are free"):
+            runner.run(_bios_cfg())
+
+    assert not (dst / "sub").exists()
+
+
+def test_runner_only_warns_about_free_space_when_asked(bios_tree):
+    default, _, dst = bios_tree
+    default = dict(default, free_space_reserve_mb=0, free_space_check="warn")
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    reporter = Mock()
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=reporter)
+
+    with patch.object(transport, "free_space", return_value=10):
+        runner.run(_bios_cfg())
+
+    assert (dst / "sub" / "b.bin").exists()
+    (message,), _ = reporter.emit_summary.call_args
+    assert "Not enough free space on the target" in message
+
+
+def test_free_space_is_checked_per_destination_filesystem():
+    default = {
+        "dest_roms": "/sdcard/roms",
+        "dest_config": "/home/deck/config",
+        "free_space_reserve_mb": 0,
+    }
+    transport = Mock()
+    transport.free_space.side_effect = lambda path: {
+        Path("/sdcard/roms"): 100,
+        Path("/home/deck/config"): 5,
+    }[path]
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=Mock())
+    plan = SyncPlan(
+        options={},
+        global_jobs=[
+            JobPlan(
+                job="Config",
+                dst="/home/deck/config",
+                transfer_bytes=10,
+                exact=True,
+                entries=[PlanEntry(path="retroarch.cfg", action=ACTION_ADD, size=10)],
+            ),
+            # Without a listing the whole source is counted, so it is left out.
+            JobPlan(job="BIOS", dst="/home/deck/config/bios", transfer_bytes=10**9),
+        ],
+        systems=[
+            SystemPlan(
+                name="snes",
+                playlist_name="snes.lpl",
+                jobs=[
+                    JobPlan(
+                        job="ROMs",
+                        dst="/sdcard/roms/snes",
+                        transfer_bytes=80,
+                        exact=True,
+                        entries=[PlanEntry(path="a.sfc", action=ACTION_ADD, size=80)],
+                    )
+                ],
+            )
+        ],
+    )
+
+    with pytest.raises(SyncAbortError, match="are free at /home/deck/config"):
+        runner._check_free_space(_bios_cfg(), plan)
+
+    transport.free_space.side_effect = lambda path: 100
+    info = runner._check_free_space(_bios_cfg(), plan)
+    assert (info["needed"], info["message"]) == (90, None)
+
+
+def test_systems_that_fit_fills_in_plan_order():
+    plan = SyncPlan(
+        options={},
+        global_jobs=[JobPlan(job="BIOS", transfer_bytes=10)],
+        systems=[
+            SystemPlan(
+                name=name,
+                playlist_name=f"{name}.lpl",
+                jobs=[JobPlan(job="ROMs", transfer_bytes=size)],
+            )
+            for name, size in [("psx", 60), ("ps2", 500), ("snes", 20)]
+        ],
+    )
+
+    assert systems_that_fit(plan, 100) == (["psx", "snes"], ["ps2"])
+
+
+def test_runner_sends_m3u_files_written_by_the_playlist_update(tmp_path):
+    roms = tmp_path / "roms" / "amiga"
+    dest = tmp_path / "dest" / "amiga"
+    playlists = tmp_path / "playlists"
+    for folder in (roms, dest, playlists):
+        folder.mkdir(parents=True)
+    for name in ("Game (Disk 1 of 2).adf", "Game (Disk 2 of 2).adf"):
+        (roms / name).write_bytes(b"disk")
+        (dest / name).write_bytes(b"disk")
+    (playlists / "amiga.lpl").write_text('{"items": []}', encoding="utf-8")
+    default = {
+        "src_roms": [str(tmp_path / "roms")],
+        "src_playlists": str(playlists),
+        "src_cores": "/cores",
+        "src_cores_suffix": ".so",
+        "dest_roms": str(tmp_path / "dest"),
+        "free_space_check": "off",
+    }
+    playlist = {
+        "name": "amiga.lpl",
+        "src_folder": "amiga",
+        "dest_folder": "amiga",
+        "src_core_path": "puae_libretro",
+        "src_core_name": "PUAE",
+        "src_create_m3u": True,
+        "src_m3u_whitelist": r"\.adf$",
+        "src_m3u_pattern": r"(.*)(\(Disk \d of \d\)).*\.adf",
+    }
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    runner = SyncRunner(default=default, playlists=[playlist], transport=transport, reporter=Mock())
+    cfg = SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=True,
+        do_update_playlists=True,
+    )
+
+    runner.run(cfg)
+
+    assert (dest / "Game.m3u").read_text() == "Game (Disk 1 of 2).adf\nGame (Disk 2 of 2).adf\n"
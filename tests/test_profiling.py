@@ -0,0 +1,51 @@
+import concurrent.futures
+import pstats
+
+from retrosync_core.profiling import RunProfiler, profile_phase, start_profiler, stop_profiler
+
+
+def busy_upload():
+    total = 0
+    for value in range(200000):
+        total += value
+    return total
+
+
+def _functions(stats):
+    return {name for _, _, name in stats.stats}
+
+
+def test_profiler_covers_worker_threads(tmp_path):
+    profiler = start_profiler(RunProfiler(tmp_path / "run.prof", interval=0.001))
+    try:
+        with profile_phase("run"):
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="webdav-upload"
+            )
+            with executor:
+                list(executor.map(lambda _: busy_upload(), range(4)))
+    finally:
+        stop_profiler()
+
+    collapsed = profiler.write()
+
+    assert "busy_upload" in _functions(pstats.Stats(str(tmp_path / "run.prof")))
+    lines = collapsed.read_text().splitlines()
+    assert any(line.startswith("webdav-upload_") and "busy_upload" in line for line in lines)
+    assert "busy_upload" in profiler.format_top()
+
+
+def test_profiler_only_profiles_selected_phases(tmp_path):
+    profiler = start_profiler(RunProfiler(tmp_path / "run.prof", phases=["psx/*"]))
+    try:
+        with profile_phase("run"):
+            with profile_phase("snes/Sync ROMs"):
+                busy_upload()
+        assert profiler.stats() is None
+        with profile_phase("psx/Update Playlist"):
+            busy_upload()
+    finally:
+        stop_profiler()
+
+    assert "busy_upload" in _functions(profiler.stats())
+    assert profile_phase("psx/Update Playlist") is profile_phase("run")
@@ -0,0 +1,71 @@
+import io
+
+from retrosync_core.progress import (
+    ByteMeter,
+    ProgressReader,
+    RsyncProgressParser,
+    format_throughput,
+    metering,
+    report_bytes,
+)
+
+
+def test_byte_meter_propagates_to_parent_and_reports():
+    reports = []
+    parent = ByteMeter(total=4096)
+    meter = ByteMeter(total=2048, parent=parent, listener=reports.append, interval=0)
+
+    meter.add(1024)
+    meter.add(1024)
+
+    assert meter.done == 2048
+    assert parent.done == 2048
+    assert len(reports) == 2
+    assert meter.snapshot()["total"] == 2048
+
+
+def test_report_bytes_uses_current_meter():
+    meter = ByteMeter(total=100)
+    report_bytes(10)
+    with metering(meter):
+        report_bytes(40)
+    report_bytes(10)
+
+    assert meter.done == 40
+
+
+def test_progress_reader_counts_read_bytes():
+    meter = ByteMeter()
+    reader = ProgressReader(io.BytesIO(b"x" * 100), meter)
+
+    assert reader.read(60) == b"x" * 60
+    assert reader.read() == b"x" * 40
+    assert reader.read() == b""
+    assert meter.done == 100
+    assert reader.seekable() is True
+
+
+def test_progress_reader_does_not_count_a_retried_body_twice():
+    meter = ByteMeter()
+    reader = ProgressReader(io.BytesIO(b"x" * 100), meter)
+
+    reader.read(60)
+    reader.seek(0)
+    reader.read()
+
+    assert meter.done == 100
+
+
+def test_rsync_progress_parser_returns_deltas():
+    parser = RsyncProgressParser()
+
+    assert parser.feed("game.iso") == 0
+    assert parser.feed("      32,768   0%    0.00kB/s    0:00:00\r  1,048,576  50%") == 1048576
+    assert parser.feed("      2.10M 100%    1.00MB/s    0:00:02 (xfr#1, to-chk=0/1)") == 1051424
+    assert parser.feed("        512 100%    0.00kB/s    0:00:00") == 512
+
+
+def test_format_throughput():
+    assert format_throughput({"done": 0, "total": 10, "rate": 0.0, "eta": None}) == ""
+    text = format_throughput({"done": 1, "total": 10, "rate": 2 * 1024**2, "eta": 3725})
+    assert text == "2.0 MB/s, ETA 1:02:05"
@@ -0,0 +1,44 @@
+from retrosync_core.references import referenced_files, rom_dependencies
+
+
+def test_rom_dependencies_reads_m3u_cue_and_gdi(tmp_path):
+    (tmp_path / "Game.m3u").write_text("# discs\nGame (Disc 1).cue\n\nGame (Disc 2).cue\n")
+    (tmp_path / "Game (Disc 1).cue").write_text(
+        'FILE "Game (Disc 1) (Track 1).bin" BINARY\n  TRACK 01 MODE2/2352\n'
+        "FILE track2.bin BINARY\n"
+    )
+    (tmp_path / "Crazy Taxi.gdi").write_text(
+        '3\n1 0 4 2352 track01.bin 0\n2 450 0 2352 "track 02.raw" 0\n3 45000 4 2352 track03.bin 0\n'
+    )
+
+    assert rom_dependencies(tmp_path / "Game.m3u") == [
+        tmp_path / "Game (Disc 1).cue",
+        tmp_path / "Game (Disc 2).cue",
+    ]
+    assert rom_dependencies(tmp_path / "Game (Disc 1).cue") == [
+        tmp_path / "Game (Disc 1) (Track 1).bin",
+        tmp_path / "track2.bin",
+    ]
+    assert rom_dependencies(tmp_path / "Crazy Taxi.gdi") == [
+        tmp_path / "track01.bin",
+        tmp_path / "track 02.raw",
+        tmp_path / "track03.bin",
+    ]
+    assert rom_dependencies(tmp_path / "Game.zip") == []
+
+
+def test_referenced_files_follows_nested_references(tmp_path):
+    rom_dir = tmp_path / "psx"
+    (rom_dir / "discs").mkdir(parents=True)
+    (rom_dir / "Game.m3u").write_text(
+        "discs/Game (Disc 1).cue\ndiscs/Missing.cue\n../outside.cue\n"
+    )
+    (rom_dir / "discs" / "Game (Disc 1).cue").write_text('FILE "Game (Disc 1).bin" BINARY\n')
+    (rom_dir / "discs" / "Game (Disc 1).bin").write_bytes(b"b" * 100)
+    (tmp_path / "outside.cue").write_text("")
+
+    assert referenced_files(rom_dir, "Game.m3u") == {
+        "Game.m3u": (rom_dir / "Game.m3u").stat().st_size,
+        "discs/Game (Disc 1).cue": (rom_dir / "discs" / "Game (Disc 1).cue").stat().st_size,
+        "discs/Game (Disc 1).bin": 100,
+    }
@@ -1,7 +1,8 @@
+import re
 import pytest
 from pathlib import Path
 from unittest.mock import Mock
-from retrosync import RomSyncJob, TransportSSHUnix
+from retrosync import RomSyncJob, TransportFileSystemUnix, TransportSSHUnix
 
 
 @pytest.fixture
@@ -73,3 +74,39 @@ def test_roms_sync_do_forwards_callback(default_config, playlist, transport, moc
         recursive=True,
         callback=callback,
     )
+
+
+def test_selected_roms_are_sent_in_one_rsync_run(tmp_path):
+    src = tmp_path / "roms" / "snes"
+    dest = tmp_path / "dest" / "snes"
+    src.mkdir(parents=True)
+    (dest / "old").mkdir(parents=True)
+    for name in ["a.sfc", "b.sfc", "c.sfc"]:
+        (src / name).write_bytes(b"x")
+    (dest / "c.sfc").write_bytes(b"x")
+    (dest / "old" / "gone.sfc").write_bytes(b"x")
+    default = {
+        "src_roms": str(tmp_path / "roms"),
+        "dest_roms": str(tmp_path / "dest"),
+        "mirror_max_delete_percent": 100,
+    }
+    transport = TransportFileSystemUnix(default, dry_run=False)
+    commands = []
+
+    def execute(cmd, **_):
+        files_from = re.search(r'--files-from="([^"]+)"', cmd).group(1)
+        commands.append((cmd, sorted(Path(files_from).read_text().split("\0")[:-1])))
+
+    transport.execute = Mock(side_effect=execute)
+    roms_sync = RomSyncJob(default, transport)
+    roms_sync.selected = ["a.sfc", "b.sfc"]
+    roms_sync.setup({"src_folder": "snes", "dest_folder": "snes"})
+    roms_sync.apply_plan(roms_sync.build_plan("snes"))
+
+    roms_sync.sync_directory()
+
+    (delete_cmd, deleted), (copy_cmd, sent) = commands
+    assert "--delete-missing-args" in delete_cmd
+    assert deleted == ["c.sfc", "old"]
+    assert f'"{src}/" "{dest}"' in copy_cmd
+    assert sent == ["a.sfc", "b.sfc"]
@@ -1,6 +1,12 @@
+import threading
+import time
+from dataclasses import replace
+
 import pytest
 
 from retrosync_core.events import EventType, MemoryEventSink
+from retrosync_core.progress import report_bytes, report_file
+from retrosync_core.timing import active_timings
 from retrosync_core.runner import (
     CancelToken,
     JobRegistry,
@@ -48,6 +54,7 @@ class DummyReporter:
         self.advance_calls = 0
         self.started = False
         self.finished = False
+        self.throughput = []
 
     def start(self, *, overall_total, supports_per_file_progress):
         self.started = True
@@ -99,6 +106,9 @@ class DummyReporter:
     def hide_transport_tasks(self):
         pass
 
+    def update_throughput(self, *, task_id, job, system, overall):
+        self.throughput.append((job, system, overall))
+
     def emit_summary(self, message):
         pass
 
@@ -200,3 +210,274 @@ def test_runner_emits_failed_event():
 
     assert sink.events[0].event_type == EventType.RUN_STARTED
     assert sink.events[-1].event_type == EventType.RUN_FAILED
+
+
+class DummyBytesJob(DummyGlobalJob):
+    def do(self, callback=None, cancel_check=None):
+        report_bytes(512)
+        report_bytes(512)
+        report_file("bios.bin", 1024, 0.5)
+        if callback:
+            callback()
+
+
+def test_runner_reports_transferred_bytes():
+    reporter = DummyReporter()
+    sink = MemoryEventSink()
+    runner = SyncRunner(
+        default={},
+        playlists=[],
+        transport=DummyTransport(),
+        reporter=reporter,
+        job_registry=JobRegistry(bios_sync=DummyBytesJob),
+        event_sink=sink,
+    )
+
+    runner.run(_cfg())
+
+    byte_events = [e for e in sink.events if e.event_type == EventType.TRANSFER_BYTES]
+    assert byte_events
+    assert byte_events[-1].job == "Dummy"
+    assert byte_events[-1].data["bytes"] == 1024
+    assert byte_events[-1].bytes_estimated == 1024
+    job, _, overall = reporter.throughput[-1]
+    assert job["done"] == 1024
+    assert overall["done"] == 1024
+    assert runner.run_meter.done == 1024
+    (file_event,) = (e for e in sink.events if e.event_type == EventType.FILE_TRANSFERRED)
+    assert file_event.data == {"path": "bios.bin", "bytes": 1024, "seconds": 0.5}
+
+
+def test_runner_attaches_timings_to_summary():
+    sink = MemoryEventSink()
+    runner = SyncRunner(
+        default={},
+        playlists=[],
+        transport=DummyTransport(),
+        reporter=DummyReporter(),
+        job_registry=JobRegistry(bios_sync=DummyGlobalJob),
+        event_sink=sink,
+    )
+
+    runner.run(replace(_cfg(), do_timings=True))
+
+    summary = sink.events[-1]
+    assert summary.event_type == EventType.SUMMARY_EMITTED
+    assert {"runner.plan", "job.Dummy"} <= set(summary.data["timings"])
+    assert "Phase" in summary.message
+    assert active_timings() is None
+
+
+class DummySystemJob:
+    name = "DummySystem"
+    barrier = None
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, default, transport):
+        self.size = 1
+        self.transfer_bytes = 1024
+
+    def setup(self, playlist):
+        self.playlist = playlist
+
+    def do(self, callback=None, cancel_check=None):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if cls.barrier is not None:
+                cls.barrier.wait(timeout=5)
+            time.sleep(0.05)
+            if self.playlist["name"] == "Broken.lpl":
+                raise TransportError("kaboom")
+            while self.playlist["name"] == "Slow.lpl" and not cancel_check():
+                time.sleep(0.01)
+            if callback:
+                callback()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+def _system_runner(playlists, sink, **default):
+    class Job(DummySystemJob):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+    return Job, SyncRunner(
+        default=default,
+        playlists=[{"name": name} for name in playlists],
+        transport=DummyTransport(),
+        reporter=DummyReporter(),
+        job_registry=JobRegistry(rom_sync_job=Job),
+        event_sink=sink,
+    )
+
+
+def _roms_cfg():
+    return SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=True,
+        do_update_playlists=False,
+    )
+
+
+def test_runner_runs_systems_concurrently_with_ordered_events():
+    sink = MemoryEventSink()
+    job_cls, runner = _system_runner(
+        ["A.lpl", "B.lpl"], sink, parallel_systems=2, parallel_transfers=2
+    )
+    job_cls.barrier = threading.Barrier(2)
+
+    runner.run(_roms_cfg())
+
+    assert job_cls.peak == 2
+    for system in ("A", "B"):
+        types = [e.event_type for e in sink.events if e.system == system and e.job]
+        assert types == [
+            EventType.STEP_STARTED,
+            EventType.TRANSFER_STARTED,
+            EventType.TRANSFER_ADVANCED,
+            EventType.TRANSFER_FINISHED,
+            EventType.STEP_FINISHED,
+        ]
+
+
+def test_runner_caps_concurrent_transfers():
+    sink = MemoryEventSink()
+    job_cls, runner = _system_runner(["A.lpl", "B.lpl", "C.lpl"], sink, parallel_systems=3)
+
+    runner.run(_roms_cfg())
+
+    assert job_cls.peak == 1
+    assert sum(e.event_type == EventType.SYSTEM_FINISHED for e in sink.events) == 3
+
+
+def test_runner_failure_in_one_system_stops_the_others():
+    sink = MemoryEventSink()
+    _, runner = _system_runner(
+        ["Broken.lpl", "Slow.lpl"], sink, parallel_systems=2, parallel_transfers=2
+    )
+
+    with pytest.raises(SyncAbortError, match="kaboom"):
+        runner.run(_roms_cfg())
+
+    assert sink.events[-1].event_type == EventType.RUN_FAILED
+    assert not any(
+        e.event_type == EventType.SYSTEM_FINISHED and e.system == "Slow" for e in sink.events
+    )
+
+
+def test_runner_overlaps_global_jobs_with_systems():
+    sink = MemoryEventSink()
+    order = []
+    barrier = threading.Barrier(2)
+
+    class BiosJob(DummyGlobalJob):
+        name = "BIOS"
+
+        def do(self, callback=None, cancel_check=None):
+            barrier.wait(timeout=5)
+            order.append(self.name)
+
+    class FavoritesJob(BiosJob):
+        name = "Favorites"
+        after_systems = True
+
+        def do(self, callback=None, cancel_check=None):
+            order.append(self.name)
+
+    job_cls, runner = _system_runner(
+        ["A.lpl"], sink, parallel_global_jobs=True, parallel_transfers=2
+    )
+    job_cls.barrier = barrier
+    runner.job_registry = JobRegistry(
+        bios_sync=BiosJob, favorites_sync=FavoritesJob, rom_sync_job=job_cls
+    )
+    runner.run(replace(_roms_cfg(), do_sync_bios=True, do_sync_favorites=True))
+
+    assert order == ["BIOS", "Favorites"]
+    assert any(e.system == "A" and e.event_type == EventType.SYSTEM_FINISHED for e in sink.events)
+    assert set(sink.events[-1].data["lanes"]) == {"BIOS", "Systems"}
+
+
+def test_runner_dag_pipelines_systems_and_reports_critical_path():
+    sink = MemoryEventSink()
+    order = []
+    upload_started = threading.Event()
+
+    class UpdateJob(DummySystemJob):
+        name = "Update Playlist"
+        uses_transport = False
+
+        def do(self, callback=None, cancel_check=None):
+            if self.playlist["name"] == "B.lpl":
+                # B is scanned while the ROMs of A are still uploading.
+                assert upload_started.wait(timeout=5)
+            order.append(f"update {self.playlist['name']}")
+
+    class SyncJob(DummySystemJob):
+        name = "Sync Playlist"
+
+        def do(self, callback=None, cancel_check=None):
+            order.append(f"sync {self.playlist['name']}")
+
+    class RomJob(DummySystemJob):
+        name = "Sync ROMs"
+
+        def do(self, callback=None, cancel_check=None):
+            if self.playlist["name"] == "A.lpl":
+                upload_started.set()
+                while "update B.lpl" not in order:
+                    time.sleep(0.01)
+            order.append(f"roms {self.playlist['name']}")
+
+    _, runner = _system_runner(["A.lpl", "B.lpl"], sink, job_workers=3, parallel_transfers=2)
+    runner.job_registry = JobRegistry(
+        playlist_update_job=UpdateJob, playlist_sync_job=SyncJob, rom_sync_job=RomJob
+    )
+
+    runner.run(replace(_roms_cfg(), do_update_playlists=True, do_sync_playlists=True))
+
+    for name in ("A.lpl", "B.lpl"):
+        assert order.index(f"update {name}") < order.index(f"sync {name}")
+    assert order.index("update B.lpl") < order.index("roms A.lpl")
+    summary = sink.events[-1]
+    assert summary.event_type == EventType.SUMMARY_EMITTED
+    assert summary.data["critical_path"]
+    assert "Critical path:" in summary.message
+    assert sum(e.event_type == EventType.SYSTEM_FINISHED for e in sink.events) == 2
+
+
+def test_runner_dag_sends_roms_after_the_playlist_update_of_their_system():
+    sink = MemoryEventSink()
+    order = []
+
+    class UpdateJob(DummySystemJob):
+        name = "Update Playlist"
+        uses_transport = False
+
+        def do(self, callback=None, cancel_check=None):
+            time.sleep(0.05)
+            order.append(f"update {self.playlist['name']}")
+
+    class RomJob(DummySystemJob):
+        name = "Sync ROMs"
+
+        def do(self, callback=None, cancel_check=None):
+            order.append(f"roms {self.playlist['name']}")
+
+    _, runner = _system_runner(["A.lpl", "B.lpl"], sink, job_workers=4, parallel_transfers=2)
+    runner.job_registry = JobRegistry(playlist_update_job=UpdateJob, rom_sync_job=RomJob)
+
+    runner.run(replace(_roms_cfg(), do_update_playlists=True))
+
+    for name in ("A.lpl", "B.lpl"):
+        assert order.index(f"update {name}") < order.index(f"roms {name}")
@@ -0,0 +1,77 @@
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from retrosync_core.scheduler import TransferSlots, UploadStats, plan_upload_order
+from retrosync_core.transports import TransportWebDAV
+
+
+def test_plan_upload_order_is_largest_first_without_small_files():
+    assert plan_upload_order([3, 10, 7], lambda x: x, small_file_size=1) == [10, 7, 3]
+
+
+def test_plan_upload_order_interleaves_half_of_the_small_files():
+    files = [1, 2, 3, 4, 100, 200]
+    order = plan_upload_order(files, lambda x: x, small_file_size=50, small_interleave=1)
+    assert order == [200, 4, 100, 3, 2, 1]
+
+
+def test_transfer_slots_grant_waiters_in_planned_order():
+    slots = TransferSlots(1)
+    granted = []
+    release = threading.Event()
+
+    def hold():
+        with slots.slot(0):
+            release.wait(timeout=5)
+
+    def waiter(order):
+        with slots.slot(order):
+            granted.append(order)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    time.sleep(0.05)
+    # Two batches queue their planned positions 2 and 1 at different times.
+    waiters = [threading.Thread(target=waiter, args=(order,)) for order in (2, 1, 1, 2)]
+    for thread in waiters:
+        thread.start()
+        time.sleep(0.05)
+    release.set()
+    for thread in [holder, *waiters]:
+        thread.join(timeout=5)
+
+    assert granted == [1, 1, 2, 2]
+
+
+def test_upload_stats_summarises_per_worker_utilisation():
+    stats = UploadStats()
+    with stats.track(10):
+        time.sleep(0.01)
+    summary = stats.summary()
+    worker = threading.current_thread().name
+    assert summary[worker]["files"] == 1
+    assert summary[worker]["bytes"] == 10
+    assert 0 < summary[worker]["utilisation"] <= 1
+
+
+def test_webdav_upload_files_sends_largest_file_first(tmp_path):
+    for name, size in (("small.bin", 1), ("big.iso", 300), ("mid.bin", 20)):
+        (tmp_path / name).write_bytes(b"x" * size)
+    transport = TransportWebDAV(
+        {"host": "http://dav.local", "webdav_max_workers": 1, "upload_small_file_size": 10},
+        dry_run=False,
+    )
+    uploaded = []
+    files = [
+        (tmp_path / name, Path("/Sync") / name) for name in ("small.bin", "big.iso", "mid.bin")
+    ]
+
+    with patch.object(
+        transport, "copy_file", side_effect=lambda src, dest, **_kwargs: uploaded.append(src.name)
+    ):
+        transport.upload_files(files)
+
+    assert uploaded == ["big.iso", "mid.bin", "small.bin"]
+    assert sum(entry["files"] for entry in transport.upload_stats.summary().values()) == 3
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from sftp_server import SFTPServer
+
+from retrosync_core.inventory import source_inventory
+from retrosync_core.plan import JobPlan
+from retrosync_core.transports import TransportSSHWindows
+
+
+def make_roms(root: Path, count=4, size=64 * 1024):
+    for idx in range(count):
+        path = root / f"disk{idx // 2}" / f"game{idx}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([idx]) * size)
+    return root
+
+
+def test_copy_files_uploads_tree_and_skips_it_on_second_run(tmp_path, sftp_server):
+    src = make_roms(tmp_path / "src")
+    transport = TransportSSHWindows(sftp_server.client_config(), dry_run=False)
+
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    assert (sftp_server.root / "roms/disk1/game3.bin").read_bytes() == bytes([3]) * 64 * 1024
+    assert sftp_server.ops["open"] == 4
+    assert sftp_server.ops["bytes_received"] == 4 * 64 * 1024
+
+    sftp_server.reset_stats()
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    assert sftp_server.ops["open"] == 0
+    assert sftp_server.ops["bytes_received"] == 0
+    assert sftp_server.requests() == sftp_server.ops["stat"]
+
+
+def test_second_run_uploads_changed_and_newer_files(tmp_path, sftp_server):
+    src = make_roms(tmp_path / "src")
+    transport = TransportSSHWindows(sftp_server.client_config(), dry_run=False)
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+    (src / "disk0/game0.bin").write_bytes(b"changed")
+    newer = time.time() + 60
+    os.utime(src / "disk1/game2.bin", (newer, newer))
+    sftp_server.reset_stats()
+
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    assert sftp_server.ops["open"] == 2
+    assert (sftp_server.root / "roms/disk0/game0.bin").read_bytes() == b"changed"
+
+
+def test_remote_manifest_reads_sftp_listing(tmp_path, sftp_server):
+    src = make_roms(tmp_path / "src")
+    transport = TransportSSHWindows(sftp_server.client_config(), dry_run=False)
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    manifest = transport.remote_manifest(Path("/roms"))
+
+    assert sorted(manifest) == [f"disk{idx // 2}/game{idx}.bin" for idx in range(4)]
+    assert manifest["disk0/game1.bin"][0] == 64 * 1024
+
+
+def test_pipelined_writes_do_not_wait_for_each_reply(tmp_path):
+    src = make_roms(tmp_path / "src", count=1, size=1024 * 1024)
+    with SFTPServer(tmp_path / "sftp", latency=0.05) as server:
+        transport = TransportSSHWindows(server.client_config(), dry_run=False)
+        transport.connect()
+        server.reset_stats()
+        started = time.monotonic()
+        transport.copy_file(src / "disk0/game0.bin", Path("/game0.bin"))
+        elapsed = time.monotonic() - started
+
+    assert server.ops["write"] >= 16
+    assert elapsed < server.ops["write"] * 0.05
+
+
+def test_bandwidth_cap_slows_uploads(tmp_path):
+    src = make_roms(tmp_path / "src", count=1, size=256 * 1024)
+    with SFTPServer(tmp_path / "sftp", bandwidth=1024 * 1024) as server:
+        transport = TransportSSHWindows(server.client_config(), dry_run=False)
+        transport.connect()
+        started = time.monotonic()
+        transport.copy_file(src / "disk0/game0.bin", Path("/game0.bin"))
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.2
+
+
+def test_parallel_sessions_are_served_concurrently(tmp_path):
+    src = make_roms(tmp_path / "src", count=4, size=256 * 1024)
+    with SFTPServer(tmp_path / "sftp", latency=0.02) as server:
+        transports = [TransportSSHWindows(server.client_config(), dry_run=False) for _ in range(2)]
+        threads = [
+            threading.Thread(
+                target=transport.copy_files,
+                args=(src / f"disk{idx}", Path(f"/disk{idx}"), []),
+            )
+            for idx, transport in enumerate(transports)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert server.sessions == 2
+    assert server.peak_sessions == 2
+    assert len(list(server.root.rglob("*.bin"))) == 4
+
+
+def test_delta_transfer_writes_only_changed_blocks(tmp_path, sftp_server):
+    src = tmp_path / "src" / "disc.iso"
+    src.parent.mkdir()
+    src.write_bytes(b"a" * 64 * 1024)
+    transport = TransportSSHWindows(
+        sftp_server.client_config(
+            delta_transfer=True,
+            delta_min_size=16 * 1024,
+            delta_block_size=4 * 1024,
+            cache_dir=str(tmp_path / "cache"),
+        ),
+        dry_run=False,
+    )
+    transport.copy_file(src, Path("/disc.iso"))
+    with open(src, "r+b") as fd:
+        fd.seek(8 * 1024)
+        fd.write(b"b" * 100)
+    newer = time.time() + 60
+    os.utime(src, (newer, newer))
+    sftp_server.reset_stats()
+
+    transport.copy_file(src, Path("/disc.iso"))
+
+    assert (sftp_server.root / "disc.iso").read_bytes() == src.read_bytes()
+    assert sftp_server.ops["bytes_received"] == 4 * 1024
+
+
+def test_mirror_removes_deleted_files_and_folders(tmp_path, sftp_server):
+    src = make_roms(tmp_path / "src", count=8)
+    transport = TransportSSHWindows(
+        sftp_server.client_config(mirror=True, mirror_max_delete_percent=50), dry_run=False
+    )
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+    for path in src.glob("disk2/*"):
+        path.unlink()
+    (src / "disk0/game1.bin").unlink()
+    job_plan = transport.plan_changes(
+        JobPlan(job="Sync ROMs", dst="/roms"), src, Path("/roms"), source_inventory(src)
+    )
+
+    transport.delete_planned(Path("/roms"), job_plan)
+
+    remaining = sorted(
+        p.relative_to(sftp_server.root).as_posix() for p in sftp_server.root.rglob("*")
+    )
+    assert "roms/disk2" not in remaining
+    assert "roms/disk0/game1.bin" not in remaining
+    assert "roms/disk0/game0.bin" in remaining
+    assert sftp_server.ops["rmdir"] == 1
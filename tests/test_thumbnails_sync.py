@@ -1,7 +1,9 @@
+import json
+import re
 import pytest
 from pathlib import Path
 from unittest.mock import Mock
-from retrosync import ThumbnailsSync, TransportSSHUnix
+from retrosync import ThumbnailsSync, TransportFileSystemUnix, TransportSSHUnix
 
 
 @pytest.fixture
@@ -90,3 +92,51 @@ def test_thumbnails_sync_do_forwards_callback(default_config, playlists, dry_run
         recursive=True,
         callback=callback,
     )
+
+
+def test_referenced_thumbnails_are_sent_in_one_rsync_run(tmp_path):
+    thumbnails = tmp_path / "thumbnails" / "snes" / "Named_Boxarts"
+    dest = tmp_path / "dest"
+    thumbnails.mkdir(parents=True)
+    (dest / "snes" / "Named_Boxarts").mkdir(parents=True)
+    for name in ["Mario.png", "Zelda.png", "Unlisted.png"]:
+        (thumbnails / name).write_bytes(b"png")
+    (dest / "snes" / "Named_Boxarts" / "Unlisted.png").write_bytes(b"png")
+    (tmp_path / "playlists").mkdir()
+    (tmp_path / "playlists" / "snes.lpl").write_text(
+        json.dumps(
+            {
+                "items": [
+                    {"path": str(tmp_path / "roms" / "snes" / f"{name}.sfc"), "label": name}
+                    for name in ["Mario", "Zelda"]
+                ]
+            }
+        )
+    )
+    default = {
+        "src_roms": [str(tmp_path / "roms")],
+        "src_playlists": str(tmp_path / "playlists"),
+        "src_thumbnails": str(tmp_path / "thumbnails"),
+        "dest_thumbnails": str(dest),
+        "thumbnails_referenced_only": True,
+        "mirror_max_delete_percent": 100,
+    }
+    transport = TransportFileSystemUnix(default, dry_run=False)
+    commands = []
+
+    def execute(cmd, **_):
+        files_from = re.search(r'--files-from="([^"]+)"', cmd).group(1)
+        commands.append((cmd, sorted(Path(files_from).read_text().split("\0")[:-1])))
+
+    transport.execute = Mock(side_effect=execute)
+    playlists = [{"name": "snes.lpl", "src_folder": "snes", "dest_folder": "snes"}]
+    thumbnails_sync = ThumbnailsSync(default, playlists, transport)
+    thumbnails_sync.apply_plan(thumbnails_sync.build_plan())
+
+    thumbnails_sync.sync_directory()
+
+    (delete_cmd, deleted), (copy_cmd, sent) = commands
+    assert "--delete-missing-args" in delete_cmd
+    assert deleted == ["snes/Named_Boxarts/Unlisted.png"]
+    assert "--files-from" in copy_cmd
+    assert sent == ["snes/Named_Boxarts/Mario.png", "snes/Named_Boxarts/Zelda.png"]
@@ -0,0 +1,27 @@
+from retrosync_core.timing import active_timings, record, span, start_timings, stop_timings
+
+
+def test_span_is_a_shared_no_op_when_disabled():
+    assert active_timings() is None
+    assert span("a") is span("b")
+    with span("a"):
+        pass
+    record("b", 1.0)
+
+
+def test_spans_are_aggregated_per_name():
+    stats = start_timings()
+    try:
+        for _ in range(3):
+            with span("webdav.PUT"):
+                pass
+        record("transport.upload", 2.0)
+        record("transport.upload", 1.0)
+    finally:
+        assert stop_timings() is stats
+
+    data = stats.to_dict()
+    assert data["webdav.PUT"]["count"] == 3
+    assert data["transport.upload"] == {"count": 2, "seconds": 3.0, "max_seconds": 2.0}
+    table = stats.format_table()
+    assert table.splitlines()[1].startswith("transport.upload")
@@ -0,0 +1,228 @@
+import json
+import zipfile
+from unittest.mock import Mock, patch
+
+import pytest
+
+from retrosync_core.jobs import FavoritesSync
+from retrosync_core.runner import SyncRunConfig, SyncRunner
+from retrosync_core.transform import TransformCache, downscale_image
+from retrosync_core.transports import TransportFileSystemWindows
+
+
+def shout(src, dst, params):
+    dst.write_bytes(src.read_bytes().upper() * params["repeat"])
+
+
+def _tree(tmp_path, files):
+    src = tmp_path / "src"
+    for rel, data in files.items():
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_bytes(data)
+    return src
+
+
+def test_transform_cache_only_reprocesses_changed_content(tmp_path):
+    src = _tree(tmp_path, {"a/one.txt": b"abc", "a/two.txt": b"abc", "b/three.txt": b"xyz"})
+    cache = TransformCache(tmp_path / "cache", "shout", {"repeat": 2})
+
+    inventory, stats = cache.apply(src, ["a/one.txt", "a/two.txt", "b/three.txt"], shout)
+
+    assert (stats.files, stats.cached) == (2, 1)
+    assert sorted(inventory) == ["a/one.txt", "a/two.txt", "b/three.txt"]
+    assert inventory["a/one.txt"][0] == 6
+    assert (cache.tree / "a" / "two.txt").read_bytes() == b"ABCABC"
+    assert (stats.source_bytes, stats.output_bytes) == (9, 18)
+
+    (src / "b" / "three.txt").write_bytes(b"changed")
+    _, stats = cache.apply(src, ["a/one.txt", "a/two.txt", "b/three.txt"], shout, workers=2)
+
+    assert (stats.files, stats.cached) == (1, 2)
+    assert (cache.tree / "b" / "three.txt").read_bytes() == b"CHANGEDCHANGED"
+
+
+def test_transform_cache_is_keyed_by_settings_and_can_rename(tmp_path):
+    src = _tree(tmp_path, {"game.sfc": b"rom"})
+    small = TransformCache(tmp_path / "cache", "shout", {"repeat": 1})
+    large = TransformCache(tmp_path / "cache", "shout", {"repeat": 3})
+
+    inventory, _ = small.apply(src, ["game.sfc"], shout, rename=lambda rel: rel + ".zip")
+    _, stats = large.apply(src, ["game.sfc"], shout)
+
+    assert list(inventory) == ["game.sfc.zip"]
+    assert small.root != large.root
+    assert stats.files == 1
+
+
+def test_downscale_image_limits_the_longest_side(tmp_path):
+    image_module = pytest.importorskip("PIL.Image")
+    src = tmp_path / "boxart.png"
+    image_module.effect_noise((1000, 600), 64).convert("RGB").save(src)
+    dst = tmp_path / "small.png"
+
+    downscale_image(src, dst, {"max_size": 200, "format": "png8"})
+
+    with image_module.open(dst) as image:
+        assert max(image.size) == 200
+    assert dst.stat().st_size < src.stat().st_size
+
+
+def test_downscale_image_keeps_an_unreadable_image(tmp_path):
+    pytest.importorskip("PIL.Image")
+    src = tmp_path / "broken.png"
+    src.write_bytes(b"not a png")
+    dst = tmp_path / "out.png"
+
+    downscale_image(src, dst, {"max_size": 200, "format": "png"})
+
+    assert dst.read_bytes() == b"not a png"
+
+
+def test_runner_sends_transformed_thumbnails(tmp_path):
+    src = _tree(
+        tmp_path,
+        {"snes/Named_Boxarts/a.png": b"boxart", "snes/Named_Snaps/a.png": b"snap"},
+    )
+    default = {
+        "src_thumbnails": str(src),
+        "dest_thumbnails": str(tmp_path / "dest"),
+        "cache_dir": str(tmp_path / "cache"),
+        "thumbnail_max_size": 256,
+        "transform_workers": 1,
+    }
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    reporter = Mock()
+    runner = SyncRunner(default=default, playlists=[], transport=transport, reporter=reporter)
+    cfg = SyncRunConfig(
+        do_sync_playlists=False,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=True,
+        do_sync_roms=False,
+        do_update_playlists=False,
+    )
+
+    with patch("retrosync_core.jobs.downscale_image", lambda s, d, p: shout(s, d, {"repeat": 1})):
+        runner.run(cfg)
+        plan = runner.plan(cfg)
+
+    assert (tmp_path / "dest" / "snes" / "Named_Boxarts" / "a.png").read_bytes() == b"BOXART"
+    assert (tmp_path / "dest" / "snes" / "Named_Snaps" / "a.png").read_bytes() == b"SNAP"
+    (message,), _ = reporter.emit_summary.call_args
+    assert "Converted 2 files" in message
+    (job_plan,) = plan.global_jobs
+    assert job_plan.entries == []
+    assert job_plan.transform["cached"] == 2
+    assert json.loads(json.dumps(plan.to_dict()))["global_jobs"][0]["transform"]["files"] == 0
+
+
+def test_runner_repacks_raw_cartridges_into_zips(tmp_path):
+    roms = _tree(
+        tmp_path,
+        {
+            "snes/Mario.sfc": b"s" * 4096,
+            "snes/Zelda.zip": b"already zipped",
+            "snes/Twin.sfc": b"one",
+            "snes/Twin.smc": b"two",
+        },
+    )
+    playlists = tmp_path / "playlists"
+    playlists.mkdir()
+    items = [
+        {"path": str(roms / "snes" / name), "label": name, "core_path": "DETECT"}
+        for name in ("Mario.sfc", "Zelda.zip", "Twin.sfc")
+    ]
+    (playlists / "snes.lpl").write_text(
+        json.dumps({"version": "1.5", "default_core_path": "", "items": items}), encoding="utf-8"
+    )
+    default = {
+        "src_roms": [str(roms)],
+        "src_playlists": str(playlists),
+        "src_cores": "/src/cores",
+        "src_cores_suffix": ".dylib",
+        "target_roms": "/target/roms",
+        "target_cores": "/target/cores",
+        "target_cores_suffix": ".so",
+        "dest_roms": str(tmp_path / "dest" / "roms"),
+        "dest_playlists": str(tmp_path / "dest" / "playlists"),
+        "cache_dir": str(tmp_path / "cache"),
+        "transform_workers": 1,
+        "free_space_check": "off",
+    }
+    playlist = {"name": "snes.lpl", "src_folder": "snes", "dest_folder": "snes", "repack_zip": True}
+    transport = TransportFileSystemWindows(default, dry_run=False)
+    reporter = Mock()
+    runner = SyncRunner(
+        default=default, playlists=[playlist], transport=transport, reporter=reporter
+    )
+    cfg = SyncRunConfig(
+        do_sync_playlists=True,
+        do_sync_bios=False,
+        do_sync_favorites=False,
+        do_sync_thumbnails=False,
+        do_sync_roms=True,
+        do_update_playlists=False,
+    )
+
+    runner.run(cfg)
+
+    dest = tmp_path / "dest"
+    assert sorted(p.name for p in (dest / "roms" / "snes").iterdir()) == [
+        "Mario.zip",
+        "Twin.sfc",
+        "Twin.smc",
+        "Zelda.zip",
+    ]
+    with zipfile.ZipFile(dest / "roms" / "snes" / "Mario.zip") as archive:
+        assert archive.read("Mario.sfc") == b"s" * 4096
+    snes = json.loads((dest / "playlists" / "snes.lpl").read_text(encoding="utf-8"))
+    assert [item["path"] for item in snes["items"]] == [
+        "/target/roms/snes/Mario.zip",
+        "/target/roms/snes/Zelda.zip",
+        "/target/roms/snes/Twin.sfc",
+    ]
+    (message,), _ = reporter.emit_summary.call_args
+    assert "Converted 1 files" in message
+
+    plan = runner.plan(cfg)
+
+    (rom_plan,) = (job for job in plan.all_jobs() if job.kind == "rom_sync_job")
+    assert rom_plan.entries == []
+    assert (rom_plan.transform["files"], rom_plan.transform["cached"]) == (0, 1)
+    assert rom_plan.transformed == ["Mario.zip"]
+
+
+def test_favorites_point_to_repacked_zips(tmp_path):
+    roms = _tree(
+        tmp_path, {"snes/Mario.sfc": b"mario", "snes/Twin.sfc": b"a", "snes/Twin.smc": b"b"}
+    )
+    favorites = tmp_path / "content_favorites.lpl"
+    items = [
+        {"path": str(roms / "snes" / name), "core_name": "Snes9x", "core_path": "/src/snes9x"}
+        for name in ("Mario.sfc", "Twin.sfc")
+    ]
+    favorites.write_text(json.dumps({"items": items}), encoding="utf-8")
+    default = {
+        "src_roms": [str(roms)],
+        "src_cores": "/src",
+        "src_cores_suffix": ".dylib",
+        "target_roms": "/target/roms",
+        "target_cores": "/target",
+        "target_cores_suffix": ".so",
+        "src_config": str(tmp_path),
+        "dest_config": str(tmp_path / "dest"),
+        "repack_zip": True,
+    }
+    playlists = [
+        {"name": "snes.lpl", "src_folder": "snes", "dest_folder": "snes", "src_core_name": "Snes9x"}
+    ]
+    job = FavoritesSync(default, playlists, Mock())
+
+    with (tmp_path / "out.lpl").open("w+b") as out:
+        job.migrate(favorites, out)
+        migrated = json.loads(out.read())
+
+    assert [item["path"] for item in migrated["items"]] == [
+        "/target/roms/snes/Mario.zip",
+        "/target/roms/snes/Twin.sfc",
+    ]
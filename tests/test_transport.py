@@ -1,6 +1,6 @@
 import pytest
 from pathlib import Path
-from unittest.mock import patch, Mock
+from unittest.mock import ANY, patch, Mock
 import urllib.error
 from types import SimpleNamespace
 
@@ -15,6 +15,8 @@ from retrosync import (
     TransportSSHWindows,
     normalize_transport_config,
 )
+from retrosync_core.plan import JobPlan
+from retrosync_core.transports import parse_df_available
 
 
 @pytest.fixture
@@ -105,7 +107,7 @@ def test_transport_windows_remote_copy_file(default_config, dry_run):
 
     with patch.object(transport.sftp, "put") as mock_put, patch.object(transport.sftp, "stat"):
         transport.copy_file(src, dest)
-        mock_put.assert_called_once_with(str(src), str(dest))
+        mock_put.assert_called_once_with(str(src), str(dest), callback=ANY)
 
 
 def test_transport_base_excludes_known_junk_paths(default_config):
@@ -247,6 +249,8 @@ def test_transport_capabilities_matrix():
         atomic_upload=False,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
+        mirror_delete=True,
     )
     assert TransportSSHUnix.capabilities == TransportFileSystemUnix.capabilities
     assert TransportWebDAV.capabilities == TransportCapabilities(
@@ -256,6 +260,8 @@ def test_transport_capabilities_matrix():
         atomic_upload=False,
         parallel_upload=True,
         server_side_mkdir_cacheable=True,
+        server_side_copy=True,
+        remote_delete=True,
     )
     assert TransportFileSystemWindows.capabilities == TransportCapabilities(
         per_file_callback=True,
@@ -264,6 +270,7 @@ def test_transport_capabilities_matrix():
         atomic_upload=True,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
     )
     assert TransportSSHWindows.capabilities == TransportCapabilities(
         per_file_callback=True,
@@ -272,6 +279,8 @@ def test_transport_capabilities_matrix():
         atomic_upload=False,
         parallel_upload=False,
         server_side_mkdir_cacheable=False,
+        server_side_copy=True,
+        remote_delete=True,
     )
 
 
@@ -297,6 +306,7 @@ def test_normalize_transport_config_reads_ssh_and_webdav_sections():
             "hostname": "steamdeck",
             "username": "deck",
             "password": "secret",
+            "port": 2222,
         },
         "webdav": {
             "host": "https://dav.local",
@@ -306,6 +316,7 @@ def test_normalize_transport_config_reads_ssh_and_webdav_sections():
     }
     default = normalize_transport_config(config)
     assert default["hostname"] == "steamdeck"
+    assert default["port"] == 2222
     assert "host" not in default
     assert default["username"] == "deck"
     assert default["password"] == "secret"
@@ -661,3 +672,46 @@ def test_transport_webdav_parallel_copy_keyboard_interrupt_maps_to_transport_err
 
     assert all(f.cancelled for f in dummy_executor.futures)
     assert dummy_executor.shutdown_calls == [(False, True)]
+
+
+def test_parse_df_available_reads_posix_output():
+    output = (
+        "Filesystem     1024-blocks      Used Available Capacity Mounted on\n"
+        "/dev/nvme0n1p8   60000000  50000000   9000000      85% /home\n"
+    )
+    assert parse_df_available(output) == 9000000 * 1024
+    assert parse_df_available("df: /nope: No such file or directory\n") is None
+
+
+def test_rsync_transport_leaves_listing_deletions_to_rsync(tmp_path):
+    dest = tmp_path / "dest"
+    (dest / "old").mkdir(parents=True)
+    (dest / "old" / "gone.sfc").write_bytes(b"x")
+    transport = TransportFileSystemUnix({}, dry_run=False)
+    job_plan = transport.plan_from_listing(JobPlan(job="Sync ROMs"), dest, {"a.sfc": (1, 1)})
+    assert job_plan.delete_roots == ["old"]
+
+    transport.delete_planned(dest, job_plan)
+
+    assert (dest / "old" / "gone.sfc").exists()
+
+
+def test_ssh_unix_remote_manifest_lists_files_with_find():
+    transport = TransportSSHUnix({"hostname": "deck", "username": "deck"}, dry_run=False)
+    output = (
+        "5 1700000000.25 snes/Mario.zip\0" "7 1700000001.0 snes/A Game.zip\0" "3 1.0 .DS_Store\0"
+    )
+    with patch.object(transport, "capture", return_value=output) as capture:
+        manifest = transport.remote_manifest(Path("/home/deck/roms"))
+
+    assert "find /home/deck/roms -type f -printf" in capture.call_args.args[0]
+    assert manifest == {
+        "snes/A Game.zip": (7, 1700000001),
+        "snes/Mario.zip": (5, 1700000000),
+    }
+
+
+def test_ssh_unix_remote_manifest_is_unknown_when_find_fails():
+    transport = TransportSSHUnix({"hostname": "deck", "username": "deck"}, dry_run=False)
+    with patch.object(transport, "capture", side_effect=TransportError("find: unknown option")):
+        assert transport.remote_manifest(Path("/roms")) is None
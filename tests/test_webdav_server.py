@@ -0,0 +1,222 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+from webdav_server import WebDAVServer
+
+from retrosync_core.inventory import source_inventory
+from retrosync_core.plan import JobPlan
+from retrosync_core.transports import TransportError, TransportWebDAV
+
+
+def make_transport(server, **settings):
+    default = {
+        "transport": "webdav",
+        "host": server.url,
+        "username": "",
+        "password": "",
+        **settings,
+    }
+    return TransportWebDAV(default, dry_run=False)
+
+
+def make_roms(root: Path, count=6, size=4096):
+    for idx in range(count):
+        path = root / f"disk{idx // 3}" / f"game{idx}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([idx]) * size)
+    return root
+
+
+def test_copy_files_uploads_tree_over_http(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src")
+    transport = make_transport(webdav_server)
+
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    uploaded = sorted(p.relative_to(webdav_server.root) for p in webdav_server.root.rglob("*.bin"))
+    assert [p.as_posix() for p in uploaded] == [
+        f"roms/disk{idx // 3}/game{idx}.bin" for idx in range(6)
+    ]
+    assert (webdav_server.root / "roms/disk1/game4.bin").read_bytes() == bytes([4]) * 4096
+    assert webdav_server.methods().count("MKCOL") == 3
+    assert webdav_server.counters["bytes_received"] == 6 * 4096
+
+
+def test_remote_manifest_reads_propfind_listing(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src")
+    transport = make_transport(webdav_server)
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    manifest = transport.remote_manifest(Path("/roms"))
+
+    assert manifest["disk0/game0.bin"][0] == 4096
+    assert len(manifest) == 6
+
+
+def test_plan_sends_a_changed_file_of_the_same_size(tmp_path, webdav_server):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "save.srm").write_bytes(b"AAAA")
+    transport = make_transport(webdav_server)
+    transport.copy_files(src, Path("/saves"), whitelist=[], recursive=True)
+
+    unchanged = transport.plan_changes(
+        JobPlan(job="Sync saves"), src, Path("/saves"), source_inventory(src)
+    )
+    (src / "save.srm").write_bytes(b"BBBB")
+    later = time.time() + 10
+    os.utime(src / "save.srm", (later, later))
+    changed = transport.plan_changes(
+        JobPlan(job="Sync saves"), src, Path("/saves"), source_inventory(src)
+    )
+
+    assert unchanged.entries == []
+    assert [entry.path for entry in changed.entries] == ["save.srm"]
+
+
+def test_parallel_uploads_overlap_on_the_server(tmp_path):
+    src = make_roms(tmp_path / "src", count=8)
+    with WebDAVServer(tmp_path / "webdav", latency=0.05) as server:
+        transport = make_transport(server, webdav_max_workers=4)
+        transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+
+    assert server.peak_active >= 2
+    assert len(list(server.root.rglob("*.bin"))) == 8
+
+
+def test_bandwidth_cap_slows_uploads(tmp_path):
+    src = make_roms(tmp_path / "src", count=1, size=100 * 1024)
+    with WebDAVServer(tmp_path / "webdav", bandwidth=500 * 1024) as server:
+        transport = make_transport(server)
+        started = time.monotonic()
+        transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.15
+
+
+def test_basic_auth_challenge_is_answered(tmp_path):
+    src = make_roms(tmp_path / "src", count=1)
+    with WebDAVServer(tmp_path / "webdav", username="user", password="secret") as server:
+        transport = make_transport(server, username="user", password="secret")
+        transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+
+    assert (server.root / "roms/game0.bin").exists()
+
+
+def test_wrong_password_raises_unauthorized(tmp_path):
+    src = make_roms(tmp_path / "src", count=1)
+    with WebDAVServer(tmp_path / "webdav", username="user", password="secret") as server:
+        transport = make_transport(server, username="user", password="wrong")
+        with pytest.raises(RuntimeError, match="HTTP 401"):
+            transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+
+
+def test_service_unavailable_fails_the_request(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src", count=1)
+    transport = make_transport(webdav_server)
+    transport.ensure_dir_exists(Path("/roms"))
+    webdav_server.fail_next(status=503)
+
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+
+
+def test_dropped_connection_raises_transport_error(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src", count=1)
+    transport = make_transport(webdav_server)
+    transport.ensure_dir_exists(Path("/roms"))
+    webdav_server.drop_next()
+
+    with pytest.raises(TransportError, match="connection failed"):
+        transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+
+
+def test_ranged_put_sends_only_changed_blocks(tmp_path, webdav_server):
+    src = tmp_path / "src" / "disc.iso"
+    src.parent.mkdir()
+    src.write_bytes(b"a" * 64 * 1024)
+    transport = make_transport(
+        webdav_server,
+        delta_transfer=True,
+        delta_min_size=16 * 1024,
+        delta_block_size=4 * 1024,
+        cache_dir=str(tmp_path / "cache"),
+    )
+    transport.copy_file(src, Path("/roms/disc.iso"))
+    with open(src, "r+b") as fd:
+        fd.seek(8 * 1024)
+        fd.write(b"b" * 100)
+    webdav_server.reset_stats()
+
+    transport.copy_file(src, Path("/roms/disc.iso"))
+
+    assert (webdav_server.root / "roms/disc.iso").read_bytes() == src.read_bytes()
+    assert webdav_server.counters["bytes_received"] == 4 * 1024
+
+
+def test_remote_copy_uses_server_side_copy(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src", count=1)
+    transport = make_transport(webdav_server)
+    transport.copy_file(src / "disk0/game0.bin", Path("/roms/game0.bin"))
+    webdav_server.reset_stats()
+
+    transport.remote_copy(Path("/roms/game0.bin"), Path("/roms/copy.bin"))
+
+    assert webdav_server.methods() == ["COPY"]
+    assert (webdav_server.root / "roms/copy.bin").read_bytes() == bytes([0]) * 4096
+
+
+def test_mirror_deletes_files_and_whole_folders(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src", count=8)
+    transport = make_transport(webdav_server, mirror=True, mirror_max_delete_percent=50)
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+    for path in src.glob("disk2/*"):
+        path.unlink()
+    (src / "disk0/game0.bin").unlink()
+    job_plan = transport.plan_changes(
+        JobPlan(job="Sync ROMs", dst="/roms"), src, Path("/roms"), source_inventory(src)
+    )
+    webdav_server.reset_stats()
+
+    transport.delete_planned(Path("/roms"), job_plan)
+
+    assert job_plan.delete_roots == ["disk0/game0.bin", "disk2"]
+    assert sorted(webdav_server.requests) == [
+        ("DELETE", "/roms/disk0/game0.bin"),
+        ("DELETE", "/roms/disk2"),
+    ]
+    assert not (webdav_server.root / "roms/disk2").exists()
+    assert (webdav_server.root / "roms/disk0/game1.bin").exists()
+
+
+def test_mirror_refuses_to_delete_above_the_cap(tmp_path, webdav_server):
+    src = make_roms(tmp_path / "src")
+    transport = make_transport(webdav_server, mirror=True)
+    transport.copy_files(src, Path("/roms"), whitelist=[], recursive=True)
+    for path in src.glob("disk1/*"):
+        path.unlink()
+    job_plan = transport.plan_changes(
+        JobPlan(job="Sync ROMs", dst="/roms"), src, Path("/roms"), source_inventory(src)
+    )
+    webdav_server.reset_stats()
+
+    with pytest.raises(TransportError, match="would delete 3 of 6 files"):
+        transport.delete_planned(Path("/roms"), job_plan)
+
+    assert webdav_server.requests == []
+
+
+def test_free_space_reads_the_quota_of_the_closest_folder(tmp_path):
+    with WebDAVServer(tmp_path / "webdav", quota=5 * 1024**3) as server:
+        transport = make_transport(server)
+        transport.ensure_dir_exists(Path("/roms"))
+
+        assert transport.free_space(Path("/roms/psx/not-synced-yet")) == 5 * 1024**3
+        assert server.methods()[-3:] == ["PROPFIND", "PROPFIND", "PROPFIND"]
+
+
+def test_free_space_is_unknown_without_quota(webdav_server):
+    assert make_transport(webdav_server).free_space(Path("/")) is None
@@ -0,0 +1,351 @@
+import base64
+import email.utils
+import html
+import re
+import shutil
+import socket
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class WebDAVHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "RetrosyncTestDAV/1.0"
+
+    def setup(self):
+        super().setup()
+        self.server.dav.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _local(self, path=None):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(path or self.path).path)
+        parts = [part for part in path.split("/") if part and part not in (".", "..")]
+        return self.server.dav.root.joinpath(*parts)
+
+    def _href(self, local):
+        rel = local.relative_to(self.server.dav.root).as_posix()
+        href = "/" if rel == "." else f"/{rel}"
+        if local.is_dir() and href != "/":
+            href += "/"
+        return urllib.parse.quote(href)
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            # urllib streams file bodies without a Content-Length.
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(self._read_exact(size))
+                self.rfile.readline()
+        return self._read_exact(int(self.headers.get("Content-Length") or 0))
+
+    def _read_exact(self, length):
+        chunks = []
+        while length > 0:
+            chunk = self.rfile.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            self.server.dav.throttle(len(chunk))
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b"".join(chunks)
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            for offset in range(0, len(body), CHUNK_SIZE):
+                chunk = body[offset : offset + CHUNK_SIZE]
+                self.server.dav.throttle(len(chunk))
+                self.wfile.write(chunk)
+
+    def _authorized(self):
+        expected = self.server.dav.auth_header
+        return expected is None or self.headers.get("Authorization") == expected
+
+    def _dispatch(self):
+        dav = self.server.dav
+        dav.request_started(self.command, self.path)
+        try:
+            if dav.latency:
+                time.sleep(dav.latency)
+            fault = dav.take_fault()
+            if fault == "drop":
+                # Read nothing and answer nothing: the client sees a reset or an empty reply.
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            if fault is not None:
+                self._read_body()
+                self._send(fault, headers={"Retry-After": "0"})
+                return
+            if not self._authorized():
+                self._read_body()
+                self._send(401, headers={"WWW-Authenticate": 'Basic realm="retrosync"'})
+                return
+            getattr(self, f"dav_{self.command.lower()}")()
+        finally:
+            dav.request_finished()
+
+    do_GET = do_HEAD = do_PROPFIND = do_MKCOL = do_PUT = do_MOVE = do_COPY = do_DELETE = _dispatch
+
+    def dav_get(self):
+        local = self._local()
+        if not local.is_file():
+            self._send(404)
+            return
+        self._send(200, local.read_bytes(), {"Content-Type": "application/octet-stream"})
+
+    dav_head = dav_get
+
+    def dav_propfind(self):
+        self._read_body()
+        local = self._local()
+        if not local.exists():
+            self._send(404)
+            return
+        entries = [local]
+        if local.is_dir() and self.headers.get("Depth", "1") != "0":
+            entries.extend(sorted(local.iterdir()))
+        responses = "".join(self._prop_response(entry) for entry in entries)
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            f'<D:multistatus xmlns:D="DAV:">{responses}</D:multistatus>'
+        ).encode()
+        self._send(207, body, {"Content-Type": 'application/xml; charset="utf-8"'})
+
+    def _prop_response(self, local):
+        stat = local.stat()
+        modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if local.is_dir():
+            props = "<D:resourcetype><D:collection/></D:resourcetype>"
+            if self.server.dav.quota is not None:
+                props += (
+                    f"<D:quota-available-bytes>{self.server.dav.quota}</D:quota-available-bytes>"
+                )
+        else:
+            props = (
+                "<D:resourcetype/>"
+                f"<D:getcontentlength>{stat.st_size}</D:getcontentlength>"
+                f"<D:getetag>{etag}</D:getetag>"
+            )
+        return (
+            f"<D:response><D:href>{html.escape(self._href(local))}</D:href>"
+            f"<D:propstat><D:prop>{props}<D:getlastmodified>{modified}</D:getlastmodified>"
+            "</D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>"
+        )
+
+    def dav_mkcol(self):
+        self._read_body()
+        local = self._local()
+        if local.exists():
+            self._send(405)
+            return
+        if not local.parent.is_dir():
+            self._send(409)
+            return
+        local.mkdir()
+        self._send(201)
+
+    def dav_put(self):
+        body = self._read_body()
+        local = self._local()
+        if not local.parent.is_dir():
+            self._send(409)
+            return
+        if local.is_dir():
+            self._send(405)
+            return
+        existed = local.exists()
+        content_range = self.headers.get("Content-Range")
+        if content_range:
+            if not self.server.dav.partial_put:
+                self._send(501)
+                return
+            match = CONTENT_RANGE.fullmatch(content_range.strip())
+            if not match or not existed:
+                self._send(416)
+                return
+            with open(local, "r+b") as fd:
+                fd.seek(int(match.group(1)))
+                fd.write(body)
+        else:
+            local.write_bytes(body)
+        self.server.dav.count("bytes_received", len(body))
+        self._send(204 if existed else 201)
+
+    def dav_delete(self):
+        local = self._local()
+        if not local.exists():
+            self._send(404)
+            return
+        if local.is_dir():
+            shutil.rmtree(local)
+        else:
+            local.unlink()
+        self._send(204)
+
+    def _transfer(self, move):
+        self._read_body()
+        local = self._local()
+        destination = self.headers.get("Destination")
+        if not local.exists():
+            self._send(404)
+            return
+        if not destination:
+            self._send(400)
+            return
+        target = self._local(destination)
+        if not target.parent.is_dir():
+            self._send(409)
+            return
+        existed = target.exists()
+        if existed and self.headers.get("Overwrite", "T").upper() == "F":
+            self._send(412)
+            return
+        if existed and target.is_dir():
+            shutil.rmtree(target)
+        if move:
+            local.replace(target)
+        elif local.is_dir():
+            shutil.copytree(local, target)
+        else:
+            shutil.copyfile(local, target)
+        self._send(204 if existed else 201)
+
+    def dav_move(self):
+        self._transfer(move=True)
+
+    def dav_copy(self):
+        self._transfer(move=False)
+
+
+class WebDAVServer:
+    def __init__(
+        self,
+        root,
+        *,
+        username=None,
+        password=None,
+        latency=0.0,
+        bandwidth=None,
+        partial_put=True,
+        quota=None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.latency = latency
+        # Bytes per second across all connections; None is unthrottled.
+        self.bandwidth = bandwidth
+        self.partial_put = partial_put
+        # Reported as quota-available-bytes on folders; None leaves the property out.
+        self.quota = quota
+        self.auth_header = None
+        if username is not None:
+            token = base64.b64encode(f"{username}:{password or ''}".encode()).decode("ascii")
+            self.auth_header = f"Basic {token}"
+        self.requests = []
+        self.counters = {"connections": 0, "bytes_received": 0}
+        self.active = 0
+        self.peak_active = 0
+        self._faults = []
+        self._lock = threading.Lock()
+        self._next_send = time.monotonic()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), WebDAVHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.dav = self
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="webdav-server",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # Injected faults are consumed in order, one per request.
+
+    def fail_next(self, count=1, status=503):
+        with self._lock:
+            self._faults.extend([status] * count)
+
+    def drop_next(self, count=1):
+        with self._lock:
+            self._faults.extend(["drop"] * count)
+
+    def take_fault(self):
+        with self._lock:
+            return self._faults.pop(0) if self._faults else None
+
+    def throttle(self, size):
+        if not self.bandwidth:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_send)
+            self._next_send = start + size / self.bandwidth
+            delay = self._next_send - now
+        time.sleep(delay)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def request_started(self, method, path):
+        with self._lock:
+            self.requests.append((method, urllib.parse.unquote(urllib.parse.urlsplit(path).path)))
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def request_finished(self):
+        with self._lock:
+            self.active -= 1
+
+    def methods(self):
+        with self._lock:
+            return [method for method, _ in self.requests]
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = []
+            self.counters = {"connections": 0, "bytes_received": 0}
+            self.peak_active = self.active